@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Compare the memory taken by decoded games with and without interning.
+
+Games of one player against a few hundred opponents are decoded from
+newline-delimited JSON and kept in a list, once as decoded and once with
+their repeated strings interned by :class:`berserk.formats.Interner`. The
+memory they take is measured with :mod:`tracemalloc`. Run with::
+
+    python -m benchmarks.bench_intern
+"""
+import argparse
+import itertools
+import json
+import random
+import time
+import tracemalloc
+
+from berserk import formats
+
+from .bench_models import GAME
+
+OPENINGS = [
+    ('C20', "King's Pawn Game"),
+    ('B01', 'Scandinavian Defense'),
+    ('D38', "Queen's Gambit Declined: Ragozin Defense"),
+    ('A45', 'Indian Defense'),
+]
+
+
+def games(number, opponents, seed=0):
+    rng = random.Random(seed)
+    for index in range(number):
+        game = json.loads(json.dumps(GAME))
+        eco, name = rng.choice(OPENINGS)
+        opponent = f'opponent{rng.randrange(opponents)}'
+        game['id'] = f'{index:08d}'
+        game['opening'] = {'eco': eco, 'name': name, 'ply': 4}
+        game['players']['black']['user'] = {'name': opponent, 'id': opponent}
+        game['status'] = rng.choice(['mate', 'resign', 'outoftime', 'draw'])
+        game['winner'] = rng.choice(['white', 'black'])
+        yield json.dumps(game).encode()
+
+
+def measure(fmt, body):
+    chunks = [body[i:i + formats.CHUNK_SIZE]
+              for i in range(0, len(body), formats.CHUNK_SIZE)]
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        kept = list(fmt.parse_chunks(chunks))
+        elapsed = time.perf_counter() - start
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return size / len(kept), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--number', type=int, default=100000,
+                        help='number of games decoded')
+    parser.add_argument('--opponents', type=int, default=300,
+                        help='number of distinct opponents')
+    args = parser.parse_args()
+    body = b'\n'.join(itertools.chain(
+        games(args.number, args.opponents), [b'']
+    ))
+
+    print(f'{"handler":<12}{"per game":>10}{"time":>10}')
+    for name, fmt in [
+        ('plain', formats.NDJSON),
+        ('interning', formats.NDJSON.interning()),
+    ]:
+        size, elapsed = measure(fmt, body)
+        print(f'{name:<12}{size:>8.0f} B{elapsed:>9.3f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Compare the conversion of records by the models with the previous code.
+
+Before converters were compiled, the conversions of a model were rebuilt
+from the attributes of its class, and intersected with the keys of the
+record, on every conversion. The lazy mode, which converts fields only
+when they are read, is measured without reading any field. Run with::
+
+    python -m benchmarks.bench_models
+"""
+import argparse
+import copy
+import timeit
+
+from berserk import models
+
+GAME = {
+    'id': 'q7ZvsdUF',
+    'rated': True,
+    'variant': 'standard',
+    'speed': 'blitz',
+    'perf': 'blitz',
+    'createdAt': 1525789431889,
+    'lastMoveAt': 1525789730416,
+    'status': 'resign',
+    'players': {
+        'white': {'user': {'name': 'foo', 'id': 'foo'}, 'rating': 2389},
+        'black': {'user': {'name': 'bar', 'id': 'bar'}, 'rating': 2301},
+    },
+    'winner': 'white',
+    'moves': 'd4 d5 c4 c6',
+    'clock': {'initial': 300, 'increment': 3, 'totalTime': 420},
+}
+ACTIVITY = {
+    'interval': {'start': 1525789431889, 'end': 1525875831889},
+    'games': {'blitz': {'win': 3, 'loss': 1, 'draw': 0}},
+}
+RATING_HISTORY = {
+    'name': 'Blitz',
+    'points': [[2018, 4, 1, 2300 + day] for day in range(30)],
+}
+
+CASES = [
+    ('Game', models.Game, GAME),
+    ('Activity', models.Activity, ACTIVITY),
+    ('RatingHistory', models.RatingHistory, RATING_HISTORY),
+]
+
+
+def legacy_convert_one(cls, data):
+    # Model.convert_one before compilation
+    for k in set(data) & set(cls.conversions):
+        data[k] = cls.conversions[k](data[k])
+    return data
+
+
+def measure(convert, record, number):
+    records = [copy.deepcopy(record) for _ in range(number)]
+    convert_all = lambda: [convert(r) for r in records]  # noqa: E731
+    return timeit.timeit(convert_all, number=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--number', type=int, default=100000,
+                        help='number of records converted per measurement')
+    args = parser.parse_args()
+
+    print(f'{"model":<16}{"legacy":>10}{"compiled":>10}{"speedup":>10}'
+          f'{"lazy":>10}')
+    for name, model, record in CASES:
+        legacy = measure(
+            lambda r: legacy_convert_one(model, r), record, args.number
+        )
+        compiled = measure(model.convert, record, args.number)
+        lazy = measure(model.convert_lazy, record, args.number)
+        print(f'{name:<16}{legacy:>9.3f}s{compiled:>9.3f}s'
+              f'{legacy / compiled:>9.1f}x{lazy:>9.3f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Compare the memory taken by records kept as dicts and as compact records.
+
+Game and user records are decoded from JSON, converted by their model, and
+kept in a list, once as dicts and once as the compact records of
+:mod:`berserk.records`. The memory they take is measured with
+:mod:`tracemalloc`. Run with::
+
+    python -m benchmarks.bench_records
+"""
+import argparse
+import json
+import tracemalloc
+
+from berserk import models
+
+from .bench_models import GAME
+
+USER = {
+    'id': 'foo',
+    'username': 'Foo',
+    'online': False,
+    'createdAt': 1525789431889,
+    'seenAt': 1525875831889,
+    'url': 'https://lichess.org/@/foo',
+    'perfs': {'blitz': {'games': 10, 'rating': 1500, 'rd': 60, 'prog': 0}},
+    'count': {'all': 10, 'rated': 10, 'win': 5, 'loss': 5, 'draw': 0},
+}
+PUZZLE_ACTIVITY = {
+    'id': 'abc12',
+    'date': 1525789431889,
+    'win': True,
+    'puzzleRating': 1500,
+}
+
+CASES = [
+    ('Game', models.Game, GAME),
+    ('User', models.User, USER),
+    ('PuzzleActivity', models.PuzzleActivity, PUZZLE_ACTIVITY),
+]
+
+
+def measure(convert, line, number):
+    tracemalloc.start()
+    try:
+        kept = [convert(json.loads(line)) for _ in range(number)]
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del kept
+    return size / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--number', type=int, default=100000,
+                        help='number of records kept per measurement')
+    args = parser.parse_args()
+
+    print(f'{"model":<16}{"dict":>10}{"compact":>10}{"saved":>10}')
+    for name, model, record in CASES:
+        line = json.dumps(record)
+        as_dict = measure(model.convert, line, args.number)
+        compact = measure(model.convert_compact, line, args.number)
+        print(f'{name:<16}{as_dict:>8.0f} B{compact:>8.0f} B'
+              f'{1 - compact / as_dict:>9.0%}')
+
+
+if __name__ == '__main__':
+    main()
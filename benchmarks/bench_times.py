@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Compare the conversion of timestamps with the previous code.
+
+Timestamps were converted with :meth:`datetime.strptime` for strings, and
+through :func:`berserk.utils.datetime_from_seconds` for milliseconds. The
+current conversion of strings is much faster, while that of milliseconds
+takes about as long as before and only became exact for any timestamp. The
+batch forms convert a whole column into a NumPy array. Run with::
+
+    python -m benchmarks.bench_times
+"""
+import argparse
+import timeit
+from datetime import datetime, timezone
+
+from berserk import utils
+
+MILLIS = [1525789431889 + 7919 * i for i in range(1000)]
+TEXTS = [utils.datetime_from_millis(m).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+         for m in MILLIS]
+
+
+def legacy_datetime_from_millis(millis):
+    return utils.datetime_from_seconds(millis / 1000)
+
+
+def legacy_datetime_from_str(dt_str):
+    dt = datetime.strptime(dt_str, '%Y-%m-%dT%H:%M:%S.%fZ')
+    return dt.replace(tzinfo=timezone.utc)
+
+
+CASES = [
+    ('millis', MILLIS, legacy_datetime_from_millis,
+     utils.datetime_from_millis, utils.datetime64_from_millis),
+    ('str', TEXTS, legacy_datetime_from_str,
+     utils.datetime_from_str, utils.datetime64_from_str),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--number', type=int, default=100,
+                        help='number of times 1000 timestamps are converted')
+    args = parser.parse_args()
+
+    print(f'{"input":<10}{"legacy":>10}{"current":>10}{"batch":>10}')
+    for name, values, legacy, current, batch in CASES:
+        times = [
+            timeit.timeit(lambda: list(map(func, values)), number=args.number)
+            for func in (legacy, current)
+        ]
+        times.append(timeit.timeit(lambda: batch(values), number=args.number))
+        print(f'{name:<10}' + ''.join(f'{t:>9.3f}s' for t in times))
+
+
+if __name__ == '__main__':
+    main()
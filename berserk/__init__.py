@@ -18,5 +18,7 @@ from .formats import JSON  # noqa: F401
 from .formats import LIJSON  # noqa: F401
 from .formats import NDJSON  # noqa: F401
 from .formats import PGN  # noqa: F401
+from .formats import PGN_GAMES  # noqa: F401
 from .session import Requestor  # noqa: F401
+from .session import TokenPool  # noqa: F401
 from .session import TokenSession  # noqa: F401
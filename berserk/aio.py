@@ -0,0 +1,678 @@
+# -*- coding: utf-8 -*-
+"""Asynchronous clients for the API.
+
+The clients in this module mirror those of :mod:`berserk.clients` but make
+their requests with :mod:`httpx` on an :mod:`asyncio` event loop. Methods that
+return a single result return an awaitable, while streaming methods return an
+asynchronous iterator:
+
+.. code-block:: python
+
+    >>> async with berserk.aio.AsyncClient() as client:
+    ...     user = await client.users.get_public_data('rhgrant10')
+    ...     async for game in client.games.export_multi('q7ZvsdUF'):
+    ...         print(game['id'])
+
+Install the ``async`` extra to use this module.
+"""
+import asyncio
+import logging
+import urllib
+from time import time as now
+
+import httpx
+
+from . import (
+    clients,
+    exceptions,
+    formats,
+    metrics,
+    models,
+    utils,
+)
+from .formats import (
+    NDJSON,
+    PGN,
+    TEXT,
+)
+from .session import TOO_MANY_REQUESTS
+
+__all__ = [
+    'AsyncClient',
+    'AsyncRequestor',
+    'AsyncTokenSession',
+]
+
+LOG = logging.getLogger(__name__)
+
+# sentinel for cache misses, since None is a valid result
+_MISSING = object()
+
+
+class Pending:
+    """Awaitable result of a request.
+
+    Item access is deferred until the result is awaited, so that client
+    methods such as ``return self._r.post(path)['ok']`` work unchanged.
+
+    :param coro: coroutine producing the result
+    """
+
+    def __init__(self, coro):
+        self._coro = coro
+
+    def __await__(self):
+        return self._coro.__await__()
+
+    def __getitem__(self, key):
+        return Pending(self._getitem(key))
+
+    async def _getitem(self, key):
+        return (await self._coro)[key]
+
+
+class AsyncRequestor:
+    """Encapsulates the logic for making an asynchronous request.
+
+    :param session: the session object
+    :type session: :class:`httpx.AsyncClient`
+    :param str base_url: the base URL for requests
+    :param fmt: default format handler to use
+    :type fmt: :class:`~berserk.formats.FormatHandler`
+    :param rate_limiter: scheduler used to pace the requests
+    :type rate_limiter: :class:`~berserk.session.RateLimiter`
+    :param cache: cache for the results of read-only requests
+    :type cache: :class:`~berserk.cache.ResponseCache`
+    :param single_flight: coalescer for identical concurrent GET requests
+    :type single_flight: :class:`~berserk.session.SingleFlight`
+    :param hooks: callbacks fired around each request
+    :type hooks: :class:`~berserk.metrics.Hooks`
+    :param prefetch: unused, since the event loop already reads streams
+                     while their records are consumed
+    :param parallel: unused, since streams are decoded as they are read
+                     by the event loop
+    """
+
+    def __init__(
+        self,
+        session,
+        base_url,
+        default_fmt,
+        rate_limiter=None,
+        cache=None,
+        single_flight=None,
+        hooks=None,
+        prefetch=None,
+        parallel=None,
+    ):
+        self.session = session
+        self.base_url = base_url
+        self.default_fmt = default_fmt
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.single_flight = single_flight
+        self.hooks = hooks
+
+    def request(
+        self,
+        method,
+        path,
+        *args,
+        fmt=None,
+        converter=utils.noop,
+        resume=None,
+        parallel=False,
+        compress=False,
+        **kwargs,
+    ):
+        """Make a request for a resource in a paticular format.
+
+        :param str method: HTTP verb
+        :param str path: the URL suffix
+        :param fmt: the format handler
+        :type fmt: :class:`~berserk.formats.FormatHandler`
+        :param func converter: function to handle field conversions
+        :param resume: how to resume the stream if the connection drops
+        :type resume: :class:`~berserk.session.Resume`
+        :param bool parallel: unused, like the ``parallel`` option
+        :param bool compress: unused, as httpx negotiates the compression
+                              of every response
+        :return: awaitable response data, or an async iterator over the
+                 records of a stream
+        :raises berserk.exceptions.ResponseError: if the status is >=400
+        """
+        fmt = fmt or self.default_fmt
+        converter = fmt.get_converter(converter)
+        is_stream = kwargs.pop('stream', None)
+        kwargs = self._prepare(kwargs)
+        kwargs['headers'] = fmt.headers
+        url = urllib.parse.urljoin(self.base_url, path)
+
+        LOG.debug(
+            '%s %s %s params=%s data=%s json=%s',
+            'stream' if is_stream else 'request',
+            method,
+            url,
+            kwargs.get('params'),
+            kwargs.get('data', kwargs.get('content')),
+            kwargs.get('json'),
+        )
+        if is_stream:
+            return self._stream(
+                resume, method, url, fmt, converter, *args, **kwargs
+            )
+        return Pending(
+            self._fetch(method, url, fmt, converter, *args, **kwargs)
+        )
+
+    def get(self, *args, **kwargs):
+        """Convenience method to make a GET request."""
+        return self.request('GET', *args, **kwargs)
+
+    def post(self, *args, **kwargs):
+        """Convenience method to make a POST request."""
+        return self.request('POST', *args, **kwargs)
+
+    @staticmethod
+    def _prepare(kwargs):
+        # match how requests encodes parameters: drop the ones that are None
+        # and send plain text bodies as content
+        for key in ('params', 'data'):
+            if isinstance(kwargs.get(key), dict):
+                kwargs[key] = {
+                    k: v for k, v in kwargs[key].items() if v is not None
+                }
+        if isinstance(kwargs.get('data'), (str, bytes)):
+            kwargs['content'] = kwargs.pop('data')
+        return kwargs
+
+    async def _wait(self, url):
+        if self.rate_limiter:
+            await asyncio.sleep(self.rate_limiter.reserve(url))
+
+    def _retry(self, response, attempt):
+        # whether to retry a rate limited response, after backing off
+        if response.status_code != TOO_MANY_REQUESTS:
+            return False
+        if not self.rate_limiter:
+            return False
+        self.rate_limiter.back_off()
+        LOG.warning('rate limited on %s', response.url)
+        return attempt < self.rate_limiter.retries
+
+    async def _fetch(self, method, url, fmt, converter, *args, **kwargs):
+        if method != 'GET':
+            _, result = await self._result(
+                method, url, fmt, converter, *args, **kwargs
+            )
+            return result
+
+        # GET results may come from the cache or from an identical request
+        # that is already in flight
+        key = utils.request_key(method, url, kwargs.get('params'), fmt)
+        ttl = self.cache.ttl(url) if self.cache is not None else None
+        if ttl is not None:
+            result = self.cache.get(key, _MISSING)
+            if result is not _MISSING:
+                return result
+
+        async def fetch():
+            response, result = await self._result(
+                method, url, fmt, converter, *args, **kwargs
+            )
+            if ttl is not None:
+                self.cache.set(key, result, ttl, size=len(response.content))
+            return result
+
+        if self.single_flight is None:
+            return await fetch()
+        return await self.single_flight.ado(key, fetch)
+
+    async def _result(self, method, url, fmt, converter, *args, **kwargs):
+        # send the request and parse its response, firing any hooks
+        meter = metrics.meter(self.hooks, method, url)
+        meter.start()
+        try:
+            response = await self._send(method, url, *args, **kwargs)
+            meter.received(response)
+            try:
+                await response.aread()
+            except httpx.RequestError as e:
+                raise exceptions.ApiError(e)
+            finally:
+                await response.aclose()
+            with meter.parsing(response):
+                result = converter(fmt.parse(response))
+        except Exception as e:
+            meter.finish(e)
+            raise
+        meter.finish()
+        return response, result
+
+    async def _send(self, method, url, *args, **kwargs):
+        # returns as soon as the headers of the response have arrived
+        attempt = 0
+        try:
+            while True:
+                await self._wait(url)
+                request = self.session.build_request(
+                    method, url, *args, **kwargs
+                )
+                response = await self.session.send(request, stream=True)
+                if not self._retry(response, attempt):
+                    break
+                await response.aclose()
+                attempt += 1
+            if response.is_error:
+                try:
+                    await response.aread()
+                finally:
+                    await response.aclose()
+                raise exceptions.ResponseError(response)
+        except httpx.RequestError as e:
+            raise exceptions.ApiError(e)
+        return response
+
+    async def _stream(
+        self, resume, method, url, fmt, converter, *args, **kwargs
+    ):
+        if resume:
+            resume.start()
+        attempt = 0
+        while True:
+            try:
+                async for record in self._records(
+                    method, url, fmt, *args, **kwargs
+                ):
+                    if resume is None or resume.track(record):
+                        attempt = 0
+                        yield converter(record)
+                return
+            except exceptions.ResponseError:
+                raise
+            except exceptions.ApiError:
+                if resume is None or attempt >= resume.retries:
+                    raise
+                delay = resume.backoff * 2 ** attempt
+                LOG.warning('stream %s %s interrupted, resuming', method, url)
+                await asyncio.sleep(delay)
+                attempt += 1
+                kwargs['params'] = resume.params(kwargs.get('params'))
+
+    async def _records(self, method, url, fmt, *args, **kwargs):
+        parser = fmt.stream_parser()
+        meter = metrics.meter(self.hooks, method, url, is_stream=True)
+        meter.start()
+        error = None
+        try:
+            response = await self._send(method, url, *args, **kwargs)
+            meter.received(response)
+            try:
+                chunks = meter.aread(response.aiter_bytes())
+                async for chunk in chunks:
+                    with meter.parsing():
+                        records = parser.feed(chunk)
+                    for record in records:
+                        meter.record(record)
+                        yield record
+            except httpx.RequestError as e:
+                raise exceptions.ApiError(e)
+            finally:
+                await response.aclose()
+            with meter.parsing():
+                records = parser.close()
+            for record in records:
+                meter.record(record)
+                yield record
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            meter.finish(error)
+
+
+class AsyncTokenSession(httpx.AsyncClient):
+    """Asynchronous session capable of personal API token authentication.
+
+    :param str token: personal API token
+    :param kwargs: passed on to :class:`httpx.AsyncClient`
+    """
+
+    def __init__(self, token, **kwargs):
+        kwargs.setdefault('timeout', None)
+        super().__init__(**kwargs)
+        self.token = token
+        self.headers['Authorization'] = f'Bearer {token}'
+
+
+class AsyncBaseClient(clients.BaseClient):
+    requestor_class = AsyncRequestor
+
+    async def _save(self, to, method, path, fmt, progress, count, **kwargs):
+        # the file is written from the event loop, in large chunks
+        with formats.open_output(to) as file:
+            raw = formats.RawHandler(
+                fmt, file, progress=progress, count=count
+            )
+            copied = self._r.request(
+                method, path, fmt=raw, stream=True, **kwargs
+            )
+            async for result in copied:
+                pass
+        return result
+
+
+class AsyncFmtClient(AsyncBaseClient, clients.FmtClient):
+    pass
+
+
+class AsyncClient(AsyncBaseClient):
+    """Main touchpoint for the asynchronous API.
+
+    The sub-clients mirror those of :class:`~berserk.clients.Client` and all
+    of them share the connection pool of a single session. Use the client as
+    an async context manager, or call :meth:`aclose`, to release the pool.
+
+    :param session: async session, authenticated as needed
+    :type session: :class:`httpx.AsyncClient`
+    :param str base_url: base API URL to use (if other than the default)
+    :param bool pgn_as_default: ``True`` if PGN should be the default format
+                                for game exports when possible
+    :param rate_limiter: scheduler shared by all sub-clients to pace their
+                         requests
+    :type rate_limiter: :class:`~berserk.session.RateLimiter`
+    :param cache: cache shared by all sub-clients for the results of
+                  read-only requests
+    :type cache: :class:`~berserk.cache.ResponseCache`
+    :param single_flight: coalescer shared by all sub-clients so identical
+                          concurrent GET requests share one response
+    :type single_flight: :class:`~berserk.session.SingleFlight`
+    :param hooks: callbacks fired around each request, such as a
+                  :class:`~berserk.metrics.MetricsCollector`
+    :type hooks: :class:`~berserk.metrics.Hooks`
+    """
+
+    def __init__(
+        self,
+        session=None,
+        base_url=None,
+        pgn_as_default=False,
+        rate_limiter=None,
+        cache=None,
+        single_flight=None,
+        hooks=None,
+    ):
+        session = session or httpx.AsyncClient(timeout=None)
+        opts = {
+            'rate_limiter': rate_limiter,
+            'cache': cache,
+            'single_flight': single_flight,
+            'hooks': hooks,
+        }
+        super().__init__(session, base_url, **opts)
+        self.session = session
+        self.account = Account(session, base_url, **opts)
+        self.users = Users(session, base_url, **opts)
+        self.relations = Relations(session, base_url, **opts)
+        self.teams = Teams(session, base_url, **opts)
+        self.games = Games(
+            session, base_url, pgn_as_default=pgn_as_default, **opts
+        )
+        self.challenges = Challenges(session, base_url, **opts)
+        self.board = Board(session, base_url, **opts)
+        self.bots = Bots(session, base_url, **opts)
+        self.tournaments = Tournaments(
+            session, base_url, pgn_as_default=pgn_as_default, **opts
+        )
+        self.broadcasts = Broadcasts(session, base_url, **opts)
+        self.simuls = Simuls(session, base_url, **opts)
+        self.studies = Studies(session, base_url, **opts)
+        self.tv = TV(session, base_url, **opts)
+        self.puzzles = Puzzles(session, base_url, **opts)
+        self.opening_explorer = OpeningExplorer(
+            session, clients.EXPLORER_URL, **opts
+        )
+
+    async def aclose(self):
+        """Close the session and its connection pool."""
+        await self.session.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+class Account(AsyncBaseClient, clients.Account):
+    """Client for account-related endpoints."""
+
+
+class Users(AsyncBaseClient, clients.Users):
+    """Client for user-related endpoints."""
+
+
+class Relations(AsyncBaseClient, clients.Relations):
+    """Client for relations-related endpoints."""
+
+
+class Teams(AsyncBaseClient, clients.Teams):
+    """Client for team-related endpoints."""
+
+
+class Games(AsyncFmtClient, clients.Games):
+    """Client for games-related endpoints."""
+
+    def export_multi(
+        self,
+        *game_ids,
+        as_pgn=None,
+        moves=None,
+        tags=None,
+        clocks=None,
+        evals=None,
+        opening=None,
+        to=None,
+        progress=None,
+        count=False,
+    ):
+        """Get multiple games by ID.
+
+        :param game_ids: one or more game IDs to export
+        :param bool as_pgn: whether to return the game in PGN format
+        :param bool moves: whether to include the PGN moves
+        :param bool tags: whether to include the PGN tags
+        :param bool clocks: whether to include clock comments in the PGN moves
+        :param bool evals: whether to include analysis evaluation comments in
+                           the PGN moves when available
+        :param bool opening: whether to include the opening name
+        :param to: path of a file, or binary file object, to copy the
+                   export to as is instead of parsing it
+        :param func progress: with ``to``, function called with the
+                              :class:`~berserk.formats.Progress` of the copy
+                              after each chunk
+        :param bool count: with ``to``, whether to count the games copied
+        :return: async iterator over the exported games, as JSON or PGN, or
+                 an awaitable final :class:`~berserk.formats.Progress` of the
+                 copy with ``to``
+        """
+        path = 'games/export/_ids'
+        params = {
+            'moves': moves,
+            'tags': tags,
+            'clocks': clocks,
+            'evals': evals,
+            'opening': opening,
+        }
+        payload = ','.join(game_ids)
+        fmt = PGN if self._use_pgn(as_pgn) else NDJSON
+        if to is not None:
+            return self._save(
+                to, 'POST', path, fmt, progress, count,
+                params=params, data=payload,
+            )
+        return self._r.post(
+            path,
+            params=params,
+            data=payload,
+            fmt=fmt,
+            stream=True,
+            converter=models.Game.convert,
+        )
+
+    def get_among_players(self, *usernames):
+        """Get the games currently being played among players.
+
+        Note this will not includes games where only one player is in the given
+        list of usernames.
+
+        :param usernames: two or more usernames
+        :return: async iterator over all games played among the given players
+        """
+        path = 'api/stream/games-by-users'
+        payload = ','.join(usernames)
+        return self._r.post(
+            path,
+            data=payload,
+            fmt=NDJSON,
+            stream=True,
+            converter=models.Game.convert,
+        )
+
+
+class Challenges(AsyncBaseClient, clients.Challenges):
+    """Client for challenge-related endpoints."""
+
+
+class Board(AsyncBaseClient, clients.Board):
+    """Client for physical board or external application endpoints."""
+
+    def stream_incoming_events(self):
+        """Get your realtime stream of incoming events.
+
+        :return: stream of incoming events
+        :rtype: async iterator over the stream of events
+        """
+        path = 'api/stream/event'
+        return self._r.get(path, stream=True)
+
+    async def seek(
+        self,
+        time,
+        increment,
+        rated=False,
+        variant='standard',
+        color='random',
+        rating_range=None,
+    ):
+        """Create a public seek to start a game with a random opponent.
+
+        :param int time: intial clock time in minutes
+        :param int increment: clock increment in minutes
+        :param bool rated: whether the game is rated (impacts ratings)
+        :param str variant: game variant to use
+        :param str color: color to play
+        :param rating_range: range of opponent ratings
+        :return: duration of the seek
+        :rtype: float
+        """
+        if isinstance(rating_range, (list, tuple)):
+            low, high = rating_range
+            rating_range = f'{low}-{high}'
+
+        path = '/api/board/seek'
+        payload = {
+            'rated': str(bool(rated)).lower(),
+            'time': time,
+            'increment': increment,
+            'variant': variant,
+            'color': color,
+            'ratingRange': rating_range or '',
+        }
+
+        # we time the seek
+        start = now()
+
+        # just keep reading to keep the search going
+        stream = self._r.post(path, data=payload, fmt=TEXT, stream=True)
+        async for line in stream:
+            pass
+
+        # and return the time elapsed
+        return now() - start
+
+    def stream_game_state(self, game_id):
+        """Get the stream of events for a board game.
+
+        :param str game_id: ID of a game
+        :return: async iterator over game states
+        """
+        path = f'api/board/game/stream/{game_id}'
+        return self._r.get(
+            path, stream=True, converter=models.GameState.convert
+        )
+
+
+class Bots(AsyncBaseClient, clients.Bots):
+    """Client for bot-related endpoints."""
+
+    def stream_incoming_events(self):
+        """Get your realtime stream of incoming events.
+
+        :return: stream of incoming events
+        :rtype: async iterator over the stream of events
+        """
+        path = 'api/stream/event'
+        return self._r.get(path, stream=True)
+
+    def get_online(self, nb):
+        """Stream the online bot users, as ndjson.
+
+        :param int nb: how many bot users to fetch
+        :return: online bots
+        :rtype: async iterator
+        """
+        path = 'api/bot/online'
+        params = {'nb': nb}
+        return self._r.get(
+            path, params=params, stream=True, converter=models.User.convert
+        )
+
+    def stream_game_state(self, game_id):
+        """Get the stream of events for a bot game.
+
+        :param str game_id: ID of a game
+        :return: async iterator over game states
+        """
+        path = f'api/bot/game/stream/{game_id}'
+        return self._r.get(
+            path, stream=True, converter=models.GameState.convert
+        )
+
+
+class Tournaments(AsyncFmtClient, clients.Tournaments):
+    """Client for tournament-related endpoints."""
+
+
+class Broadcasts(AsyncBaseClient, clients.Broadcasts):
+    """Broadcast of one or more games."""
+
+
+class Simuls(AsyncBaseClient, clients.Simuls):
+    """Simultaneous exhibitions - one vs many."""
+
+
+class Studies(AsyncBaseClient, clients.Studies):
+    """Study chess the Lichess way."""
+
+
+class TV(AsyncFmtClient, clients.TV):
+    """Chess TV of Lichess."""
+
+
+class Puzzles(AsyncBaseClient, clients.Puzzles):
+    """Chess puzzles."""
+
+
+class OpeningExplorer(AsyncBaseClient, clients.OpeningExplorer):
+    """Chess openings explorer."""
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""Clock times and evaluations of exported games as NumPy arrays.
+
+Games exported with ``clocks=True`` and ``evals=True`` carry a clock time and
+an evaluation for each move, either in the ``clocks`` and ``analysis`` fields
+of their JSON or in the ``[%clk]`` and ``[%eval]`` comments of their PGN.
+The functions in this module extract them for many games at once: the
+annotations of a whole batch of games are converted to numbers by NumPy in
+one go, then sliced into arrays for each game.
+
+.. code-block:: python
+
+    >>> games = client.games.export_by_player('foo', clocks=True, evals=True)
+    >>> for game, arrays in berserk.arrays.iter_game_arrays(games):
+    ...     print(game['id'], arrays.clocks.mean(), arrays.evals[-1])
+
+Install the ``arrays`` extra to use this module.
+"""
+import collections
+import itertools
+import re
+
+import numpy as np
+
+from . import pgn
+from . import records
+
+__all__ = [
+    'GameArrays',
+    'game_arrays',
+    'iter_game_arrays',
+]
+
+#: Arrays of the annotations of the moves of one game, one item per move:
+#: remaining clock times in seconds (``nan`` when missing), evaluations in
+#: pawns (``nan`` when missing or when a mate was found) and moves to mate
+#: (``0`` when none was found). Arrays of annotations that a game has none of
+#: are empty.
+GameArrays = collections.namedtuple('GameArrays', 'clocks evals mates')
+
+_CLOCK = re.compile(r'\[%clk\s+(\d+:\d+:\d+(?:\.\d*)?)\]')
+_EVAL = re.compile(r'\[%eval\s+(#?-?\d+(?:\.\d*)?)')
+# the lines of tag pairs at the start of a game
+_TAGS = re.compile(r'\A(?:\s*\[.*\][ \t\r]*(?:\n|\Z))*')
+_SECONDS = np.array([3600.0, 60.0, 1.0])
+
+
+def game_arrays(games):
+    """Return the clock times and evaluations of games as arrays.
+
+    :param games: games as JSON objects or compact records, PGN text, or
+                  :class:`~berserk.pgn.PgnGame` objects
+    :type games: iterable
+    :return: the arrays of each game, in order
+    :rtype: list of :class:`GameArrays`
+    """
+    games = list(games)
+    texts = {
+        index: _movetext(game)
+        for index, game in enumerate(games)
+        if not isinstance(game, (dict, records.Record))
+    }
+    parsed = dict(zip(texts, _parse_pgn(list(texts.values()))))
+    return [
+        parsed[index] if index in parsed else _parse_json(game)
+        for index, game in enumerate(games)
+    ]
+
+
+def iter_game_arrays(games, batch_size=1000):
+    """Yield games along with their clock times and evaluations as arrays.
+
+    Games are consumed in batches, so this suits long export streams.
+
+    :param games: games as JSON objects or compact records, PGN text, or
+                  :class:`~berserk.pgn.PgnGame` objects
+    :type games: iterable
+    :param int batch_size: number of games converted at a time
+    :return: iterator over pairs of a game and its :class:`GameArrays`
+    """
+    games = iter(games)
+    while True:
+        batch = list(itertools.islice(games, batch_size))
+        if not batch:
+            return
+        yield from zip(batch, game_arrays(batch))
+
+
+def _movetext(game):
+    if isinstance(game, pgn.PgnGame):
+        return game.movetext
+    if not isinstance(game, str):
+        game = str(game, 'utf-8')
+    return _TAGS.sub('', game, count=1)
+
+
+def _parse_json(game):
+    clocks = np.asarray(game.get('clocks', ()), dtype=float) / 100
+    analysis = game.get('analysis', ())
+    count = len(analysis)
+    evals = np.fromiter(
+        (move.get('eval', np.nan) for move in analysis), float, count
+    ) / 100
+    mates = np.fromiter(
+        (move.get('mate', 0) for move in analysis), np.int32, count
+    )
+    return GameArrays(clocks, evals, mates)
+
+
+def _parse_pgn(texts):
+    # the annotations of each move of the main line, so that moves without
+    # one keep their place
+    plies = [
+        [' '.join(comments) for comments in pgn.main_line(text)[1]]
+        for text in texts
+    ]
+
+    # numbers are parsed by NumPy from a single string of all the values
+    clocks, clock_counts = _find_all(_CLOCK, plies, 'nan:nan:nan')
+    clocks = _numbers(' '.join(clocks).replace(':', ' ')).reshape(-1, 3)
+    clocks = clocks @ _SECONDS
+
+    evals, eval_counts = _find_all(_EVAL, plies, 'nan')
+    is_mate = np.array([value[0] == '#' for value in evals], dtype=bool)
+    values = _numbers(' '.join(evals).replace('#', ''))
+    mates = np.where(is_mate, values, 0).astype(np.int32)
+    pawns = np.where(is_mate, np.nan, values)
+
+    return [
+        GameArrays(*arrays)
+        for arrays in zip(
+            _split(clocks, clock_counts),
+            _split(pawns, eval_counts),
+            _split(mates, eval_counts),
+        )
+    ]
+
+
+def _numbers(text):
+    if not text:
+        return np.empty(0)
+    return np.fromstring(text, sep=' ')
+
+
+def _find_all(pattern, games, missing):
+    # the value of each move in one flat list, with a filler for the moves
+    # without one, plus the number of moves of each game that has any
+    found = []
+    counts = []
+    for plies in games:
+        matches = [pattern.search(comment) for comment in plies]
+        if not any(matches):
+            counts.append(0)
+            continue
+        found.extend(
+            missing if match is None else match.group(1)
+            for match in matches
+        )
+        counts.append(len(matches))
+    return found, counts
+
+
+def _split(array, counts):
+    return np.split(array, np.cumsum(counts)[:-1]) if counts else []
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+import collections
+import json
+import re
+import sqlite3
+import threading
+import time
+import urllib
+
+from . import utils
+
+
+class ResponseCache:
+    """In-memory cache of parsed responses for read-only endpoints.
+
+    Only non-streaming GET requests to endpoints with a TTL are cached. The
+    entries are keyed on the method, URL, parameters, and format, and hold
+    the parsed and converted result so that a hit skips both the request
+    and the decoding. Least recently used entries are evicted once either
+    the number of entries or the total size of the response bodies they
+    came from exceeds its cap.
+
+    .. note::
+
+        Cached results are shared between callers. Treat them as read-only.
+
+    :param dict ttls: seconds to keep results by endpoint path pattern;
+                      these are merged over :attr:`DEFAULT_TTLS` and a TTL of
+                      ``None`` disables caching for a pattern
+    :param int max_entries: maximum number of cached results
+    :param int max_bytes: maximum total size of the cached response bodies
+    :param func clock: monotonic clock returning seconds
+    """
+
+    #: default TTLs in seconds, by regular expression of the URL path
+    DEFAULT_TTLS = {
+        r'api/user/[^/]+': 300,
+        r'api/user/[^/]+/rating-history': 3600,
+        # the lists of all teams and of search results change more often
+        r'api/team/(?!all$|search$)[^/]+': 3600,
+        r'api/puzzle/daily': 3600,
+        r'masters': 86400,
+    }
+
+    def __init__(
+        self,
+        ttls=None,
+        max_entries=1024,
+        max_bytes=32 * 2 ** 20,
+        clock=time.monotonic,
+    ):
+        ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.ttls = [
+            (re.compile(pattern), ttl)
+            for pattern, ttl in ttls.items()
+            if ttl is not None
+        ]
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def ttl(self, url):
+        """Return the TTL for a URL.
+
+        :param str url: full URL of a request
+        :return: seconds to keep the result, or ``None`` if the URL should
+                 not be cached
+        """
+        path = urllib.parse.urlsplit(url).path.lstrip('/')
+        for pattern, ttl in self.ttls:
+            if pattern.fullmatch(path):
+                return ttl
+        return None
+
+    #: function returning the cache key of a request
+    key = staticmethod(utils.request_key)
+
+    def get(self, key, default=None):
+        """Return a cached result, if present and fresh.
+
+        :param tuple key: cache key
+        :param default: value to return on a miss
+        :return: the cached result or ``default``
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl, size=0):
+        """Cache a result.
+
+        :param tuple key: cache key
+        :param value: the parsed result
+        :param float ttl: seconds to keep the result
+        :param int size: size in bytes of the response the result came from
+        """
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self.clock() + ttl, value, size)
+            self.size += size
+            while (
+                len(self._entries) > self.max_entries
+                or self.size > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all cached results."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """Return the counters of the cache.
+
+        :return: hits, misses, evictions, entries, and size in bytes
+        :rtype: dict
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'size': self.size,
+        }
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self.size -= size
+
+
+class GameStore:
+    """Persistent store of finished games, backed by SQLite.
+
+    A finished game never changes, so once exported it can be kept on disk
+    and reused by later runs. Games are stored by ID and by *variant*, which
+    identifies the format and export flags they were requested with, since
+    those change the content of the export. Games that are still in
+    progress are never stored.
+
+    :param str path: path of the database file, created if needed
+    """
+
+    #: statuses of games that have not finished yet
+    UNFINISHED = frozenset(['created', 'started'])
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS games ('
+                ' id TEXT NOT NULL,'
+                ' variant TEXT NOT NULL,'
+                ' pgn INTEGER NOT NULL,'
+                ' data TEXT NOT NULL,'
+                ' PRIMARY KEY (id, variant))'
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM games').fetchone()[0]
+
+    @staticmethod
+    def variant(as_pgn, params):
+        """Return the variant key for a format and export parameters.
+
+        :param bool as_pgn: whether the games are exported as PGN
+        :param dict params: export parameters
+        :return: variant key
+        :rtype: str
+        """
+        flags = '&'.join(
+            f'{k}={v}' for k, v in sorted(params.items()) if v is not None
+        )
+        return f'{"pgn" if as_pgn else "json"};{flags}'
+
+    @staticmethod
+    def identifies(as_pgn, params):
+        """Return whether the games of an export carry their ID.
+
+        PGN exported without tags has no ``Site`` tag, so such games can
+        neither be stored nor matched with the IDs requested.
+
+        :param bool as_pgn: whether the games are exported as PGN
+        :param dict params: export parameters
+        :rtype: bool
+        """
+        return not as_pgn or params.get('tags') is not False
+
+    @staticmethod
+    def game_id(game):
+        """Return the ID of a game.
+
+        :param game: game as a JSON object or PGN text
+        :return: game ID
+        :rtype: str
+        """
+        if isinstance(game, dict):
+            return game['id']
+        return utils.pgn_game_id(game)
+
+    @classmethod
+    def is_finished(cls, game):
+        """Return whether a game has finished.
+
+        :param game: game as a JSON object or PGN text
+        :rtype: bool
+        """
+        if isinstance(game, dict):
+            return game.get('status') not in cls.UNFINISHED
+        return utils.pgn_tags(game).get('Result', '*') != '*'
+
+    def get(self, game_id, variant):
+        """Return a stored game.
+
+        :param str game_id: ID of the game
+        :param str variant: variant key of the export
+        :return: the game as a JSON object or PGN text, or ``None``
+        """
+        return self.get_many([game_id], variant).get(game_id)
+
+    def get_many(self, game_ids, variant):
+        """Return the stored games among the given IDs.
+
+        :param list game_ids: IDs of the games
+        :param str variant: variant key of the export
+        :return: the games found, by ID
+        :rtype: dict
+        """
+        game_ids = list(game_ids)
+        found = {}
+        # stay well within the limit on the number of SQL parameters
+        for i in range(0, len(game_ids), 500):
+            batch = game_ids[i:i + 500]
+            marks = ','.join('?' * len(batch))
+            with self._lock:
+                rows = self._db.execute(
+                    'SELECT id, pgn, data FROM games'
+                    f' WHERE variant = ? AND id IN ({marks})',
+                    [variant, *batch],
+                ).fetchall()
+            for game_id, pgn, data in rows:
+                found[game_id] = data if pgn else json.loads(data)
+        return found
+
+    def put(self, game, variant):
+        """Store a game, if it has finished.
+
+        The game must not have had its fields converted yet.
+
+        :param game: game as a JSON object or PGN text
+        :param str variant: variant key of the export
+        :return: whether the game was stored
+        :rtype: bool
+        """
+        if not self.is_finished(game):
+            return False
+        pgn = not isinstance(game, dict)
+        data = game if pgn else json.dumps(game)
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?)',
+                (self.game_id(game), variant, pgn, data),
+            )
+        return True
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._db.close()
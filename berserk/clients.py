@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
+import collections
 from time import time as now
 
 import requests
 from deprecated import deprecated
 
+from . import formats
 from . import models
 from .formats import (
     JSON,
@@ -11,8 +13,14 @@ from .formats import (
     NDJSON,
     PGN,
     TEXT,
+    PgnHandler,
+    RawHandler,
+)
+from .session import (
+    Requestor,
+    Resume,
+    _mount_given_pools,
 )
-from .session import Requestor
 
 __all__ = [
     'Client',
@@ -36,10 +44,45 @@ __all__ = [
 # Base URL for the API
 API_URL = 'https://lichess.org/'
 
+# Base URL for the opening explorer
+EXPLORER_URL = 'https://explorer.lichess.ovh/'
+
 
 class BaseClient:
-    def __init__(self, session, base_url=None):
-        self._r = Requestor(session, base_url or API_URL, default_fmt=JSON)
+    #: class used to make the requests of the client
+    requestor_class = Requestor
+
+    def __init__(
+        self,
+        session,
+        base_url=None,
+        rate_limiter=None,
+        cache=None,
+        single_flight=None,
+        hooks=None,
+        prefetch=None,
+        parallel=None,
+    ):
+        self._r = self.requestor_class(
+            session,
+            base_url or API_URL,
+            default_fmt=JSON,
+            rate_limiter=rate_limiter,
+            cache=cache,
+            single_flight=single_flight,
+            hooks=hooks,
+            prefetch=prefetch,
+            parallel=parallel,
+        )
+
+    def _save(self, to, method, path, fmt, progress, count, **kwargs):
+        # copy a stream to a file as is, instead of parsing it
+        with formats.open_output(to) as file:
+            raw = RawHandler(fmt, file, progress=progress, count=count)
+            copied = self._r.request(
+                method, path, fmt=raw, stream=True, compress=True, **kwargs
+            )
+            return collections.deque(copied, maxlen=1)[0]
 
 
 class FmtClient(BaseClient):
@@ -53,16 +96,42 @@ class FmtClient(BaseClient):
                                 to ``False`` and is used as a fallback when
                                 ``as_pgn`` is left as ``None`` for methods that
                                 support it.
+    :param kwargs: passed on to :class:`BaseClient`
     """
 
-    def __init__(self, session, base_url=None, pgn_as_default=False):
-        super().__init__(session, base_url)
+    def __init__(self, session, base_url=None, pgn_as_default=False, **kwargs):
+        super().__init__(session, base_url, **kwargs)
         self.pgn_as_default = pgn_as_default
 
     def _use_pgn(self, as_pgn=None):
         # helper to merge default with provided arg
         return as_pgn if as_pgn is not None else self.pgn_as_default
 
+    def _pgn_fmt(self, as_pgn=None, default=NDJSON):
+        # helper to pick the format, which can be a PGN handler
+        as_pgn = self._use_pgn(as_pgn)
+        if isinstance(as_pgn, PgnHandler):
+            return as_pgn
+        return PGN if as_pgn else default
+
+    @staticmethod
+    def _json_fmt(fields=None, resume=None, intern=False):
+        # helper to project streamed games, keeping the fields resuming
+        # needs, and to intern their strings
+        fmt = NDJSON
+        if fields is not None:
+            fields = list(fields)
+            if resume and resume.param is not None:
+                fields.extend(
+                    field
+                    for field in ('id', 'createdAt')
+                    if field not in fields
+                )
+            fmt = fmt.project(fields)
+        if intern:
+            fmt = fmt.interning(None if intern is True else intern)
+        return fmt
+
 
 class Client(BaseClient):
     """Main touchpoint for the API.
@@ -92,29 +161,104 @@ class Client(BaseClient):
                                 to ``False`` and is used as a fallback when
                                 ``as_pgn`` is left as ``None`` for methods that
                                 support it.
+    :param rate_limiter: scheduler shared by all sub-clients to pace their
+                         requests (see :class:`~berserk.session.RateLimiter`)
+    :type rate_limiter: :class:`~berserk.session.RateLimiter`
+    :param pool_maxsize: if given, mount connection pools of this size for
+                         both the API and the opening explorer hosts (see
+                         :func:`~berserk.session.mount_pools`); the pools
+                         are also mounted when any of ``pool_block``,
+                         ``keepalive`` or ``socket_options`` is given
+    :type pool_maxsize: int or dict
+    :param cache: cache shared by all sub-clients for the results of
+                  read-only requests
+    :type cache: :class:`~berserk.cache.ResponseCache`
+    :param game_store: persistent store for finished games exported by
+                       :class:`~berserk.clients.Games`
+    :type game_store: :class:`~berserk.cache.GameStore`
+    :param single_flight: coalescer shared by all sub-clients so identical
+                          concurrent GET requests share one response
+    :type single_flight: :class:`~berserk.session.SingleFlight`
+    :param hooks: callbacks fired around each request, such as a
+                  :class:`~berserk.metrics.MetricsCollector`
+    :type hooks: :class:`~berserk.metrics.Hooks`
+    :param int prefetch: if given, streams are read and parsed by a
+                         background thread while their records are
+                         consumed, up to this many chunks ahead
+    :param parallel: pool of processes decoding and converting long JSON
+                     game exports, by :meth:`Games.export_by_player`,
+                     :meth:`Games.export_multi` and
+                     :meth:`Tournaments.export_games`; live streams are
+                     always decoded as they arrive
+    :type parallel: :class:`~berserk.formats.ParallelDecoder`
+    :param bool pool_block: if given, whether the pools wait for a free
+                            connection rather than opening one beyond their
+                            size
+    :param bool keepalive: if given, whether the pools enable TCP keep-alive
+                           probes
+    :param list socket_options: if given, ``(level, option, value)`` tuples
+                                set on each new connection of the pools
     """
 
-    def __init__(self, session=None, base_url=None, pgn_as_default=False):
+    def __init__(
+        self,
+        session=None,
+        base_url=None,
+        pgn_as_default=False,
+        rate_limiter=None,
+        pool_maxsize=None,
+        cache=None,
+        game_store=None,
+        single_flight=None,
+        hooks=None,
+        prefetch=None,
+        parallel=None,
+        pool_block=None,
+        keepalive=None,
+        socket_options=None,
+    ):
         session = session or requests.Session()
-        super().__init__(session, base_url)
-        self.account = Account(session, base_url)
-        self.users = Users(session, base_url)
-        self.relations = Relations(session, base_url)
-        self.teams = Teams(session, base_url)
-        self.games = Games(session, base_url, pgn_as_default=pgn_as_default)
-        self.challenges = Challenges(session, base_url)
-        self.board = Board(session, base_url)
-        self.bots = Bots(session, base_url)
+        _mount_given_pools(
+            session,
+            urls=(base_url or API_URL, EXPLORER_URL),
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            keepalive=keepalive,
+            socket_options=socket_options,
+        )
+        opts = {
+            'rate_limiter': rate_limiter,
+            'cache': cache,
+            'single_flight': single_flight,
+            'hooks': hooks,
+            'prefetch': prefetch,
+            'parallel': parallel,
+        }
+        super().__init__(session, base_url, **opts)
+        self.account = Account(session, base_url, **opts)
+        self.users = Users(session, base_url, **opts)
+        self.relations = Relations(session, base_url, **opts)
+        self.teams = Teams(session, base_url, **opts)
+        self.games = Games(
+            session,
+            base_url,
+            pgn_as_default=pgn_as_default,
+            game_store=game_store,
+            **opts,
+        )
+        self.challenges = Challenges(session, base_url, **opts)
+        self.board = Board(session, base_url, **opts)
+        self.bots = Bots(session, base_url, **opts)
         self.tournaments = Tournaments(
-            session, base_url, pgn_as_default=pgn_as_default
+            session, base_url, pgn_as_default=pgn_as_default, **opts
         )
-        self.broadcasts = Broadcasts(session, base_url)
-        self.simuls = Simuls(session, base_url)
-        self.studies = Studies(session, base_url)
-        self.tv = TV(session, base_url)
-        self.puzzles = Puzzles(session, base_url)
+        self.broadcasts = Broadcasts(session, base_url, **opts)
+        self.simuls = Simuls(session, base_url, **opts)
+        self.studies = Studies(session, base_url, **opts)
+        self.tv = TV(session, base_url, **opts)
+        self.puzzles = Puzzles(session, base_url, **opts)
         self.opening_explorer = OpeningExplorer(
-            session, 'https://explorer.lichess.ovh/'
+            session, EXPLORER_URL, **opts
         )
 
 
@@ -200,6 +344,7 @@ class Users(BaseClient):
             fmt=NDJSON,
             stream=True,
             converter=models.PuzzleActivity.convert,
+            compress=True,
         )
 
     def get_realtime_statuses(self, *user_ids):
@@ -544,7 +689,31 @@ class Teams(BaseClient):
 
 
 class Games(FmtClient):
-    """Client for games-related endpoints."""
+    """Client for games-related endpoints.
+
+    Finished games exported by :meth:`export` and :meth:`export_multi` can be
+    kept in a persistent store, so that later exports of the same games with
+    the same flags do not download them again.
+
+    :param session: request session, authenticated as needed
+    :type session: :class:`requests.Session`
+    :param str base_url: base URL for the API
+    :param bool pgn_as_default: ``True`` if PGN should be the default format
+    :param game_store: store for finished games
+    :type game_store: :class:`~berserk.cache.GameStore`
+    :param kwargs: passed on to :class:`BaseClient`
+    """
+
+    def __init__(
+        self,
+        session,
+        base_url=None,
+        pgn_as_default=False,
+        game_store=None,
+        **kwargs,
+    ):
+        super().__init__(session, base_url, pgn_as_default, **kwargs)
+        self.game_store = game_store
 
     def export(
         self,
@@ -579,10 +748,19 @@ class Games(FmtClient):
             'opening': opening,
             'literate': literate,
         }
-        fmt = PGN if self._use_pgn(as_pgn) else JSON
-        return self._r.get(
-            path, params=params, fmt=fmt, converter=models.Game.convert
-        )
+        as_pgn = self._use_pgn(as_pgn)
+        fmt = PGN if as_pgn else JSON
+        if not self._stores(as_pgn, params):
+            return self._r.get(
+                path, params=params, fmt=fmt, converter=models.Game.convert
+            )
+
+        variant = self.game_store.variant(as_pgn, params)
+        game = self.game_store.get(game_id, variant)
+        if game is None:
+            game = self._r.get(path, params=params, fmt=fmt)
+            self.game_store.put(game, variant)
+        return game if as_pgn else models.Game.convert(game)
 
     def export_ongoing(
         self,
@@ -647,11 +825,21 @@ class Games(FmtClient):
         tags=None,
         evals=None,
         opening=None,
+        resume=False,
+        to=None,
+        progress=None,
+        count=False,
+        fields=None,
+        intern=False,
     ):
         """Get games by player.
 
         :param str username: which player's games to return
-        :param bool as_pgn: whether to return the game in PGN format
+        :param as_pgn: whether to return the games in PGN format, or the PGN
+                       handler to use, such as
+                       :data:`~berserk.formats.PGN_GAMES` for lazily parsed
+                       games
+        :type as_pgn: bool or :class:`~berserk.formats.PgnHandler`
         :param int since: lowerbound on the game timestamp
         :param int until: upperbound on the game timestamp
         :param int max: limit the number of games returned
@@ -670,7 +858,27 @@ class Games(FmtClient):
                            the PGN moves when available
         :param bool opening: whether to include the opening name
         :param bool literate: whether to include literate the PGN
-        :return: iterator over the exported games, as JSON or PGN
+        :param resume: whether to resume the export if the connection drops,
+                       either ``True`` or a :class:`~berserk.session.Resume`;
+                       ignored with ``to``
+        :param to: path of a file, or binary file object, to copy the
+                   export to as is instead of parsing it
+        :param func progress: with ``to``, function called with the
+                              :class:`~berserk.formats.Progress` of the copy
+                              after each chunk
+        :param bool count: with ``to``, whether to count the games copied
+        :param fields: names of the fields to keep in the JSON games, such as
+                       ``['id', 'players', 'winner']``; the others are
+                       dropped as the games are decoded. The fields resuming
+                       relies on are kept as well.
+        :type fields: list of str
+        :param intern: whether to share the repeated strings of the JSON
+                       games, such as usernames and opening names, between
+                       games, or the interner to share them with
+        :type intern: bool or :class:`~berserk.formats.Interner`
+        :return: iterator over the exported games, as JSON or PGN, or the
+                 final :class:`~berserk.formats.Progress` of the copy with
+                 ``to``
         """
         path = f'api/games/user/{username}'
         params = {
@@ -687,9 +895,24 @@ class Games(FmtClient):
             'evals': evals,
             'opening': opening,
         }
-        fmt = PGN if self._use_pgn(as_pgn) else NDJSON
+        if resume is True:
+            resume = Resume('until')
+        fmt = self._pgn_fmt(
+            as_pgn, default=self._json_fmt(fields, resume, intern)
+        )
+        if to is not None:
+            return self._save(
+                to, 'GET', path, fmt, progress, count, params=params
+            )
         return self._r.get(
-            path, params=params, fmt=fmt, converter=models.Game.convert
+            path,
+            params=params,
+            fmt=fmt,
+            stream=True,
+            resume=resume,
+            converter=models.Game.convert,
+            parallel=True,
+            compress=True,
         )
 
     def export_multi(
@@ -701,6 +924,9 @@ class Games(FmtClient):
         clocks=None,
         evals=None,
         opening=None,
+        to=None,
+        progress=None,
+        count=False,
     ):
         """Get multiple games by ID.
 
@@ -712,7 +938,15 @@ class Games(FmtClient):
         :param bool evals: whether to include analysis evaluation comments in
                            the PGN moves when available
         :param bool opening: whether to include the opening name
-        :return: iterator over the exported games, as JSON or PGN
+        :param to: path of a file, or binary file object, to copy the
+                   export to as is instead of parsing it
+        :param func progress: with ``to``, function called with the
+                              :class:`~berserk.formats.Progress` of the copy
+                              after each chunk
+        :param bool count: with ``to``, whether to count the games copied
+        :return: iterator over the exported games, as JSON or PGN, or the
+                 final :class:`~berserk.formats.Progress` of the copy with
+                 ``to``
         """
         path = 'games/export/_ids'
         params = {
@@ -723,16 +957,55 @@ class Games(FmtClient):
             'opening': opening,
         }
         payload = ','.join(game_ids)
-        fmt = PGN if self._use_pgn(as_pgn) else NDJSON
-        yield from self._r.post(
-            path,
-            params=params,
-            data=payload,
-            fmt=fmt,
-            stream=True,
-            converter=models.Game.convert,
+        as_pgn = self._use_pgn(as_pgn)
+        fmt = PGN if as_pgn else NDJSON
+        if to is not None:
+            return self._save(
+                to, 'POST', path, fmt, progress, count,
+                params=params, data=payload,
+            )
+        if not self._stores(as_pgn, params):
+            return self._r.post(
+                path,
+                params=params,
+                data=payload,
+                fmt=fmt,
+                stream=True,
+                converter=models.Game.convert,
+                parallel=True,
+                compress=True,
+            )
+        return self._export_stored(path, params, game_ids, as_pgn, fmt)
+
+    def _stores(self, as_pgn, params):
+        # whether exported games go through the store
+        return self.game_store is not None and self.game_store.identifies(
+            as_pgn, params
         )
 
+    def _export_stored(self, path, params, game_ids, as_pgn, fmt):
+        # only request the games missing from the store, then merge them in
+        # the requested order
+        variant = self.game_store.variant(as_pgn, params)
+        games = self.game_store.get_many(game_ids, variant)
+        missing = [game_id for game_id in game_ids if game_id not in games]
+        if missing:
+            fetched = self._r.post(
+                path,
+                params=params,
+                data=','.join(missing),
+                fmt=fmt,
+                stream=True,
+                compress=True,
+            )
+            for game in fetched:
+                self.game_store.put(game, variant)
+                games[self.game_store.game_id(game)] = game
+        for game_id in game_ids:
+            if game_id in games:
+                game = games[game_id]
+                yield game if as_pgn else models.Game.convert(game)
+
     def get_among_players(self, *usernames):
         """Get the games currently being played among players.
 
@@ -1354,11 +1627,21 @@ class Tournaments(FmtClient):
         clocks=None,
         evals=None,
         opening=None,
+        resume=False,
+        to=None,
+        progress=None,
+        count=False,
+        fields=None,
+        intern=False,
     ):
         """Export games from a tournament.
 
         :param str id_: tournament ID
-        :param bool as_pgn: whether to return PGN instead of JSON
+        :param as_pgn: whether to return PGN instead of JSON, or the PGN
+                       handler to use, such as
+                       :data:`~berserk.formats.PGN_GAMES` for lazily parsed
+                       games
+        :type as_pgn: bool or :class:`~berserk.formats.PgnHandler`
         :param bool moves: include moves
         :param bool tags: include tags
         :param bool clocks: include clock comments in the PGN moves, when
@@ -1366,8 +1649,26 @@ class Tournaments(FmtClient):
         :param bool evals: include analysis evalulation comments in the PGN
                            moves, when available
         :param bool opening: include the opening name
-        :return: games
-        :rtype: list
+        :param resume: whether to resume the export if the connection drops,
+                       either ``True`` or a :class:`~berserk.session.Resume`;
+                       ignored with ``to``
+        :param to: path of a file, or binary file object, to copy the
+                   export to as is instead of parsing it
+        :param func progress: with ``to``, function called with the
+                              :class:`~berserk.formats.Progress` of the copy
+                              after each chunk
+        :param bool count: with ``to``, whether to count the games copied
+        :param fields: names of the fields to keep in the JSON games, such as
+                       ``['id', 'players', 'winner']``; the others are
+                       dropped as the games are decoded
+        :type fields: list of str
+        :param intern: whether to share the repeated strings of the JSON
+                       games, such as usernames and opening names, between
+                       games, or the interner to share them with
+        :type intern: bool or :class:`~berserk.formats.Interner`
+        :return: iterator over the games, or the final
+                 :class:`~berserk.formats.Progress` of the copy with ``to``
+        :rtype: iter
         """
         path = f'api/tournament/{id_}/games'
         params = {
@@ -1377,9 +1678,25 @@ class Tournaments(FmtClient):
             'evals': evals,
             'opening': opening,
         }
-        fmt = PGN if self._use_pgn(as_pgn) else NDJSON
+        if resume is True:
+            # no timestamp parameters, so skip the games already returned
+            resume = Resume(None)
+        fmt = self._pgn_fmt(
+            as_pgn, default=self._json_fmt(fields, resume, intern)
+        )
+        if to is not None:
+            return self._save(
+                to, 'GET', path, fmt, progress, count, params=params
+            )
         return self._r.get(
-            path, params=params, fmt=fmt, converter=models.Game.convert
+            path,
+            params=params,
+            fmt=fmt,
+            stream=True,
+            resume=resume,
+            converter=models.Game.convert,
+            parallel=True,
+            compress=True,
         )
 
     def stream_results(self, id_, limit=None):
@@ -1551,14 +1868,24 @@ class Studies(BaseClient):
         path = f'/study/{study_id}/{chapter_id}.pgn'
         return self._r.get(path, fmt=PGN)
 
-    def export(self, study_id):
+    def export(self, study_id, to=None, progress=None, count=False):
         """Export all chapters of a study.
 
-        :return: all chapters as PGN
+        :param str study_id: study ID
+        :param to: path of a file, or binary file object, to copy the
+                   export to as is instead of parsing it
+        :param func progress: with ``to``, function called with the
+                              :class:`~berserk.formats.Progress` of the copy
+                              after each chunk
+        :param bool count: with ``to``, whether to count the chapters copied
+        :return: all chapters as PGN, or the final
+                 :class:`~berserk.formats.Progress` of the copy with ``to``
         :rtype: list
         """
         path = f'/study/{study_id}.pgn'
-        return self._r.get(path, fmt=PGN, stream=True)
+        if to is not None:
+            return self._save(to, 'GET', path, PGN, progress, count)
+        return self._r.get(path, fmt=PGN, stream=True, compress=True)
 
 
 class TV(FmtClient):
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""Columnar sink for NDJSON streams, built on Apache Arrow.
+
+:class:`ArrowHandler` is a format handler that turns a stream of
+newline-delimited JSON into Arrow record batches. The lines are handed to the
+Arrow JSON reader a batch at a time, so no Python object is built for each
+record, and at most one batch of lines is held in memory however long the
+stream is. The batches can be written to a Parquet file as they arrive with
+:func:`write_parquet`:
+
+.. code-block:: python
+
+    >>> session = berserk.TokenSession(token)
+    >>> requestor = berserk.Requestor(session, 'https://lichess.org/', NDJSON)
+    >>> games = columnar.ArrowHandler(columnar.GAME_SCHEMA)
+    >>> batches = requestor.get(
+    ...     'api/games/user/foo', params={'max': 100000},
+    ...     fmt=games, stream=True)
+    >>> columnar.write_parquet(batches, 'foo.parquet', columnar.GAME_SCHEMA)
+    100000
+
+Install the ``columnar`` extra to use this module.
+"""
+import io
+
+import pyarrow as pa
+import pyarrow.json
+import pyarrow.parquet
+
+from . import utils
+from .formats import FormatHandler, LineSplitter
+
+__all__ = [
+    'ArrowHandler',
+    'GAME_SCHEMA',
+    'TOURNAMENT_RESULT_SCHEMA',
+    'USER_SCHEMA',
+    'write_parquet',
+]
+
+TIMESTAMP = pa.timestamp('ms', tz='UTC')
+
+_PLAYER = pa.struct([
+    ('user', pa.struct([
+        ('name', pa.string()),
+        ('id', pa.string()),
+        ('title', pa.string()),
+    ])),
+    ('rating', pa.int32()),
+    ('ratingDiff', pa.int32()),
+    ('provisional', pa.bool_()),
+    ('aiLevel', pa.int8()),
+    ('analysis', pa.struct([
+        ('inaccuracy', pa.int32()),
+        ('mistake', pa.int32()),
+        ('blunder', pa.int32()),
+        ('acpl', pa.int32()),
+    ])),
+])
+
+#: Schema of games, as exported by :class:`~berserk.clients.Games`
+GAME_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('rated', pa.bool_()),
+    ('variant', pa.string()),
+    ('speed', pa.string()),
+    ('perf', pa.string()),
+    ('createdAt', TIMESTAMP),
+    ('lastMoveAt', TIMESTAMP),
+    ('status', pa.string()),
+    ('players', pa.struct([('white', _PLAYER), ('black', _PLAYER)])),
+    ('winner', pa.string()),
+    ('opening', pa.struct([
+        ('eco', pa.string()),
+        ('name', pa.string()),
+        ('ply', pa.int16()),
+    ])),
+    ('moves', pa.string()),
+    ('pgn', pa.string()),
+    ('clock', pa.struct([
+        ('initial', pa.int32()),
+        ('increment', pa.int32()),
+        ('totalTime', pa.int32()),
+    ])),
+    ('daysPerTurn', pa.int16()),
+    ('clocks', pa.list_(pa.int32())),
+    ('analysis', pa.list_(pa.struct([
+        ('eval', pa.int32()),
+        ('mate', pa.int16()),
+        ('best', pa.string()),
+        ('judgment', pa.struct([
+            ('name', pa.string()),
+            ('comment', pa.string()),
+        ])),
+    ]))),
+    ('tournament', pa.string()),
+    ('swiss', pa.string()),
+])
+
+_PERF = pa.struct([
+    ('games', pa.int32()),
+    ('rating', pa.int32()),
+    ('rd', pa.int32()),
+    ('prog', pa.int32()),
+    ('prov', pa.bool_()),
+])
+_PERF_TYPES = [
+    'ultraBullet', 'bullet', 'blitz', 'rapid', 'classical', 'correspondence',
+    'chess960', 'kingOfTheHill', 'threeCheck', 'antichess', 'atomic',
+    'horde', 'racingKings', 'crazyhouse', 'puzzle',
+]
+
+#: Schema of users, as returned by :class:`~berserk.clients.Users`
+USER_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('username', pa.string()),
+    ('title', pa.string()),
+    ('online', pa.bool_()),
+    ('createdAt', TIMESTAMP),
+    ('seenAt', TIMESTAMP),
+    ('disabled', pa.bool_()),
+    ('tosViolation', pa.bool_()),
+    ('patron', pa.bool_()),
+    ('verified', pa.bool_()),
+    ('url', pa.string()),
+    ('perfs', pa.struct([(name, _PERF) for name in _PERF_TYPES])),
+    ('profile', pa.struct([
+        ('country', pa.string()),
+        ('location', pa.string()),
+        ('bio', pa.string()),
+        ('firstName', pa.string()),
+        ('lastName', pa.string()),
+        ('fideRating', pa.int32()),
+        ('links', pa.string()),
+    ])),
+    ('playTime', pa.struct([('total', pa.int64()), ('tv', pa.int64())])),
+    ('count', pa.struct([
+        (name, pa.int32())
+        for name in ('all', 'rated', 'ai', 'draw', 'loss', 'win', 'import')
+    ])),
+])
+
+#: Schema of the results of arena tournaments, as streamed by
+#: :meth:`~berserk.clients.Tournaments.stream_results`
+TOURNAMENT_RESULT_SCHEMA = pa.schema([
+    ('rank', pa.int32()),
+    ('score', pa.int32()),
+    ('rating', pa.int32()),
+    ('username', pa.string()),
+    ('title', pa.string()),
+    ('performance', pa.int32()),
+    ('team', pa.string()),
+])
+
+
+def json_schema(schema):
+    """Return the schema to read JSON with, for a target schema.
+
+    Timestamps are sent by the API as milliseconds since the epoch, so they
+    are read as integers and cast afterwards.
+
+    :param schema: the target schema
+    :type schema: :class:`pyarrow.Schema`
+    :return: the schema with top-level timestamps replaced by integers
+    :rtype: :class:`pyarrow.Schema`
+    """
+    for index, field in enumerate(schema):
+        if pa.types.is_timestamp(field.type):
+            schema = schema.set(index, field.with_type(pa.int64()))
+    return schema
+
+
+class ArrowHandler(FormatHandler):
+    """Handle newline-delimited JSON as Arrow record batches.
+
+    Fields missing from a record are null, and fields of the records that
+    are not part of the schema are ignored.
+
+    :param schema: schema of the records, such as :data:`GAME_SCHEMA`
+    :type schema: :class:`pyarrow.Schema`
+    :param int batch_size: number of records in each batch streamed, the
+                           last one aside
+    """
+
+    def __init__(self, schema, batch_size=10000):
+        super().__init__(mime_type='application/x-ndjson')
+        self.schema = schema
+        self.batch_size = batch_size
+        self.options = pyarrow.json.ParseOptions(
+            explicit_schema=json_schema(schema),
+            unexpected_field_behavior='ignore',
+        )
+
+    def get_converter(self, converter):
+        return utils.noop  # the schema does the conversions
+
+    def parse(self, response):
+        """Parse all records from a response.
+
+        :param response: raw response
+        :type response: :class:`requests.Response`
+        :return: the records
+        :rtype: :class:`pyarrow.Table`
+        """
+        return self.read(response.content)
+
+    def parse_stream(self, response):
+        """Yield record batches from a stream response.
+
+        :param response: raw response
+        :type response: :class:`requests.Response`
+        :return: iterator over :class:`pyarrow.RecordBatch` objects
+        """
+        return self.parse_chunks(self.iter_chunks(response))
+
+    def stream_parser(self):
+        return BatchParser(self)
+
+    def read(self, data):
+        """Read records from newline-delimited JSON.
+
+        :param bytes data: the JSON lines
+        :return: the records
+        :rtype: :class:`pyarrow.Table`
+        """
+        if not data.strip():
+            return self.schema.empty_table()
+        table = pyarrow.json.read_json(
+            io.BytesIO(data), parse_options=self.options
+        )
+        return table.cast(self.schema)
+
+
+class BatchParser:
+    """Incrementally parse the chunks of a stream into record batches.
+
+    :param handler: the handler providing the schema and batch size
+    :type handler: :class:`ArrowHandler`
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.splitter = LineSplitter()
+        self.lines = []
+
+    def feed(self, chunk):
+        """Feed the next chunk of the stream.
+
+        :param bytes chunk: the chunk
+        :return: batches completed by the chunk
+        :rtype: list
+        """
+        self.lines.extend(line for line in self.splitter.feed(chunk) if line)
+        size = self.handler.batch_size
+        batches = []
+        while len(self.lines) >= size:
+            batches.append(self._batch(self.lines[:size]))
+            del self.lines[:size]
+        return batches
+
+    def close(self):
+        """Signal the end of the stream.
+
+        :return: the last batch, if any records are left
+        :rtype: list
+        """
+        self.lines.extend(line for line in self.splitter.close() if line)
+        lines, self.lines = self.lines, []
+        return [self._batch(lines)] if lines else []
+
+    def _batch(self, lines):
+        table = self.handler.read(b'\n'.join(lines))
+        return table.combine_chunks().to_batches()[0]
+
+
+def write_parquet(batches, where, schema, **kwargs):
+    """Write record batches to a Parquet file as they arrive.
+
+    :param batches: record batches, such as a stream parsed by
+                    :class:`ArrowHandler`
+    :type batches: iterable of :class:`pyarrow.RecordBatch`
+    :param where: path or file object to write to
+    :param schema: schema of the batches
+    :type schema: :class:`pyarrow.Schema`
+    :param kwargs: passed on to :class:`pyarrow.parquet.ParquetWriter`
+    :return: number of records written
+    :rtype: int
+    """
+    rows = 0
+    with pyarrow.parquet.ParquetWriter(where, schema, **kwargs) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Negotiation and incremental decoding of compressed streams.
+
+Gzip is always supported. Brotli and Zstandard are used when the ``brotli``
+and ``zstandard`` packages are installed, which the ``compression`` extra
+does.
+"""
+import functools
+import zlib
+
+import requests
+from urllib3.exceptions import (
+    ProtocolError,
+    ReadTimeoutError,
+    SSLError,
+)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+class GzipDecoder:
+    """Incremental gzip decoder, supporting multiple members."""
+
+    error = zlib.error
+
+    def __init__(self):
+        self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decompress(self, data):
+        parts = []
+        while data:
+            parts.append(self._obj.decompress(data))
+            data = self._obj.unused_data
+            if data:
+                self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return b''.join(parts)
+
+    def flush(self):
+        return self._obj.flush()
+
+
+class BrotliDecoder:
+    """Incremental brotli decoder."""
+
+    error = getattr(brotli, 'error', ())
+
+    def __init__(self):
+        self._obj = brotli.Decompressor()
+
+    def decompress(self, data):
+        return self._obj.process(data)
+
+    def flush(self):
+        return b''
+
+
+class ZstdDecoder:
+    """Incremental Zstandard decoder."""
+
+    error = getattr(zstandard, 'ZstdError', ())
+
+    def __init__(self):
+        self._obj = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data):
+        return self._obj.decompress(data)
+
+    def flush(self):
+        return b''
+
+
+#: decoders by content encoding, in order of preference
+DECODERS = {}
+if zstandard is not None:
+    DECODERS['zstd'] = ZstdDecoder
+if brotli is not None:
+    DECODERS['br'] = BrotliDecoder
+DECODERS['gzip'] = GzipDecoder
+
+#: value of the ``Accept-Encoding`` header sent for streams
+ACCEPT_ENCODING = ', '.join(
+    encoding if i == 0 else f'{encoding};q={1 - i / 10:.1f}'
+    for i, encoding in enumerate(DECODERS)
+)
+
+
+class DecodedResponse:
+    """Streaming response proxy that decompresses its body incrementally.
+
+    The body is read from the connection as is and decompressed chunk by
+    chunk, so the parsers see decoded data while :attr:`wire_bytes` and
+    :attr:`decoded_bytes` count the size of the body before and after
+    decompression.
+
+    :param response: a streaming response with a supported encoding
+    :type response: :class:`requests.Response`
+    """
+
+    def __init__(self, response):
+        self._response = response
+        self.content_encoding = response.headers['Content-Encoding'].lower()
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        """Iterate over the decompressed body.
+
+        :param int chunk_size: bytes to read from the connection at a time
+        :param bool decode_unicode: whether to decode the body to text
+        :return: iterator over chunks of the body
+        """
+        chunks = self._decode(self._read(chunk_size or 1))
+        if decode_unicode:
+            chunks = requests.utils.stream_decode_response_unicode(
+                chunks, self
+            )
+        return chunks
+
+    # reuse the line splitting of requests on top of iter_content
+    iter_lines = requests.Response.iter_lines
+
+    def _read(self, chunk_size):
+        raw = self._response.raw
+        try:
+            if hasattr(raw, 'stream'):
+                yield from raw.stream(chunk_size, decode_content=False)
+            else:
+                yield from iter(functools.partial(raw.read, chunk_size), b'')
+        except ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        except ReadTimeoutError as e:
+            raise requests.exceptions.ConnectionError(e)
+        except SSLError as e:
+            raise requests.exceptions.SSLError(e)
+        self._response._content_consumed = True
+
+    def _decode(self, chunks):
+        decoder = DECODERS[self.content_encoding]()
+        try:
+            for chunk in chunks:
+                self.wire_bytes += len(chunk)
+                data = decoder.decompress(chunk)
+                if data:
+                    self.decoded_bytes += len(data)
+                    yield data
+            data = decoder.flush()
+        except decoder.error as e:
+            raise requests.exceptions.ContentDecodingError(e)
+        if data:
+            self.decoded_bytes += len(data)
+            yield data
+
+
+def decode(response):
+    """Return a streaming response that decodes its body incrementally.
+
+    :param response: a streaming response
+    :type response: :class:`requests.Response`
+    :return: a :class:`DecodedResponse` if the body is compressed with a
+             supported encoding, otherwise the response itself
+    """
+    encoding = response.headers.get('Content-Encoding')
+    if isinstance(encoding, str) and encoding.lower() in DECODERS:
+        return DecodedResponse(response)
+    return response
+
+
+def wire_size(response):
+    """Return the number of bytes of a response body read from the wire.
+
+    :param response: a response, possibly still being read
+    :return: size before decompression, or ``None`` if unknown
+    :rtype: int
+    """
+    for name in ('wire_bytes', 'num_bytes_downloaded'):
+        size = getattr(response, name, None)
+        if isinstance(size, int):
+            return size
+    tell = getattr(getattr(response, 'raw', None), 'tell', None)
+    size = tell() if callable(tell) else None
+    return size if isinstance(size, int) else None
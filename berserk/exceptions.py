@@ -44,7 +44,10 @@ class ResponseError(ApiError):
     @property
     def reason(self):
         """HTTP status text of the response."""
-        return self.response.reason
+        try:
+            return self.response.reason
+        except AttributeError:
+            return self.response.reason_phrase  # httpx responses
 
     @property
     def cause(self):
@@ -1,10 +1,219 @@
 # -*- coding: utf-8 -*-
+import collections
+import concurrent.futures
+import contextlib
+import functools
 import json
+import os
+import queue
+import threading
+import typing
 
 import ndjson
 
+from . import pgn
 from . import utils
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+#: Default number of bytes read from a stream at a time
+CHUNK_SIZE = 64 * 1024
+
+#: Default number of bytes copied at a time by :class:`RawHandler`
+RAW_CHUNK_SIZE = 1024 * 1024
+
+
+#: Functions decoding JSON from bytes by backend name, fastest first
+JSON_BACKENDS = {}
+if orjson is not None:
+    JSON_BACKENDS['orjson'] = orjson.loads
+if msgspec is not None:
+    JSON_BACKENDS['msgspec'] = msgspec.json.Decoder().decode
+JSON_BACKENDS['json'] = json.loads
+
+
+def json_backend(name=None):
+    """Return the name of a JSON backend, checking that it is available.
+
+    :param str name: name of a backend in :data:`JSON_BACKENDS`, or ``None``
+                     for the fastest one available
+    :return: name of the backend
+    :rtype: str
+    :raises ValueError: if the backend is not available
+    """
+    if name is None:
+        return next(iter(JSON_BACKENDS))
+    if name not in JSON_BACKENDS:
+        raise ValueError(f'JSON backend {name!r} is not available')
+    return name
+
+
+def json_loads(backend, fields=None):
+    """Return the function decoding JSON records from bytes.
+
+    :param str backend: name of the JSON backend to use
+    :param tuple fields: names of the top-level fields to keep, or ``None``
+                         to keep them all
+    :return: the decoding function
+    """
+    if fields is None:
+        return JSON_BACKENDS[backend]
+    return json_projection(backend, fields)
+
+
+@functools.lru_cache(maxsize=64)
+def json_projection(backend, fields):
+    """Return a function decoding JSON objects down to some of their fields.
+
+    When ``msgspec`` is installed, it decodes the objects whatever the
+    backend: it skips over the values of the other fields without building
+    them. Otherwise the whole objects are decoded by the backend, then the
+    other fields are dropped.
+
+    :param str backend: name of the JSON backend to fall back to
+    :param tuple fields: names of the top-level fields to keep
+    :return: function decoding a JSON object from bytes to a :class:`dict`
+             of the fields it has among ``fields``
+    """
+    if msgspec is not None:
+        return _skipping_projection(fields)
+    loads = JSON_BACKENDS[backend]
+
+    def project(data):
+        record = loads(data)
+        return {field: record[field] for field in fields if field in record}
+
+    return project
+
+
+def _skipping_projection(fields):
+    # fields are renamed, as they may not be valid identifiers
+    names = {f'f{index}': field for index, field in enumerate(fields)}
+    struct = msgspec.defstruct(
+        'Projection',
+        [(name, typing.Any, msgspec.UNSET) for name in names],
+        rename=names,
+    )
+    decode = msgspec.json.Decoder(struct).decode
+    astuple = msgspec.structs.astuple
+    unset = msgspec.UNSET
+
+    def project(data):
+        values = astuple(decode(data))
+        return {
+            field: value
+            for field, value in zip(fields, values)
+            if value is not unset
+        }
+
+    return project
+
+
+#: Fields of exported games whose values repeat across a stream, as paths of
+#: keys from the top of the records
+GAME_INTERN_PATHS = (
+    ('variant',),
+    ('speed',),
+    ('perf',),
+    ('status',),
+    ('winner',),
+    ('source',),
+    ('tournament',),
+    ('swiss',),
+    ('opening', 'eco'),
+    ('opening', 'name'),
+    ('players', 'white', 'user', 'name'),
+    ('players', 'white', 'user', 'id'),
+    ('players', 'white', 'user', 'title'),
+    ('players', 'black', 'user', 'name'),
+    ('players', 'black', 'user', 'id'),
+    ('players', 'black', 'user', 'title'),
+)
+
+
+class Interner:
+    """Share the strings that repeat across the records of a stream.
+
+    Each record decoded from JSON holds its own copy of every string, so a
+    dataset of many games holds as many copies of the same usernames,
+    variants and opening names. The interner replaces the strings found at
+    known paths with the first copy it saw, which lets the others be freed.
+    Keys need no interning with the ``orjson`` and ``msgspec`` backends,
+    which already share them between records.
+
+    The table of strings is bounded: once it holds ``max_size`` strings, new
+    ones are left as they are. The same interner can be shared between
+    several streams.
+
+    :param paths: paths of keys leading to the strings to intern, by
+                  default :data:`GAME_INTERN_PATHS`
+    :type paths: iterable of tuple
+    :param int max_size: maximum number of strings in the table
+    """
+
+    def __init__(self, paths=GAME_INTERN_PATHS, max_size=100000):
+        self.max_size = max_size
+        self.table = {}
+        # top-level strings are interned in a tight loop, while the other
+        # paths are grouped by their first key, which many records lack
+        self._keys = tuple(path[0] for path in paths if len(path) == 1)
+        nested = collections.defaultdict(list)
+        for path in paths:
+            if len(path) > 1:
+                nested[path[0]].append(path[1:])
+        self._nested = tuple(nested.items())
+
+    def __call__(self, record):
+        """Intern the strings of a record in place.
+
+        :param dict record: a decoded record
+        :return: the record
+        """
+        if type(record) is not dict:
+            return record
+        shared = self.table.get
+        for key in self._keys:
+            value = record.get(key)
+            if type(value) is str:
+                record[key] = shared(value) or self.intern(value)
+        for key, rests in self._nested:
+            value = record.get(key)
+            if type(value) is dict:
+                for rest in rests:
+                    self._intern(record, key, value, rest)
+        return record
+
+    def intern(self, string):
+        """Return the shared copy of a string.
+
+        :param str string: the string
+        :return: the first equal string seen, or the string itself
+        :rtype: str
+        """
+        shared = self.table.get(string)
+        if shared is not None:
+            return shared
+        if len(self.table) < self.max_size:
+            self.table[string] = string
+        return string
+
+    def _intern(self, parent, key, value, rest):
+        for step in rest:
+            if type(value) is not dict:
+                return
+            parent, key = value, step
+            value = value.get(step)
+        if type(value) is str:
+            parent[key] = self.intern(value)
+
 
 class FormatHandler:
     """Provide request headers and parse responses for a particular format.
@@ -14,11 +223,13 @@ class FormatHandler:
     responses.
 
     :param str mime_type: the MIME type for the format
+    :param int chunk_size: number of bytes to read from a stream at a time
     """
 
-    def __init__(self, mime_type):
+    def __init__(self, mime_type, chunk_size=CHUNK_SIZE):
         self.mime_type = mime_type
         self.headers = {'Accept': mime_type}
+        self.chunk_size = chunk_size
 
     def handle(self, response, is_stream, converter=utils.noop):
         """Handle the response by returning the data.
@@ -29,11 +240,20 @@ class FormatHandler:
         :param func converter: function to handle field conversions
         :return: either all response data or an iterator of response data
         """
+        converter = self.get_converter(converter)
         if is_stream:
             return map(converter, iter(self.parse_stream(response)))
         else:
             return converter(self.parse(response))
 
+    def get_converter(self, converter):
+        """Return the converter to use for data in this format.
+
+        :param func converter: the requested converter
+        :return: the converter that should actually be applied
+        """
+        return converter
+
     def parse(self, response):
         """Parse all data from a response.
 
@@ -52,18 +272,404 @@ class FormatHandler:
         """
         yield response
 
+    def stream_parser(self):
+        """Return a new incremental parser for the chunks of a stream.
+
+        The parser is fed the body of the response chunk by chunk, which lets
+        both the blocking and the asynchronous transports share the same
+        parsing logic.
+
+        :return: incremental parser
+        :rtype: :class:`LineParser`
+        """
+        return LineParser(utils.noop)
+
+    def iter_chunks(self, response):
+        """Return the chunks of the body of a stream response.
+
+        :param response: raw response
+        :type response: :class:`requests.Response`
+        :return: iterator over chunks of :attr:`chunk_size` bytes at most
+        """
+        return response.iter_content(chunk_size=self.chunk_size)
+
+    def parse_chunks(self, chunks):
+        """Yield the records parsed from the chunks of a stream.
+
+        :param chunks: chunks of the body of a stream response
+        :type chunks: iterable of bytes
+        :return: iterator over the parsed records
+        """
+        parser = self.stream_parser()
+        for chunk in chunks:
+            yield from parser.feed(chunk)
+        yield from parser.close()
+
+    def parse_ahead(self, response, depth):
+        """Yield the parsed data from a stream response, read ahead.
+
+        A background thread reads and parses the stream while the records
+        are consumed. Closing the iterator stops the thread and closes the
+        response.
+
+        :param response: raw response
+        :type response: :class:`requests.Response`
+        :param int depth: maximum number of parsed chunks queued ahead of
+                          the consumer
+        :return: iterator over the response data
+        """
+        def close():
+            # shutting the connection down wakes up a pending read
+            shutdown = getattr(response.raw, 'shutdown', None)
+            if shutdown is not None:
+                shutdown()
+            response.close()
+
+        return prefetch(
+            self.iter_chunks(response), self.stream_parser(), depth, close
+        )
+
+
+#: Seconds between checks for a consumer that went away, when the queue of
+#: a prefetching thread is full
+PREFETCH_POLL = 0.1
+
+
+class PrefetchReader(threading.Thread):
+    """Thread reading and parsing chunks into a bounded queue.
+
+    Each item of :attr:`queue` is a pair of the records parsed from a chunk
+    and an error. The reader ends with a ``None`` list of records, or with
+    the error it raised.
+
+    :param chunks: chunks of the body of a stream response
+    :type chunks: iterable of bytes
+    :param parser: incremental parser for the chunks, such as returned by
+                   :meth:`FormatHandler.stream_parser`
+    :param int depth: maximum number of parsed chunks queued
+    """
+
+    def __init__(self, chunks, parser, depth):
+        super().__init__(name='berserk-prefetch', daemon=True)
+        self.chunks = chunks
+        self.parser = parser
+        self.queue = queue.Queue(depth)
+        self.stopping = threading.Event()
+
+    def run(self):
+        try:
+            for chunk in self.chunks:
+                records = self.parser.feed(chunk)
+                if records and not self.put((records, None)):
+                    return
+            self.put((self.parser.close(), None))
+        except Exception as e:
+            self.put(([], e))
+        else:
+            self.put((None, None))
+
+    def put(self, item):
+        """Queue an item, unless the reader is stopped while waiting.
+
+        :return: whether the item was queued
+        :rtype: bool
+        """
+        while not self.stopping.is_set():
+            try:
+                self.queue.put(item, timeout=PREFETCH_POLL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+
+def prefetch(chunks, parser, depth, close=utils.noop):
+    """Read and parse chunks in a background thread, ahead of the consumer.
+
+    Records are handed over a chunk at a time through a queue of at most
+    ``depth`` chunks, so the reader blocks when the consumer falls behind.
+    Errors raised by the reader are raised by the returned iterator.
+
+    :param chunks: chunks of the body of a stream response
+    :type chunks: iterable of bytes
+    :param parser: incremental parser for the chunks, such as returned by
+                   :meth:`FormatHandler.stream_parser`
+    :param int depth: maximum number of parsed chunks queued
+    :param func close: function closing the stream, to interrupt a pending
+                       read when the iterator is closed early
+    :return: iterator over the parsed records
+    """
+    reader = PrefetchReader(chunks, parser, depth)
+    reader.start()
+    try:
+        while True:
+            records, error = reader.queue.get()
+            if error is not None:
+                raise error
+            if records is None:
+                return
+            yield from records
+    finally:
+        reader.stopping.set()
+        if reader.is_alive():
+            close()
+        reader.join(PREFETCH_POLL * 10)
+
+
+class LineSplitter:
+    """Split the chunks of a stream into lines.
+
+    Each chunk is split in one go, so every line is copied once by C code
+    rather than scanned for in Python. Only the line that spans two chunks
+    is assembled in a buffer.
+    """
+
+    def __init__(self):
+        self.pending = bytearray()
+
+    def feed(self, chunk):
+        """Feed the next chunk of the stream.
+
+        :param bytes chunk: the chunk
+        :return: the lines completed by the chunk
+        :rtype: list
+        """
+        lines = chunk.split(b'\n')
+        if len(lines) == 1:
+            self.pending += chunk
+            return []
+        if self.pending:
+            lines[0] = self.pending + lines[0]
+        self.pending = bytearray(lines.pop())
+        if b'\r' in chunk or lines[0].endswith(b'\r'):
+            lines = [line.rstrip(b'\r') for line in lines]
+        return lines
+
+    def close(self):
+        """Signal the end of the stream.
+
+        :return: the last line, if it had no line ending
+        :rtype: list
+        """
+        lines = [self.pending.rstrip(b'\r')] if self.pending else []
+        self.pending = bytearray()
+        return lines
+
+
+class LineParser:
+    """Incrementally parse the chunks of a stream into records, line by line.
+
+    :param func parse_line: function that turns one line into a record, or
+                            ``None`` if the line should be skipped
+    """
+
+    def __init__(self, parse_line):
+        self.parse_line = parse_line
+        self.splitter = LineSplitter()
+
+    def feed(self, chunk):
+        """Feed the next chunk of the stream.
+
+        :param bytes chunk: the chunk
+        :return: records completed by the chunk
+        :rtype: list
+        """
+        return self._parse(self.splitter.feed(chunk))
+
+    def close(self):
+        """Signal the end of the stream.
+
+        :return: any records still pending
+        :rtype: list
+        """
+        return self._parse(self.splitter.close())
+
+    def _parse(self, lines):
+        records = map(self.parse_line, lines)
+        return [record for record in records if record is not None]
+
+
+class PgnSplitter:
+    """Incrementally split the chunks of a PGN stream into games.
+
+    Game boundaries are found by scanning the raw bytes for blank lines
+    rather than going line by line: a game ends at two or more blank lines,
+    or at a single blank line followed by the ``[Event`` tag of the next
+    game. Each game is a :class:`memoryview` slice of the buffer it was found
+    in, so nothing is copied until it is parsed, but the whole buffer stays
+    in memory while any of its slices is held.
+
+    :param func parse_game: function that turns the UTF-8 bytes of one game
+                            into a record, or ``None`` to return the games
+                            as :class:`memoryview` slices
+    """
+
+    EVENT = b'[Event '
+
+    def __init__(self, parse_game=None):
+        self.parse_game = parse_game
+        self.pending = b''
+
+    def feed(self, chunk):
+        """Feed the next chunk of the stream.
+
+        :param bytes chunk: the chunk
+        :return: games completed by the chunk
+        :rtype: list
+        """
+        buffer = self.pending + chunk if self.pending else bytes(chunk)
+        if b'\r' in buffer:
+            buffer = buffer.replace(b'\r\n', b'\n')
+        games = []
+        start = 0
+        blank = buffer.find(b'\n\n')
+        while blank != -1:
+            after = blank + 2
+            follows = buffer[after:after + len(self.EVENT)]
+            if follows[:1] == b'\n' or follows == self.EVENT:
+                games.append((start, blank))
+                start = after
+            elif self.EVENT.startswith(follows):
+                break  # wait for more data to tell
+            blank = buffer.find(b'\n\n', after)
+        # keep the unfinished game to scan again with the next chunk
+        self.pending = buffer[start:]
+        return self._games(buffer, games)
+
+    def close(self):
+        """Signal the end of the stream.
+
+        :return: the last game, if any
+        :rtype: list
+        """
+        buffer, self.pending = self.pending, b''
+        return self._games(buffer, [(0, len(buffer))])
+
+    def _games(self, buffer, bounds):
+        view = memoryview(buffer)
+        parse_game = self.parse_game
+        games = []
+        for start, end in bounds:
+            while start < end and buffer[start] in _WHITESPACE:
+                start += 1
+            while end > start and buffer[end - 1] in _WHITESPACE:
+                end -= 1
+            if start < end:
+                game = view[start:end]
+                games.append(parse_game(game) if parse_game else game)
+        return games
+
+
+_WHITESPACE = frozenset(b' \t\r\n')
+
+
+def decode_pgn(game):
+    """Decode a game split from a PGN stream.
+
+    :param game: UTF-8 encoded PGN of the game
+    :type game: bytes-like object
+    :return: the PGN text
+    :rtype: str
+    """
+    return str(game, 'utf-8')
+
 
 class JsonHandler(FormatHandler):
     """Handle JSON data.
 
+    JSON is decoded straight from bytes by a pluggable backend. The fastest
+    available one is used by default: ``orjson``, then ``msgspec``, then the
+    standard library. They all produce the same objects for the JSON sent
+    by the API, but note that ``orjson`` decodes integers beyond 64 bits as
+    floats.
+
     :param str mime_type: the MIME type for the format
-    :param decoder: the decoder to use for the JSON format
+    :param decoder: the decoder to use for the JSON format; decoders other
+                    than :class:`json.JSONDecoder` and
+                    :class:`ndjson.Decoder` bypass the backend
     :type decoder: :class:`json.JSONDecoder`
+    :param str backend: name of the JSON backend to use (see
+                        :data:`JSON_BACKENDS`)
+    :param fields: names of the top-level fields to keep in each record of
+                   newline-delimited JSON, or ``None`` to keep them all (see
+                   :meth:`project`)
+    :type fields: tuple of str
+    :param interner: interner of the strings of each record of
+                     newline-delimited JSON (see :meth:`interning`)
+    :type interner: :class:`Interner`
+    :param int chunk_size: number of bytes to read from a stream at a time
     """
 
-    def __init__(self, mime_type, decoder=json.JSONDecoder):
-        super().__init__(mime_type=mime_type)
+    def __init__(
+        self,
+        mime_type,
+        decoder=json.JSONDecoder,
+        backend=None,
+        fields=None,
+        interner=None,
+        chunk_size=CHUNK_SIZE,
+    ):
+        super().__init__(mime_type=mime_type, chunk_size=chunk_size)
         self.decoder = decoder
+        self.fields = fields
+        self.interner = interner
+        self.use_backend(backend)
+
+    def use_backend(self, backend=None):
+        """Switch to another JSON backend.
+
+        :param str backend: name of the backend, or ``None`` for the fastest
+                            one available
+        :raises ValueError: if the backend is not available
+        """
+        self.backend = json_backend(backend)
+        loads = json_loads(self.backend, self.fields)
+        if self.interner is not None:
+            loads = _interned(loads, self.interner)
+        self.loads = loads
+
+    def project(self, fields):
+        """Return a handler keeping only some fields of each record.
+
+        The other fields are dropped as the records are decoded, before
+        any conversion, which saves both time and memory on streams of
+        large records such as game exports.
+
+        :param fields: names of the top-level fields to keep
+        :type fields: iterable of str
+        :return: a handler for the same format and backend
+        :rtype: :class:`JsonHandler`
+        :raises ValueError: if the handler is not for newline-delimited JSON
+        """
+        if self.decoder is not ndjson.Decoder:
+            raise ValueError('only newline-delimited JSON can be projected')
+        return self._derive(fields=tuple(fields))
+
+    def interning(self, interner=None):
+        """Return a handler interning the repeated strings of each record.
+
+        :param interner: the interner to use, which can be shared between
+                         handlers, or ``None`` for a new one interning the
+                         fields of games
+        :type interner: :class:`Interner`
+        :return: a handler for the same format, backend and fields
+        :rtype: :class:`JsonHandler`
+        :raises ValueError: if the handler is not for newline-delimited JSON
+        """
+        if self.decoder is not ndjson.Decoder:
+            raise ValueError('only newline-delimited JSON can be interned')
+        return self._derive(interner=interner or Interner())
+
+    def _derive(self, **changes):
+        options = {
+            'decoder': self.decoder,
+            'backend': self.backend,
+            'fields': self.fields,
+            'interner': self.interner,
+            'chunk_size': self.chunk_size,
+            **changes,
+        }
+        return type(self)(self.mime_type, **options)
 
     def parse(self, response):
         """Parse all JSON data from a response.
@@ -73,6 +679,14 @@ class JsonHandler(FormatHandler):
         :return: response data
         :rtype: JSON
         """
+        if self.decoder is json.JSONDecoder:
+            return self.loads(response.content)
+        if self.decoder is ndjson.Decoder:
+            return [
+                self.loads(line)
+                for line in response.content.splitlines()
+                if line.strip()
+            ]
         return response.json(cls=self.decoder)
 
     def parse_stream(self, response):
@@ -82,21 +696,224 @@ class JsonHandler(FormatHandler):
         :type response: :class:`requests.Response`
         :return: iterator over multiple JSON objects
         """
-        for line in response.iter_lines():
+        return self.parse_chunks(self.iter_chunks(response))
+
+    def parse_chunks(self, chunks):
+        # same as parsing with stream_parser, minus a call per line
+        loads = self.loads
+        splitter = LineSplitter()
+        for chunk in chunks:
+            for line in splitter.feed(chunk):
+                if line:
+                    yield loads(line)
+        for line in splitter.close():
             if line:
-                decoded_line = line.decode('utf-8')
-                yield json.loads(decoded_line)
+                yield loads(line)
+
+    def stream_parser(self):
+        return LineParser(self.parse_line)
+
+    def parse_line(self, line):
+        """Parse a single line of newline-delimited JSON.
+
+        :param bytes line: a line of the stream
+        :return: the JSON object, or ``None`` for a blank line
+        """
+        if line:
+            return self.loads(line)
+
+
+def _interned(loads, interner):
+    def loads_interned(data):
+        return interner(loads(data))
+
+    return loads_interned
+
+
+def decode_lines(
+    data, backend, converter=utils.noop, transform=None, fields=None
+):
+    """Decode and convert a batch of JSON lines.
+
+    This is the work done by the processes of a :class:`ParallelDecoder`.
+
+    :param bytes data: non-blank JSON lines, separated by ``\\n``
+    :param str backend: name of the JSON backend to use
+    :param func converter: function to handle field conversions
+    :param func transform: function applied to each converted record
+    :param tuple fields: names of the top-level fields to keep, or ``None``
+                         to keep them all
+    :return: the converted, and possibly transformed, records
+    :rtype: list
+    """
+    loads = json_loads(backend, fields)
+    records = [converter(loads(line)) for line in data.split(b'\n')]
+    return list(map(transform, records)) if transform else records
+
+
+class ParallelDecoder:
+    """Decode large newline-delimited JSON streams in a pool of processes.
+
+    The first ``threshold`` records of a stream are decoded in the calling
+    thread, so short streams never pay for the round trip to the pool.
+    Past that, lines are sent to the pool in batches that are decoded and
+    converted by the processes, and the records are yielded in order.
+
+    Records come back from the processes pickled, and unpickling them
+    costs the calling thread about as much as decoding them would. The
+    pool pays off when a ``transform`` also runs in the processes and
+    returns less than the whole records, such as the few fields needed.
+
+    The converter and the transform must be picklable, like the ``convert``
+    methods of :mod:`berserk.models` or any module-level function. The
+    conversions of the models keep the mode they had when taken, such as
+    compact records, so that all the records of a stream are alike. The pool
+    is started on first use and kept until :meth:`close` is called. The
+    :class:`Interner` of a handler, whose table lives in the calling
+    process, only applies to the records decoded there.
+
+    :param int workers: number of processes, by default one per CPU
+    :param int batch_size: number of records sent to a process at a time
+    :param int threshold: number of records decoded in the calling thread
+                          before switching to the pool
+    :param func transform: function applied to each converted record, whose
+                           results are yielded instead of the records
+    :param mp_context: multiprocessing context starting the processes, such
+                       as ``multiprocessing.get_context('spawn')``, or
+                       ``None`` for the default one
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        batch_size=1000,
+        threshold=10000,
+        transform=None,
+        mp_context=None,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.threshold = threshold
+        self.transform = transform
+        self.mp_context = mp_context
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def pool(self):
+        """The process pool, started on first use."""
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                self.workers, mp_context=self.mp_context
+            )
+        return self._pool
+
+    def close(self):
+        """Shut the process pool down."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def decode(
+        self, fmt, chunks, converter=utils.noop, apply_transform=True
+    ):
+        """Yield the records of a stream, decoded in parallel if it is long.
+
+        :param fmt: the handler of the stream, providing the JSON backend
+        :type fmt: :class:`JsonHandler`
+        :param chunks: chunks of the body of a stream response
+        :type chunks: iterable of bytes
+        :param func converter: function to handle field conversions
+        :param bool apply_transform: whether to apply :attr:`transform`;
+                                     callers that need the whole records,
+                                     such as resumable streams tracking
+                                     their position, apply it themselves
+        :return: iterator over the converted records
+        """
+        transform = self.transform if apply_transform else None
+        chunks = iter(chunks)
+        splitter = LineSplitter()
+        count = 0
+        for chunk in chunks:
+            lines = [line for line in splitter.feed(chunk) if line]
+            count += len(lines)
+            yield from self._decode(fmt, lines, converter, transform)
+            if count >= self.threshold:
+                break
+        else:
+            lines = [line for line in splitter.close() if line]
+            yield from self._decode(fmt, lines, converter, transform)
+            return
+        yield from self._decode_in_pool(
+            fmt, chunks, splitter, converter, transform
+        )
+
+    def _decode(self, fmt, lines, converter, transform):
+        records = [converter(fmt.loads(line)) for line in lines]
+        return map(transform, records) if transform else records
+
+    def _decode_in_pool(self, fmt, chunks, splitter, converter, transform):
+        # keep enough batches in flight to occupy every process
+        futures = collections.deque()
+        try:
+            for lines in self._batches(chunks, splitter):
+                futures.append(self.pool.submit(
+                    decode_lines,
+                    b'\n'.join(lines),
+                    fmt.backend,
+                    converter,
+                    transform,
+                    fmt.fields,
+                ))
+                if len(futures) > 2 * self.workers:
+                    yield from futures.popleft().result()
+            while futures:
+                yield from futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _batches(self, chunks, splitter):
+        size = self.batch_size
+        lines = []
+        for chunk in chunks:
+            lines.extend(line for line in splitter.feed(chunk) if line)
+            while len(lines) >= size:
+                yield lines[:size]
+                del lines[:size]
+        lines.extend(line for line in splitter.close() if line)
+        if lines:
+            yield lines
 
 
 class PgnHandler(FormatHandler):
-    """Handle PGN data."""
+    """Handle PGN data.
 
-    def __init__(self):
-        super().__init__(mime_type='application/x-chess-pgn')
+    Games that are not decoded are slices of the chunk they were read from,
+    and each keeps the whole chunk in memory for as long as it is held. To
+    keep many of them, hold ``bytes(game)`` copies instead, or the games of
+    :data:`PGN_GAMES`, which copy their own bytes.
 
-    def handle(self, *args, **kwargs):
-        kwargs['converter'] = utils.noop  # disable conversions
-        return super().handle(*args, **kwargs)
+    :param bool decode: whether to decode streamed games to text; if
+                        ``False``, they are returned as :class:`memoryview`
+                        objects over their UTF-8 bytes, to be decoded with
+                        :func:`decode_pgn` only when needed
+    :param int chunk_size: number of bytes to read from a stream at a time
+    """
+
+    def __init__(self, decode=True, chunk_size=CHUNK_SIZE):
+        super().__init__(
+            mime_type='application/x-chess-pgn', chunk_size=chunk_size
+        )
+        self.decode = decode
+
+    def get_converter(self, converter):
+        return utils.noop  # disable conversions
 
     def parse(self, response):
         """Parse all text data from a response.
@@ -115,19 +932,38 @@ class PgnHandler(FormatHandler):
         :type response: :class:`requests.Response`
         :return: iterator over multiple PGN texts
         """
-        lines = []
-        last_line = True
-        for line in response.iter_lines():
-            decoded_line = line.decode('utf-8')
-            if last_line or decoded_line:
-                lines.append(decoded_line)
-            else:
-                yield '\n'.join(lines).strip()
-                lines = []
-            last_line = decoded_line
+        return self.parse_chunks(self.iter_chunks(response))
 
-        if lines:
-            yield '\n'.join(lines).strip()
+    def stream_parser(self):
+        return PgnSplitter(decode_pgn if self.decode else None)
+
+
+class PgnGameHandler(PgnHandler):
+    """Handle PGN data as lazily parsed games.
+
+    Games are returned as :class:`~berserk.pgn.PgnGame` objects, whose tag
+    pairs are parsed as the stream is split and whose movetext is only
+    parsed when accessed.
+
+    :param int chunk_size: number of bytes to read from a stream at a time
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        super().__init__(decode=False, chunk_size=chunk_size)
+
+    def parse(self, response):
+        """Parse all games from a response.
+
+        :param response: raw response
+        :type response: :class:`requests.Response`
+        :return: the games
+        :rtype: list
+        """
+        splitter = self.stream_parser()
+        return splitter.feed(response.content) + splitter.close()
+
+    def stream_parser(self):
+        return PgnSplitter(pgn.PgnGame)
 
 
 class TextHandler(FormatHandler):
@@ -138,7 +974,155 @@ class TextHandler(FormatHandler):
         return response.text
 
     def parse_stream(self, response):
-        yield from response.iter_lines()
+        return self.parse_chunks(self.iter_chunks(response))
+
+    def stream_parser(self):
+        return LineParser(bytes)
+
+
+#: Progress of a raw copy: bytes written so far, and records seen if they
+#: are counted (``None`` otherwise)
+Progress = collections.namedtuple('Progress', 'bytes records')
+
+
+class RawHandler(FormatHandler):
+    """Copy the body of responses to a file as is, without parsing it.
+
+    The stream is read in large chunks that are written straight to the file,
+    so nothing is decoded or split. Records can still be counted on the fly,
+    by counting non-blank lines for JSON or ``[Event`` tags for PGN.
+
+    :param fmt: the format to request
+    :type fmt: :class:`FormatHandler`
+    :param file: binary file object to write to
+    :param func progress: function called with the :class:`Progress` after
+                          each chunk is written
+    :param bool count: whether to count the records
+    :param int chunk_size: number of bytes to read at a time
+    """
+
+    def __init__(
+        self, fmt, file, progress=None, count=False, chunk_size=RAW_CHUNK_SIZE
+    ):
+        super().__init__(mime_type=fmt.mime_type, chunk_size=chunk_size)
+        self.headers = fmt.headers
+        self.file = file
+        self.progress = progress
+        self.marker = None
+        if count:
+            self.marker = b'[Event ' if isinstance(fmt, PgnHandler) else b'\n'
+
+    def get_converter(self, converter):
+        return utils.noop  # nothing is parsed
+
+    def parse(self, response):
+        """Copy the whole body of a response.
+
+        :param response: raw response
+        :type response: :class:`requests.Response`
+        :return: the progress of the copy
+        :rtype: :class:`Progress`
+        """
+        writer = self.stream_parser()
+        return (writer.feed(response.content) + writer.close())[-1]
+
+    def parse_stream(self, response):
+        """Copy the body of a stream response chunk by chunk.
+
+        :param response: raw response
+        :type response: :class:`requests.Response`
+        :return: iterator over the :class:`Progress` after each chunk
+        """
+        return self.parse_chunks(self.iter_chunks(response))
+
+    def stream_parser(self):
+        return RawWriter(self.file, marker=self.marker, progress=self.progress)
+
+
+class RawWriter:
+    """Write the chunks of a stream to a file, keeping count.
+
+    :param file: binary file object to write to
+    :param bytes marker: bytes marking each record, to count them; with a
+                         newline, the lines that are not blank are counted
+    :param func progress: function called with the :class:`Progress` after
+                          each chunk is written
+    """
+
+    def __init__(self, file, marker=None, progress=None):
+        self.file = file
+        self.marker = marker
+        self.progress = progress
+        self.bytes = 0
+        self.records = 0 if marker else None
+        # the stream starts as if after a blank line
+        self.tail = b'\n' if marker == b'\n' else b''
+
+    def feed(self, chunk):
+        """Write the next chunk of the stream.
+
+        :param bytes chunk: the chunk
+        :return: the progress after writing it
+        :rtype: list
+        """
+        self.file.write(chunk)
+        self.bytes += len(chunk)
+        if self.marker == b'\n':
+            self._count_lines(chunk)
+        elif self.marker:
+            self._count(chunk)
+        progress = Progress(self.bytes, self.records)
+        if self.progress:
+            self.progress(progress)
+        return [progress]
+
+    def close(self):
+        """Signal the end of the stream.
+
+        :return: the final progress
+        :rtype: list
+        """
+        self.file.flush()
+        if self.marker == b'\n' and self.tail != b'\n':
+            # the last line has no newline of its own
+            self.records += 1
+            self.tail = b'\n'
+        return [Progress(self.bytes, self.records)]
+
+    def _count(self, chunk):
+        # markers split across chunks start in the tail of the stream so
+        # far, which is too short to hold a whole marker by itself
+        overlap = len(self.marker) - 1
+        edge = self.tail + chunk[:overlap]
+        self.records += edge.count(self.marker) + chunk.count(self.marker)
+        if overlap:
+            self.tail = (self.tail + chunk[-overlap:])[-overlap:]
+
+    def _count_lines(self, chunk):
+        # blank lines, such as keep-alives, only lengthen runs of newlines,
+        # so each run ends one line unless the stream was already at one
+        while b'\n\n' in chunk:
+            chunk = chunk.replace(b'\n\n', b'\n')
+        ends = chunk.count(b'\n')
+        if chunk[:1] == b'\n' and self.tail == b'\n':
+            ends -= 1
+        self.records += ends
+        self.tail = chunk[-1:] or self.tail
+
+
+@contextlib.contextmanager
+def open_output(to):
+    """Open the destination of a raw copy.
+
+    :param to: path of a file, or binary file object, to write to
+    :return: context manager giving a binary file object; files opened from
+             a path are closed on exit
+    """
+    if hasattr(to, 'write'):
+        yield to
+        return
+    with open(to, 'wb') as file:
+        yield file
 
 
 #: Basic text
@@ -155,3 +1139,17 @@ NDJSON = JsonHandler(mime_type='application/x-ndjson', decoder=ndjson.Decoder)
 
 #: Handles PGN
 PGN = PgnHandler()
+
+#: Handles PGN as lazily parsed games
+PGN_GAMES = PgnGameHandler()
+
+
+def set_json_backend(backend=None):
+    """Switch the JSON backend of the built-in JSON handlers.
+
+    :param str backend: name of the backend (see :data:`JSON_BACKENDS`), or
+                        ``None`` for the fastest one available
+    :raises ValueError: if the backend is not available
+    """
+    for handler in (JSON, LIJSON, NDJSON):
+        handler.use_backend(backend)
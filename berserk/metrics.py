@@ -0,0 +1,540 @@
+# -*- coding: utf-8 -*-
+"""Instrumentation of the requests made by the clients.
+
+Pass an object implementing :class:`Hooks` to a client to be told about each
+request as it happens. :class:`MetricsCollector` is a ready-made
+implementation that keeps latency histograms per endpoint:
+
+.. code-block:: python
+
+    >>> collector = berserk.metrics.MetricsCollector()
+    >>> client = berserk.Client(session, hooks=collector)
+    >>> print(collector.to_prometheus())
+"""
+import bisect
+import collections
+import contextlib
+import datetime
+import re
+import threading
+import time
+import urllib
+
+from . import compression
+
+#: Path templates of the endpoints used by the clients
+ENDPOINTS = [
+    'api/account',
+    'api/account/email',
+    'api/account/kid',
+    'api/account/playing',
+    'api/account/preferences',
+    'api/board/game/stream/{game_id}',
+    'api/board/game/{game_id}/abort',
+    'api/board/game/{game_id}/chat',
+    'api/board/game/{game_id}/draw/{accept}',
+    'api/board/game/{game_id}/move/{move}',
+    'api/board/game/{game_id}/resign',
+    'api/board/seek',
+    'api/bot/account/upgrade',
+    'api/bot/game/stream/{game_id}',
+    'api/bot/game/{game_id}/abort',
+    'api/bot/game/{game_id}/chat',
+    'api/bot/game/{game_id}/move/{move}',
+    'api/bot/game/{game_id}/resign',
+    'api/bot/online',
+    'api/challenge/ai',
+    'api/challenge/open',
+    'api/challenge/{challenge_id}/accept',
+    'api/challenge/{challenge_id}/cancel',
+    'api/challenge/{challenge_id}/decline',
+    'api/challenge/{username}',
+    'api/crosstable/{user1}/{user2}',
+    'api/games/user/{username}',
+    'api/import',
+    'api/puzzle/activity',
+    'api/puzzle/daily',
+    'api/puzzle/dashboard/{days}',
+    'api/rel/follow/{username}',
+    'api/rel/unfollow/{username}',
+    'api/simul',
+    'api/storm/dashboard/{username}',
+    'api/stream/event',
+    'api/stream/game/{game_id}',
+    'api/stream/games-by-users',
+    'api/team/all',
+    'api/team/of/{username}',
+    'api/team/search',
+    'api/team/{team_id}',
+    'api/team/{team_id}/arena',
+    'api/team/{team_id}/swiss',
+    'api/team/{team_id}/users',
+    'api/tournament',
+    'api/tournament/{id}/games',
+    'api/tournament/{id}/results',
+    'api/tv/channels',
+    'api/tv/feed',
+    'api/tv/{channel}',
+    'api/user/puzzle-activity',
+    'api/user/{username}',
+    'api/user/{username}/activity',
+    'api/user/{username}/current-game',
+    'api/user/{username}/followers',
+    'api/user/{username}/following',
+    'api/user/{username}/perf/{perf}',
+    'api/user/{username}/rating-history',
+    'api/user/{username}/tournament/created',
+    'api/users',
+    'api/users/status',
+    'broadcast/new',
+    'broadcast/{slug}/{broadcast_id}',
+    'broadcast/{slug}/{broadcast_id}/push',
+    'game/export/{game_id}',
+    'games/export/_ids',
+    'lichess',
+    'masters',
+    'player',
+    'player/top/{count}/{perf_type}',
+    'streamer/live',
+    'study/{study_id}.pgn',
+    'study/{study_id}/{chapter_id}.pgn',
+    'team/{team_id}/join',
+    'team/{team_id}/kick/{user_id}',
+    'team/{team_id}/pm-all',
+    'team/{team_id}/quit',
+    'team/{team_id}/users',
+    'tv/channels',
+]
+
+
+def _compile(template):
+    parts = re.split(r'(\{\w+\})', template)
+    pattern = ''.join(
+        '[^/]+' if part.startswith('{') else re.escape(part)
+        for part in parts
+    )
+    return re.compile(pattern)
+
+
+# most specific templates first, so literal segments win over placeholders
+_ROUTES = [
+    (_compile(template), template)
+    for template in sorted(
+        ENDPOINTS, key=lambda t: (t.count('{'), -len(t))
+    )
+]
+
+
+def endpoint(url):
+    """Return the endpoint template of a URL.
+
+    :param str url: full URL of a request
+    :return: the matching template from :data:`ENDPOINTS`, or the path
+             itself if there is none
+    :rtype: str
+    """
+    path = urllib.parse.urlsplit(url).path.lstrip('/')
+    for pattern, template in _ROUTES:
+        if pattern.fullmatch(path):
+            return template
+    return path
+
+
+class RequestEvent:
+    """Measurements of a single request, passed to the :class:`Hooks`.
+
+    Times are in seconds. The time to first byte is the time until the
+    response headers arrived. The read time covers waiting on the body of a
+    stream, and the parse time covers splitting, decoding, and converting
+    its records, so comparing the two tells network-bound requests from
+    parse-bound ones. The bytes read are counted after decompression, and
+    the wire bytes before it. Records are only counted for streams.
+
+    :param str method: HTTP verb
+    :param str url: full URL of the request
+    """
+
+    def __init__(self, method, url):
+        self.method = method
+        self.url = url
+        self.endpoint = endpoint(url)
+        self.is_stream = False
+        self.status = None
+        self.error = None
+        self.ttfb = None
+        self.latency = None
+        self.read_time = 0.0
+        self.parse_time = 0.0
+        self.bytes_read = 0
+        self.wire_bytes = None
+        self.records = 0
+
+    def __repr__(self):
+        return (
+            f'<RequestEvent {self.method} {self.endpoint} '
+            f'status={self.status} latency={self.latency}>'
+        )
+
+
+class Hooks:
+    """Callbacks fired around each request.
+
+    Subclass and override the methods of interest. Each receives the
+    :class:`RequestEvent` of the request, which is filled in as the request
+    progresses. Hooks run on the thread making the request, so keep them
+    fast.
+    """
+
+    def before_request(self, event):
+        """Called just before the request is sent.
+
+        :param event: the request, with only its method and URL filled in
+        :type event: :class:`RequestEvent`
+        """
+
+    def on_record(self, event, record):
+        """Called for each record parsed from a stream.
+
+        :param event: the request so far
+        :type event: :class:`RequestEvent`
+        :param record: the parsed record
+        """
+
+    def after_request(self, event):
+        """Called once the response has been fully read, or has failed.
+
+        :param event: the completed request
+        :type event: :class:`RequestEvent`
+        """
+
+
+class MeteredResponse:
+    """Response proxy that measures the time spent reading from it.
+
+    :param response: the response to measure
+    :type response: :class:`requests.Response`
+    :param event: the event to record the measurements on
+    :type event: :class:`RequestEvent`
+    """
+
+    def __init__(self, response, event):
+        self._response = response
+        self._event = event
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def iter_lines(self, *args, **kwargs):
+        return self._metered(
+            self._response.iter_lines(*args, **kwargs), newlines=1
+        )
+
+    def iter_content(self, *args, **kwargs):
+        return self._metered(self._response.iter_content(*args, **kwargs))
+
+    def _metered(self, iterator, newlines=0):
+        event = self._event
+        while True:
+            start = time.perf_counter()
+            try:
+                data = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                event.read_time += time.perf_counter() - start
+            event.bytes_read += len(data) + newlines
+            yield data
+
+
+class Meter:
+    """Takes the measurements of a request and fires the hooks.
+
+    :param hooks: the hooks to fire
+    :type hooks: :class:`Hooks`
+    :param str method: HTTP verb
+    :param str url: full URL of the request
+    :param bool is_stream: whether the response is a stream
+    """
+
+    def __init__(self, hooks, method, url, is_stream=False):
+        self.hooks = hooks
+        self.event = RequestEvent(method, url)
+        self.event.is_stream = is_stream
+        self.started_at = None
+        self.finished = False
+        self.response = None
+
+    def start(self):
+        """Fire :meth:`Hooks.before_request` and start the clock."""
+        self.hooks.before_request(self.event)
+        self.started_at = time.perf_counter()
+
+    def received(self, response, ttfb=None):
+        """Record the arrival of the response headers.
+
+        :param response: the response
+        :param ttfb: time to first byte, if known more precisely than the
+                     time since :meth:`start`
+        :type ttfb: float or :class:`datetime.timedelta`
+        """
+        self.response = response
+        self.event.status = response.status_code
+        if ttfb is None:
+            ttfb = time.perf_counter() - self.started_at
+        elif isinstance(ttfb, datetime.timedelta):
+            ttfb = ttfb.total_seconds()
+        self.event.ttfb = ttfb
+
+    @contextlib.contextmanager
+    def parsing(self, response=None):
+        """Time the parsing of a response, or of part of one.
+
+        :param response: a fully read response, whose body size is counted
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.event.parse_time += time.perf_counter() - start
+            if response is not None:
+                self.event.bytes_read += len(response.content)
+
+    def wrap(self, response):
+        """Return the response, measuring the reads from its body."""
+        self.response = response
+        return MeteredResponse(response, self.event)
+
+    def record(self, record):
+        """Count a record and fire :meth:`Hooks.on_record`."""
+        self.event.records += 1
+        self.hooks.on_record(self.event, record)
+
+    def stream(self, records):
+        """Yield the records of a stream, then finish.
+
+        The time spent producing the records, less the time spent reading
+        the body of a response from :meth:`wrap`, is counted as parse time.
+
+        :param records: iterable of records
+        :return: iterator over the same records
+        """
+        busy = 0.0
+        error = None
+        iterator = iter(records)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    record = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    busy += time.perf_counter() - start
+                self.record(record)
+                yield record
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.event.parse_time += busy - self.event.read_time
+            self.finish(error)
+
+    async def aread(self, chunks):
+        """Yield the chunks of a response body, measuring the reads.
+
+        :param chunks: async iterable of chunks
+        :return: async iterator over the same chunks
+        """
+        iterator = chunks.__aiter__()
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                self.event.read_time += time.perf_counter() - start
+            self.event.bytes_read += len(chunk)
+            yield chunk
+
+    def finish(self, error=None):
+        """Stop the clock and fire :meth:`Hooks.after_request`, once.
+
+        :param Exception error: the error the request failed with, if any
+        """
+        if self.finished:
+            return
+        self.finished = True
+        event = self.event
+        event.latency = time.perf_counter() - self.started_at
+        if self.response is not None:
+            event.wire_bytes = compression.wire_size(self.response)
+        if error is not None:
+            event.error = error
+            event.status = getattr(error, 'status_code', event.status)
+        self.hooks.after_request(event)
+
+
+class NullMeter:
+    """Stand-in for :class:`Meter` when there are no hooks to fire."""
+
+    def start(self):
+        pass
+
+    def received(self, response, ttfb=None):
+        pass
+
+    def parsing(self, response=None):
+        return contextlib.nullcontext()
+
+    def wrap(self, response):
+        return response
+
+    def record(self, record):
+        pass
+
+    def stream(self, records):
+        return records
+
+    def aread(self, chunks):
+        return chunks
+
+    def finish(self, error=None):
+        pass
+
+
+_NULL_METER = NullMeter()
+
+
+def meter(hooks, method, url, is_stream=False):
+    """Return a meter for a request.
+
+    :param hooks: the hooks to fire, if any
+    :type hooks: :class:`Hooks`
+    :param str method: HTTP verb
+    :param str url: full URL of the request
+    :param bool is_stream: whether the response is a stream
+    :return: a :class:`Meter`, or a :class:`NullMeter` if ``hooks`` is
+             ``None``
+    """
+    if hooks is None:
+        return _NULL_METER
+    return Meter(hooks, method, url, is_stream=is_stream)
+
+
+class MetricsCollector(Hooks):
+    """Hooks that aggregate request metrics per endpoint.
+
+    Latencies and times to first byte are kept as histograms, alongside
+    counts of requests by status and totals of bytes, records, read time,
+    and parse time. The metrics can be exported in the Prometheus text
+    format with :meth:`to_prometheus`.
+
+    :param list buckets: upper bounds of the histogram buckets, in seconds
+    :param str prefix: prefix for the names of the exported metrics
+    """
+
+    #: default upper bounds of the histogram buckets, in seconds
+    DEFAULT_BUCKETS = (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+    )
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='berserk'):
+        self.buckets = sorted(buckets)
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Discard all metrics collected so far."""
+        with self._lock:
+            self.requests = collections.Counter()
+            self.latency = {}
+            self.ttfb = {}
+            self.totals = collections.defaultdict(collections.Counter)
+
+    def after_request(self, event):
+        status = event.status if event.error is None else 'error'
+        with self._lock:
+            self.requests[event.endpoint, status] += 1
+            self._observe(self.latency, event.endpoint, event.latency)
+            self._observe(self.ttfb, event.endpoint, event.ttfb)
+            totals = self.totals[event.endpoint]
+            totals['bytes'] += event.bytes_read
+            totals['wire_bytes'] += (
+                event.bytes_read
+                if event.wire_bytes is None
+                else event.wire_bytes
+            )
+            totals['records'] += event.records
+            totals['read_seconds'] += event.read_time
+            totals['parse_seconds'] += event.parse_time
+
+    def _observe(self, histograms, key, value):
+        if value is None:
+            return
+        if key not in histograms:
+            histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        counts, _ = histogram = histograms[key]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        histogram[1] += value
+
+    def to_prometheus(self):
+        """Export the metrics in the Prometheus text exposition format.
+
+        :return: the metrics
+        :rtype: str
+        """
+        p = self.prefix
+        lines = []
+        with self._lock:
+            lines += [
+                f'# HELP {p}_requests_total Requests by endpoint and status.',
+                f'# TYPE {p}_requests_total counter',
+            ]
+            for (name, status), count in sorted(
+                self.requests.items(), key=lambda item: str(item[0])
+            ):
+                labels = f'endpoint="{name}",status="{status}"'
+                lines.append(f'{p}_requests_total{{{labels}}} {count}')
+
+            lines += self._histogram(
+                f'{p}_request_duration_seconds',
+                'Total latency of requests, including reading the body.',
+                self.latency,
+            )
+            lines += self._histogram(
+                f'{p}_time_to_first_byte_seconds',
+                'Time until the response headers arrived.',
+                self.ttfb,
+            )
+            for total, help_text in [
+                ('bytes', 'Bytes of response bodies, once decompressed.'),
+                ('wire_bytes', 'Bytes of response bodies, as received.'),
+                ('records', 'Records parsed from responses.'),
+                ('read_seconds', 'Time spent waiting on response bodies.'),
+                ('parse_seconds', 'Time spent parsing response bodies.'),
+            ]:
+                name = f'{p}_{total}_total'
+                lines += [
+                    f'# HELP {name} {help_text}',
+                    f'# TYPE {name} counter',
+                ]
+                for key in sorted(self.totals):
+                    value = self.totals[key][total]
+                    lines.append(f'{name}{{endpoint="{key}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def _histogram(self, name, help_text, histograms):
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for key in sorted(histograms):
+            counts, total = histograms[key]
+            cumulative = 0
+            bounds = [*self.buckets, '+Inf']
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = f'endpoint="{key}",le="{bound}"'
+                lines.append(f'{name}_bucket{{{labels}}} {cumulative}')
+            lines.append(f'{name}_sum{{endpoint="{key}"}} {total}')
+            lines.append(f'{name}_count{{endpoint="{key}"}} {cumulative}')
+        return lines
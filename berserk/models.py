@@ -1,26 +1,272 @@
 # -*- coding: utf-8 -*-
+from . import records
 from . import utils
 
 
 class model(type):
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        cls._compile()
+
+    def __setattr__(cls, name, value):
+        super().__setattr__(name, value)
+        if not name.startswith('_'):
+            cls._compile()
+
+    def __delattr__(cls, name):
+        super().__delattr__(name)
+        if not name.startswith('_'):
+            cls._compile()
+
     @property
     def conversions(cls):
         return {k: v for k, v in vars(cls).items() if not k.startswith('_')}
 
+    def _compile(cls):
+        # the plan of (field, function) pairs applied to each record, built
+        # once instead of on every conversion
+        cls._plan = tuple(cls.conversions.items())
+        cls._record = type(f'{cls.__name__}Record', (LazyRecord,), {
+            '__slots__': (),
+            '__module__': cls.__module__,
+            '__qualname__': f'{cls.__qualname__}._record',
+            '_functions': dict(cls._plan),
+        })
+
+
+class LazyRecord(dict):
+    """A record whose fields are converted when first read.
+
+    Reading a field through the mapping interface converts it and keeps the
+    result, so fields that are never read are never converted. Copying the
+    record into a new :class:`dict`, comparing it, or iterating over its
+    values or items converts all the fields left, and so does
+    :func:`json.dumps`, which goes through the items. Only
+    :meth:`items_raw` leaves the fields that were not read as they are.
+
+    Subclasses set the conversion function of each field in
+    ``_functions``. Each model has its own, so creating a record costs no
+    more than copying a :class:`dict`.
+    """
+
+    __slots__ = ('_converted',)
+    _functions = {}
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        func = self._functions.get(key)
+        if func is not None and key not in self._done():
+            value = func(value)
+            self._set_converted(key, value)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self._functions:
+            self._set_converted(key, value)
+        else:
+            dict.__setitem__(self, key, value)
+
+    def __iter__(self):
+        # defined so that dict(record) and {**record} read every field with
+        # __getitem__ instead of copying the raw values
+        return dict.__iter__(self)
+
+    def __eq__(self, other):
+        self.convert_all()
+        if isinstance(other, LazyRecord):
+            other.convert_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        self.convert_all()
+        return dict.__repr__(self)
+
+    def __reduce__(self):
+        state = {'_converted': set(self._done())}
+        return type(self), (dict(self.items_raw()),), (None, state)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        if not self:
+            raise KeyError('popitem(): dictionary is empty')
+        # dict views are only reversible from Python 3.8
+        key = list(dict.keys(self))[-1]
+        return key, self.pop(key)
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def values(self):
+        self.convert_all()
+        return dict.values(self)
+
+    def items(self):
+        self.convert_all()
+        return dict.items(self)
+
+    def items_raw(self):
+        """Return the items of the record, leaving pending fields as is.
+
+        :return: view of the items
+        """
+        return dict.items(self)
+
+    def copy(self):
+        record = type(self)(self.items_raw())
+        record._converted = set(self._done())
+        return record
+
+    def convert_all(self):
+        """Convert all the fields left."""
+        for key in self._functions:
+            if key in self:
+                self[key]
+
+    def _done(self):
+        try:
+            return self._converted
+        except AttributeError:
+            return ()
+
+    def _set_converted(self, key, value):
+        try:
+            self._converted.add(key)
+        except AttributeError:
+            self._converted = {key}
+        dict.__setitem__(self, key, value)
+
+
+class Conversion:
+    """The conversion of records by a model, in the mode it was in.
+
+    :attr:`Model.convert` returns one, so the mode set with
+    :func:`set_lazy` or :func:`set_compact` when a request is made applies
+    to all of its records, even when the conversion is pickled and sent to
+    the processes of a :class:`~berserk.formats.ParallelDecoder`, which
+    never see the mode of the models in the calling process.
+
+    :param model: the model converting the records
+    :type model: :class:`Model` subclass
+    :param str mode: ``'eager'``, ``'lazy'`` or ``'compact'``
+    """
+
+    __slots__ = ('model', 'mode')
+
+    def __init__(self, model, mode):
+        self.model = model
+        self.mode = mode
+
+    def __call__(self, data):
+        if isinstance(data, (list, tuple)):
+            return [self.convert_one(v) for v in data]
+        return self.convert_one(data)
+
+    def __eq__(self, other):
+        if not isinstance(other, Conversion):
+            return NotImplemented
+        return (self.model, self.mode) == (other.model, other.mode)
+
+    def __hash__(self):
+        return hash((self.model, self.mode))
+
+    def __repr__(self):
+        return f'<Conversion {self.model.__name__} {self.mode}>'
+
+    def __reduce__(self):
+        return type(self), (self.model, self.mode)
+
+    def convert_one(self, data):
+        """Convert a single record.
+
+        :param dict data: the record
+        :return: the converted record
+        """
+        if self.mode == 'lazy':
+            return self.model._record(data)
+        if self.mode == 'compact':
+            return self.model._compact.from_dict(self.model._convert(data))
+        return self.model._convert(data)
+
+
+class _CurrentConversion:
+    # the conversion of a model in its current mode, as a class attribute
+    def __get__(self, instance, owner):
+        return Conversion(owner, owner._mode)
+
 
 class Model(metaclass=model):
+    _mode = 'eager'
+    _compact = None
+
+    convert = _CurrentConversion()
+
     @classmethod
-    def convert(cls, data):
-        if isinstance(data, (list, tuple)):
-            return [cls.convert_one(v) for v in data]
-        return cls.convert_one(data)
+    def convert_lazy(cls, data):
+        return Conversion(cls, 'lazy')(data)
+
+    @classmethod
+    def convert_compact(cls, data):
+        return Conversion(cls, 'compact')(data)
 
     @classmethod
     def convert_one(cls, data):
-        for k in set(data) & set(cls.conversions):
-            data[k] = cls.conversions[k](data[k])
+        return cls.convert.convert_one(data)
+
+    @classmethod
+    def _convert(cls, data):
+        for k, func in cls._plan:
+            if k in data:
+                data[k] = func(data[k])
         return data
 
+    @classmethod
+    def convert_columns(cls, data):
+        """Convert a batch of records, some fields as whole columns.
+
+        Fields whose conversion has a batch form in
+        :data:`~berserk.utils.BATCH_CONVERSIONS`, such as timestamps, are
+        converted at once into NumPy arrays and left as is in the records.
+        The other fields are converted in the records.
+
+        :param data: the records
+        :type data: iterable of dict
+        :return: the records, and the arrays of values by field
+        :rtype: tuple
+        """
+        data = list(data)
+        columns = {}
+        rest = []
+        for k, func in cls._plan:
+            batch = utils.BATCH_CONVERSIONS.get(func)
+            if batch is None:
+                rest.append((k, func))
+            else:
+                columns[k] = batch([record.get(k) for record in data])
+        for record in data:
+            for k, func in rest:
+                if k in record:
+                    record[k] = func(record[k])
+        return data, columns
+
     @classmethod
     def convert_values(cls, data):
         for k in data:
@@ -34,6 +280,7 @@ class Account(Model):
 
 
 class User(Model):
+    _compact = records.User
     createdAt = utils.datetime_from_millis
     seenAt = utils.datetime_from_millis
 
@@ -43,11 +290,13 @@ class Activity(Model):
 
 
 class Game(Model):
+    _compact = records.Game
     createdAt = utils.datetime_from_millis
     lastMoveAt = utils.datetime_from_millis
 
 
 class GameState(Model):
+    _compact = records.GameState
     createdAt = utils.datetime_from_millis
     wtime = utils.datetime_from_millis
     btime = utils.datetime_from_millis
@@ -75,4 +324,53 @@ class RatingHistory(Model):
 
 
 class PuzzleActivity(Model):
+    _compact = records.PuzzleActivity
     date = utils.datetime_from_millis
+
+
+def set_lazy(lazy=True, models=None):
+    """Switch models between converting fields up front and on access.
+
+    In lazy mode, models return a :class:`LazyRecord` for each record
+    instead of converting its fields in place, so the cost of building
+    objects such as :class:`~datetime.datetime` is only paid for the fields
+    that are read.
+
+    :param bool lazy: ``True`` to convert fields on access, ``False`` to
+                      convert them up front
+    :param models: models to switch, by default all of them
+    :type models: iterable of :class:`Model` subclasses
+    """
+    if models is None:
+        models = _subclasses(Model)
+    for cls in models:
+        cls._mode = 'lazy' if lazy else 'eager'
+
+
+def set_compact(compact=True, models=None):
+    """Switch models between returning dicts and compact records.
+
+    In compact mode, models convert the fields of each record up front,
+    then return them as a :class:`~berserk.records.Record` that keeps the
+    top-level fields in ``__slots__``, which takes much less memory than a
+    :class:`dict` when many records are kept.
+
+    :param bool compact: ``True`` to return compact records, ``False`` to
+                         return dicts
+    :param models: models to switch, by default all those that have a
+                   compact record type
+    :type models: iterable of :class:`Model` subclasses
+    :raises ValueError: if one of the models has no compact record type
+    """
+    if models is None:
+        models = [cls for cls in _subclasses(Model) if cls._compact]
+    for cls in models:
+        if cls._compact is None:
+            raise ValueError(f'{cls.__name__} has no compact record type')
+        cls._mode = 'compact' if compact else 'eager'
+
+
+def _subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
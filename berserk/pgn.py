@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Lazily parsed games from PGN exports.
+
+Only the tag pairs of a :class:`PgnGame` are parsed up front, so filtering a
+large export on ratings, openings or dates costs little more than splitting
+it. The movetext is decoded and parsed the first time the moves, comments,
+clocks or evaluations of a game are accessed.
+"""
+import re
+
+from . import utils
+
+_TOKEN = re.compile(
+    r'''
+    \{(?P<comment>[^}]*)\}              # comment
+    | ;(?P<line_comment>[^\n]*)         # comment to the end of the line
+    | (?P<open>\()                      # start of a variation
+    | (?P<close>\))                     # end of a variation
+    | (?P<result>1-0|0-1|1/2-1/2|\*)    # game termination
+    | \d+\.+                            # move number
+    | \$\d+                             # numeric annotation glyph
+    | (?P<san>[^\s{}();$]+)             # move
+    ''',
+    re.VERBOSE,
+)
+
+_COMMAND = re.compile(r'\[%(\w+)\s+([^\]]*)\]')
+
+
+def parse_clock(value):
+    """Parse the value of a ``[%clk]`` command.
+
+    :param str value: time in ``h:mm:ss`` format, with optional fractions
+                      of a second
+    :return: the time in seconds
+    :rtype: float
+    """
+    hours, minutes, seconds = value.split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def parse_eval(value):
+    """Parse the value of an ``[%eval]`` command.
+
+    :param str value: evaluation in pawns, or a mate in ``#n`` format,
+                      optionally followed by the search depth
+    :return: the evaluation in pawns and the moves to mate, one of which is
+             ``None``
+    :rtype: tuple
+    """
+    value = value.split(',', 1)[0].strip()
+    if value.startswith('#'):
+        return None, int(value[1:])
+    return float(value), None
+
+
+class PgnGame:
+    """A game from a PGN export, parsed lazily.
+
+    The lists of moves, comments, clocks, evaluations and mates all have one
+    item per move of the main line, ``None`` where a move has no such
+    annotation. Moves in variations are skipped.
+
+    :param game: UTF-8 encoded PGN of a single game
+    :type game: bytes-like object
+    """
+
+    __slots__ = ('tags', '_pgn', '_start', '_parsed')
+
+    def __init__(self, game):
+        self._pgn = bytes(game)
+        if self._pgn.startswith(b'['):
+            end = self._pgn.find(b'\n\n')
+            self._start = len(self._pgn) if end == -1 else end
+        else:
+            self._start = 0
+        #: tag values by name
+        self.tags = utils.pgn_tags(str(self._pgn[:self._start], 'utf-8'))
+        self._parsed = None
+
+    def __str__(self):
+        return str(self._pgn, 'utf-8')
+
+    def __repr__(self):
+        white = self.tags.get('White', '?')
+        black = self.tags.get('Black', '?')
+        return f'<PgnGame {white} vs {black}>'
+
+    def __getitem__(self, tag):
+        return self.tags[tag]
+
+    def get(self, tag, default=None):
+        """Return the value of a tag.
+
+        :param str tag: name of the tag
+        :param default: value returned if the game has no such tag
+        :return: value of the tag
+        """
+        return self.tags.get(tag, default)
+
+    @property
+    def game_id(self):
+        """Lichess game ID, from the ``Site`` tag."""
+        return self.tags['Site'].rstrip('/').rsplit('/', 1)[-1]
+
+    @property
+    def movetext(self):
+        """Text of the game after the tag pairs."""
+        return str(self._pgn[self._start:], 'utf-8').strip()
+
+    @property
+    def moves(self):
+        """Moves of the main line, in SAN."""
+        return self._parse()[0]
+
+    @property
+    def comments(self):
+        """Text of the comments after each move, without their commands."""
+        return self._parse()[1]
+
+    @property
+    def clocks(self):
+        """Remaining time in seconds after each move, from ``[%clk]``."""
+        return self._parse()[2]
+
+    @property
+    def evals(self):
+        """Evaluation in pawns after each move, from ``[%eval]``."""
+        return self._parse()[3]
+
+    @property
+    def mates(self):
+        """Moves to mate after each move, from ``[%eval #n]``."""
+        return self._parse()[4]
+
+    def _parse(self):
+        if self._parsed is None:
+            self._parsed = _parse_movetext(self.movetext)
+        return self._parsed
+
+
+def main_line(movetext):
+    """Split the main line of a movetext into its moves and their comments.
+
+    Moves in variations, and the comments after them, are skipped.
+
+    :param str movetext: text of a game after its tag pairs
+    :return: the moves in SAN, and for each move the list of the comments
+             after it, commands included
+    :rtype: tuple
+    """
+    moves = []
+    comments = []
+    depth = 0
+    for token in _TOKEN.finditer(movetext):
+        kind = token.lastgroup
+        if kind == 'open':
+            depth += 1
+        elif kind == 'close':
+            depth -= 1
+        elif depth:
+            continue
+        elif kind == 'san':
+            moves.append(token.group('san').rstrip('!?'))
+            comments.append([])
+        elif kind in ('comment', 'line_comment') and moves:
+            comments[-1].append(token.group(kind))
+    return moves, comments
+
+
+def _parse_movetext(movetext):
+    moves, comments = main_line(movetext)
+    columns = [moves] + [[None] * len(moves) for _ in range(4)]
+    for ply, texts in enumerate(comments):
+        for comment in texts:
+            _annotate(columns, ply, comment)
+    return columns
+
+
+def _annotate(columns, ply, comment):
+    # attach a comment and its commands to a move
+    _, comments, clocks, evals, mates = columns
+    text = _COMMAND.sub('', comment).strip()
+    if text:
+        comments[ply] = f'{comments[ply]} {text}' if comments[ply] else text
+    for name, value in _COMMAND.findall(comment):
+        if name == 'clk':
+            clocks[ply] = parse_clock(value)
+        elif name == 'eval':
+            evals[ply], mates[ply] = parse_eval(value)
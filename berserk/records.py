@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""Compact record types for high-volume streams.
+
+A record decoded from JSON is a :class:`dict`, and the hash table of a dict
+costs several hundred bytes on top of its values. The classes of this module
+hold the top-level fields of the records of a model in ``__slots__``
+instead, which takes a fraction of the memory when millions of records are
+kept. Nested objects, such as the players of a game, are left as they are.
+
+Switch a model to them with :func:`berserk.models.set_compact`:
+
+.. code-block:: python
+
+    >>> berserk.models.set_compact(models=[berserk.models.Game])
+    >>> games = list(client.games.export_by_player('foo'))
+    >>> games[0].createdAt
+    datetime.datetime(2018, 12, 9, 22, 54, 24, 195000, tzinfo=...)
+
+Fields are read as attributes, which are ``None`` when the field is missing
+from the record, or by key like the fields of a dict.
+"""
+
+__all__ = [
+    'Game',
+    'GameState',
+    'PuzzleActivity',
+    'Record',
+    'User',
+]
+
+
+_MISSING = object()
+
+
+class RecordType(type):
+    def __new__(mcs, name, bases, namespace):
+        fields = namespace.get('_fields', ())
+        namespace['__slots__'] = fields
+        cls = super().__new__(mcs, name, bases, namespace)
+        # the descriptors of the slots, called directly when filling records
+        cls._setters = {
+            field: vars(cls)[field].__set__ for field in fields
+        }
+        cls._field_set = frozenset(fields) | frozenset(
+            field for base in bases for field in getattr(base, '_fields', ())
+        )
+        return cls
+
+
+class Record(metaclass=RecordType):
+    """A record whose top-level fields are kept in ``__slots__``.
+
+    Subclasses list the fields they keep in ``_fields``. Fields outside of
+    them are kept in the :attr:`extra` dict, which is ``None`` when there
+    are none.
+
+    :param fields: values of the fields
+    """
+
+    _fields = ('extra',)
+
+    def __init__(self, **fields):
+        self._fill(fields)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from a dict of fields.
+
+        :param dict data: the fields
+        :return: the record
+        """
+        record = cls.__new__(cls)
+        record._fill(data)
+        return record
+
+    def __getattr__(self, name):
+        # only called for unset slots and unknown attributes
+        if name in self._field_set:
+            return None
+        raise AttributeError(
+            f'{type(self).__name__!r} object has no attribute {name!r}'
+        )
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __eq__(self, other):
+        if not isinstance(other, Record):
+            return NotImplemented
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+    def __reduce__(self):
+        return type(self).from_dict, (self.to_dict(),)
+
+    def get(self, key, default=None):
+        """Return the value of a field, or a default if it is missing.
+
+        :param str key: name of the field
+        :param default: value returned when the field is missing
+        :return: the value of the field
+        """
+        if key in self._setters:
+            try:
+                return object.__getattribute__(self, key)
+            except AttributeError:
+                return default
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def to_dict(self):
+        """Return the fields of the record as a dict.
+
+        :return: the fields that are present, including the extra ones
+        :rtype: dict
+        """
+        data = {}
+        for field in self._fields:
+            value = self.get(field, _MISSING)
+            if value is not _MISSING:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def _fill(self, data):
+        setters = self._setters
+        extra = None
+        for key, value in data.items():
+            setter = setters.get(key)
+            if setter is not None:
+                setter(self, value)
+            elif extra is None:
+                extra = {key: value}
+            else:
+                extra[key] = value
+        self.extra = extra
+
+
+class Game(Record):
+    """A game, as exported by :class:`~berserk.clients.Games`."""
+
+    _fields = (
+        'id', 'rated', 'variant', 'speed', 'perf', 'createdAt', 'lastMoveAt',
+        'status', 'players', 'winner', 'opening', 'moves', 'pgn', 'clock',
+        'daysPerTurn', 'clocks', 'analysis', 'tournament', 'swiss',
+    )
+
+
+class User(Record):
+    """A user, as returned by :class:`~berserk.clients.Users` and
+    :meth:`~berserk.clients.Teams.get_members`."""
+
+    _fields = (
+        'id', 'username', 'title', 'online', 'createdAt', 'seenAt',
+        'disabled', 'tosViolation', 'patron', 'verified', 'url', 'perfs',
+        'profile', 'playTime', 'count', 'playing',
+    )
+
+
+class GameState(Record):
+    """A full game or game state event of a bot or board game stream."""
+
+    _fields = (
+        'type', 'id', 'rated', 'variant', 'speed', 'perf', 'createdAt',
+        'white', 'black', 'initialFen', 'clock', 'daysPerTurn', 'state',
+        'tournamentId', 'moves', 'wtime', 'btime', 'winc', 'binc', 'wdraw',
+        'bdraw', 'status', 'winner',
+    )
+
+
+class PuzzleActivity(Record):
+    """A puzzle attempt, as returned by
+    :meth:`~berserk.clients.Users.get_puzzle_activity`."""
+
+    _fields = (
+        'id', 'date', 'win', 'puzzleId', 'puzzleRating', 'puzzleRatingDiff',
+        'userRating', 'userRatingDiff', 'puzzle',
+    )
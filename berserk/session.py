@@ -1,16 +1,42 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import contextlib
 import logging
+import re
+import socket
+import threading
+import time
 import urllib
+from datetime import (
+    datetime,
+    timezone,
+)
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
 
 from . import (
+    compression,
     exceptions,
+    formats,
+    metrics,
+    pgn,
+    records,
     utils,
 )
 
 LOG = logging.getLogger(__name__)
 
+#: Status code of a rate limited response
+TOO_MANY_REQUESTS = 429
+
+# sentinel for cache misses, since None is a valid result
+_MISSING = object()
+
+#: URLs of the hosts used by the clients
+POOLED_URLS = ('https://lichess.org/', 'https://explorer.lichess.ovh/')
+
 
 class Requestor:
     """Encapsulates the logic for making a request.
@@ -20,15 +46,55 @@ class Requestor:
     :param str base_url: the base URL for requests
     :param fmt: default format handler to use
     :type fmt: :class:`~berserk.formats.FormatHandler`
+    :param rate_limiter: scheduler used to pace the requests
+    :type rate_limiter: :class:`RateLimiter`
+    :param cache: cache for the results of read-only requests
+    :type cache: :class:`~berserk.cache.ResponseCache`
+    :param single_flight: coalescer for identical concurrent GET requests
+    :type single_flight: :class:`SingleFlight`
+    :param hooks: callbacks fired around each request
+    :type hooks: :class:`~berserk.metrics.Hooks`
+    :param int prefetch: if given, streams are read and parsed by a
+                         background thread, up to this many chunks ahead of
+                         the consumer
+    :param parallel: pool of processes decoding long JSON streams, for the
+                     requests that opt into it
+    :type parallel: :class:`~berserk.formats.ParallelDecoder`
     """
 
-    def __init__(self, session, base_url, default_fmt):
+    def __init__(
+        self,
+        session,
+        base_url,
+        default_fmt,
+        rate_limiter=None,
+        cache=None,
+        single_flight=None,
+        hooks=None,
+        prefetch=None,
+        parallel=None,
+    ):
         self.session = session
         self.base_url = base_url
         self.default_fmt = default_fmt
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.single_flight = single_flight
+        self.hooks = hooks
+        self.prefetch = prefetch
+        self.parallel = parallel
 
     def request(
-        self, method, path, *args, fmt=None, converter=utils.noop, **kwargs
+        self,
+        method,
+        path,
+        *args,
+        fmt=None,
+        converter=utils.noop,
+        resume=None,
+        parallel=False,
+        compress=False,
+        **kwargs,
     ):
         """Make a request for a resource in a paticular format.
 
@@ -37,6 +103,16 @@ class Requestor:
         :param fmt: the format handler
         :type fmt: :class:`~berserk.formats.FormatHandler`
         :param func converter: function to handle field conversions
+        :param resume: how to resume the stream if the connection drops
+        :type resume: :class:`Resume`
+        :param bool parallel: whether a JSON stream may be decoded by the pool
+                              of processes, if any; only bulk exports should,
+                              as the pool decodes records in batches and
+                              holds back those of live streams
+        :param bool compress: whether to ask for a stream to be compressed
+                              with the best encoding supported; only bulk
+                              exports should, as compressors may buffer
+                              the events of live streams
         :return: response
         :raises berserk.exceptions.ResponseError: if the status is >=400
         """
@@ -45,6 +121,11 @@ class Requestor:
         url = urllib.parse.urljoin(self.base_url, path)
 
         is_stream = kwargs.get('stream')
+        if is_stream and compress:
+            kwargs['headers'] = {
+                **fmt.headers,
+                'Accept-Encoding': compression.ACCEPT_ENCODING,
+            }
         LOG.debug(
             '%s %s %s params=%s data=%s json=%s',
             'stream' if is_stream else 'request',
@@ -54,14 +135,159 @@ class Requestor:
             kwargs.get('data'),
             kwargs.get('json'),
         )
+        if is_stream and resume:
+            return self._resumable_stream(
+                resume, method, url, fmt, converter, *args,
+                parallel=parallel, **kwargs,
+            )
+        if method == 'GET' and not is_stream and self._shares_results:
+            return self._shared(method, url, fmt, converter, *args, **kwargs)
+
+        _, result = self._fetch(
+            method, url, fmt, converter, is_stream, *args,
+            parallel=parallel, **kwargs,
+        )
+        return result
+
+    @property
+    def _shares_results(self):
+        return self.cache is not None or self.single_flight is not None
+
+    def _shared(self, method, url, fmt, converter, *args, **kwargs):
+        # GET results may come from the cache or from an identical request
+        # that is already in flight
+        key = utils.request_key(method, url, kwargs.get('params'), fmt)
+        ttl = self.cache.ttl(url) if self.cache is not None else None
+        if ttl is not None:
+            result = self.cache.get(key, _MISSING)
+            if result is not _MISSING:
+                return result
+
+        def fetch():
+            response, result = self._fetch(
+                method, url, fmt, converter, False, *args, **kwargs
+            )
+            if ttl is not None:
+                self.cache.set(key, result, ttl, size=len(response.content))
+            return result
+
+        if self.single_flight is None:
+            return fetch()
+        return self.single_flight.do(key, fetch)
+
+    def _fetch(
+        self, method, url, fmt, converter, is_stream, *args, parallel=False,
+        apply_transform=True, **kwargs,
+    ):
+        # send the request and handle its response, firing any hooks
+        meter = metrics.meter(self.hooks, method, url, is_stream)
+        meter.start()
         try:
-            response = self.session.request(method, url, *args, **kwargs)
-        except requests.RequestException as e:
-            raise exceptions.ApiError(e)
+            response = self._send(method, url, *args, **kwargs)
+            meter.received(response, response.elapsed)
+            if is_stream:
+                decoded = meter.wrap(compression.decode(response))
+                records = self._records(
+                    decoded, fmt, converter, parallel, apply_transform
+                )
+                return response, meter.stream(records)
+            with meter.parsing(response):
+                result = fmt.handle(
+                    response, is_stream=is_stream, converter=converter
+                )
+        except Exception as e:
+            meter.finish(e)
+            raise
+        meter.finish()
+        return response, result
+
+    def _records(
+        self, response, fmt, converter, parallel=False, apply_transform=True
+    ):
+        # parse a stream, in the background if asked to
+        if self._in_pool(fmt, parallel):
+            return self.parallel.decode(
+                fmt,
+                fmt.iter_chunks(response),
+                fmt.get_converter(converter),
+                apply_transform=apply_transform,
+            )
+        if self.prefetch:
+            return _converted(
+                fmt.parse_ahead(response, self.prefetch),
+                fmt.get_converter(converter),
+            )
+        return fmt.handle(response, is_stream=True, converter=converter)
+
+    def _in_pool(self, fmt, parallel):
+        # whether a stream is decoded by the pool of processes
+        return bool(
+            parallel and self.parallel and isinstance(fmt, formats.JsonHandler)
+        )
+
+    def _send(self, method, url, *args, **kwargs):
+        attempts = 1 + (self.rate_limiter.retries if self.rate_limiter else 0)
+        for attempt in range(attempts):
+            if self.rate_limiter:
+                time.sleep(self.rate_limiter.reserve(url))
+            try:
+                response = self.session.request(method, url, *args, **kwargs)
+            except requests.RequestException as e:
+                raise exceptions.ApiError(e)
+            if response.status_code != TOO_MANY_REQUESTS:
+                break
+            if self.rate_limiter:
+                self.rate_limiter.back_off()
+                LOG.warning('rate limited on %s %s', method, url)
+                if attempt + 1 < attempts:
+                    response.close()
+
         if not response.ok:
             raise exceptions.ResponseError(response)
+        return response
 
-        return fmt.handle(response, is_stream=is_stream, converter=converter)
+    def _resumable_stream(
+        self, resume, method, url, fmt, converter, *args, parallel=False,
+        **kwargs,
+    ):
+        converter = fmt.get_converter(converter)
+        # the transform of the pool would hide the fields tracked, so it is
+        # applied here to the converted records instead
+        transform = None
+        if self._in_pool(fmt, parallel):
+            transform = self.parallel.transform
+        resume.start()
+        attempt = 0
+        while True:
+            try:
+                _, records = self._fetch(
+                    method, url, fmt, utils.noop, True, *args,
+                    parallel=parallel, apply_transform=False, **kwargs,
+                )
+                for record in records:
+                    if resume.track(record):
+                        attempt = 0
+                        record = converter(record)
+                        yield transform(record) if transform else record
+                return
+            except exceptions.ResponseError:
+                raise
+            except (exceptions.ApiError, requests.RequestException) as e:
+                if attempt >= resume.retries:
+                    if isinstance(e, exceptions.ApiError):
+                        raise
+                    raise exceptions.ApiError(e)
+                delay = resume.backoff * 2 ** attempt
+                LOG.warning(
+                    'stream %s %s interrupted (%s), resuming in %ss',
+                    method,
+                    url,
+                    e,
+                    delay,
+                )
+                time.sleep(delay)
+                attempt += 1
+                kwargs['params'] = resume.params(kwargs.get('params'))
 
     def get(self, *args, **kwargs):
         """Convenience method to make a GET request."""
@@ -72,13 +298,633 @@ class Requestor:
         return self.request('POST', *args, **kwargs)
 
 
+def _converted(records, converter):
+    # a generator, so that closing it stops the records read ahead
+    try:
+        for record in records:
+            yield converter(record)
+    finally:
+        records.close()
+
+
 class TokenSession(requests.Session):
     """Session capable of personal API token authentication.
 
+    Connection pools are only mounted when a pooling option is given; see
+    :func:`mount_pools` for the options and the defaults of the others.
+
     :param str token: personal API token
+    :param pool_maxsize: connections kept open per host
+    :type pool_maxsize: int or dict
+    :param kwargs: other pooling options passed on to :func:`mount_pools`
     """
 
-    def __init__(self, token):
+    def __init__(self, token, pool_maxsize=None, **kwargs):
         super().__init__()
         self.token = token
         self.headers = {'Authorization': f'Bearer {token}'}
+        _mount_given_pools(self, pool_maxsize=pool_maxsize, **kwargs)
+
+
+class TokenPool(requests.Session):
+    """Session that spreads requests across several personal API tokens.
+
+    Lichess applies its rate limits per token, so pooling the tokens of
+    several accounts multiplies the throughput. Each token is paced by its
+    own :class:`RateLimiter`, and a rate limited request is retried straight
+    away with another token.
+
+    Only the account playing a game may act in it, so requests bound to a
+    game (board and bot moves, chat, and game streams) are pinned to one
+    token by game ID. To make requests as a particular account, such as
+    opening its event stream, wrap them in :meth:`using`; any game they
+    touch is pinned to that token. Games can also be assigned up front with
+    :meth:`pin`. A request bound to a game that is neither pinned nor made
+    within :meth:`using` raises :class:`ValueError`, unless the pool has a
+    single token, since no other token can tell which account plays it.
+
+    .. note::
+
+        The pool paces each token itself, so do not also give the client a
+        rate limiter.
+
+    :param list tokens: personal API tokens
+    :param str strategy: ``'round_robin'`` to use the tokens in turn, or
+                         ``'least_limited'`` to prefer the token that was
+                         rate limited least recently
+    :param func rate_limiter: factory for the rate limiter of each token;
+                              defaults to :class:`RateLimiter`
+    :param pool_maxsize: connections kept open per host
+    :type pool_maxsize: int or dict
+    :param func clock: monotonic clock returning seconds
+    :param kwargs: other pooling options passed on to :func:`mount_pools`,
+                   which are mounted when any of them is given
+    """
+
+    #: names of the ways of choosing a token for unpinned requests
+    STRATEGIES = ('round_robin', 'least_limited')
+
+    #: patterns of URL paths bound to a game, capturing its ID as ``key``
+    PINNED_PATHS = [
+        re.compile(r'^/api/(board|bot)/game/(stream/)?(?P<key>[^/]+)'),
+    ]
+
+    def __init__(
+        self,
+        tokens,
+        strategy='round_robin',
+        rate_limiter=None,
+        pool_maxsize=None,
+        clock=time.monotonic,
+        **kwargs,
+    ):
+        super().__init__()
+        if not tokens:
+            raise ValueError('at least one token is required')
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f'unknown strategy {strategy!r}')
+        rate_limiter = rate_limiter or (lambda: RateLimiter(clock=clock))
+        self.tokens = list(tokens)
+        self.strategy = strategy
+        self.clock = clock
+        self.limiters = {token: rate_limiter() for token in self.tokens}
+        self.limited_at = dict.fromkeys(self.tokens, float('-inf'))
+        self.pins = {}
+        self._used = dict.fromkeys(self.tokens, 0)
+        self._turn = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        _mount_given_pools(self, pool_maxsize=pool_maxsize, **kwargs)
+
+    @contextlib.contextmanager
+    def using(self, token):
+        """Make the requests of the current thread with the given token.
+
+        :param str token: one of the tokens of the pool
+        """
+        if token not in self.limiters:
+            raise ValueError('token is not in the pool')
+        previous = getattr(self._local, 'token', None)
+        self._local.token = token
+        try:
+            yield self
+        finally:
+            self._local.token = previous
+
+    def pin(self, key, token):
+        """Pin the requests about a game to a token.
+
+        :param str key: ID of the game
+        :param str token: one of the tokens of the pool
+        """
+        if token not in self.limiters:
+            raise ValueError('token is not in the pool')
+        with self._lock:
+            self.pins[key] = token
+
+    def unpin(self, key):
+        """Forget the token of a game, for instance once it has ended.
+
+        :param str key: ID of the game
+        """
+        with self._lock:
+            self.pins.pop(key, None)
+
+    def pin_key(self, url):
+        """Return the ID of the game a URL is bound to.
+
+        :param str url: full URL of a request
+        :return: game ID, or ``None`` if the URL is not bound to a game
+        """
+        path = urllib.parse.urlsplit(url).path
+        for pattern in self.PINNED_PATHS:
+            match = pattern.match(path)
+            if match:
+                return match.group('key')
+        return None
+
+    def choose(self, exclude=()):
+        """Return the token to use for an unpinned request.
+
+        Tokens that are backing off after a rate limited response are
+        skipped, unless all of them are.
+
+        :param exclude: tokens to avoid, if any others are left
+        :return: a token
+        :rtype: str
+        """
+        with self._lock:
+            now = self.clock()
+            tokens = [t for t in self.tokens if t not in exclude]
+            tokens = tokens or self.tokens
+            ready = [t for t in tokens if self.limiters[t].resume_at <= now]
+            tokens = ready or tokens
+            if self.strategy == 'least_limited':
+                token = min(
+                    tokens, key=lambda t: (self.limited_at[t], self._used[t])
+                )
+            else:
+                token = min(tokens, key=self._used.get)
+            self._take(token)
+            return token
+
+    def _take(self, token):
+        self._turn += 1
+        self._used[token] = self._turn
+
+    def _owner(self, url):
+        # the token a request must be made with, if it is pinned to one
+        token = getattr(self._local, 'token', None)
+        key = self.pin_key(url)
+        if key is None:
+            return token
+        with self._lock:
+            if token is not None:
+                self.pins[key] = token
+                return token
+            if key in self.pins:
+                return self.pins[key]
+            if len(self.tokens) == 1:
+                return self.pins.setdefault(key, self.tokens[0])
+        # any other token may not be the one playing the game
+        raise ValueError(
+            f'game {key!r} is not pinned to a token; pin it or make the '
+            f'request within using()'
+        )
+
+    def request(self, method, url, *args, **kwargs):
+        owner = self._owner(url)
+        headers = dict(kwargs.pop('headers', None) or {})
+        tried = []
+        while True:
+            token = owner or self.choose(exclude=tried)
+            limiter = self.limiters[token]
+            time.sleep(limiter.reserve(url))
+            headers['Authorization'] = f'Bearer {token}'
+            response = super().request(
+                method, url, *args, headers=dict(headers), **kwargs
+            )
+            if response.status_code != TOO_MANY_REQUESTS:
+                return response
+
+            limiter.back_off()
+            with self._lock:
+                self.limited_at[token] = self.clock()
+            LOG.warning('rate limited on %s %s', method, url)
+            tried.append(token)
+            if owner or len(tried) >= len(self.tokens):
+                return response
+            response.close()
+
+
+class PoolAdapter(HTTPAdapter):
+    """Transport adapter that can set options on its sockets.
+
+    :param list socket_options: ``(level, option, value)`` tuples set on
+                                each new connection
+    :param kwargs: passed on to :class:`requests.adapters.HTTPAdapter`
+    """
+
+    def __init__(self, socket_options=None, **kwargs):
+        self.socket_options = socket_options
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.socket_options is not None:
+            kwargs['socket_options'] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def keepalive_options(idle=60, interval=15, count=4):
+    """Return socket options that enable TCP keep-alive probes.
+
+    Probes keep idle pooled connections from being silently dropped by
+    intermediaries. Options unsupported by the platform are left out.
+
+    :param int idle: seconds of idleness before the first probe
+    :param int interval: seconds between probes
+    :param int count: unanswered probes before the connection is dropped
+    :return: socket options, including the defaults of urllib3
+    :rtype: list
+    """
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    for name, value in [
+        ('TCP_KEEPIDLE', idle),
+        ('TCP_KEEPINTVL', interval),
+        ('TCP_KEEPCNT', count),
+    ]:
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+def mount_pools(
+    session,
+    urls=POOLED_URLS,
+    pool_maxsize=10,
+    pool_block=False,
+    keepalive=False,
+    socket_options=None,
+):
+    """Mount a sized connection pool on the session for each URL.
+
+    Each URL gets its own adapter, so the connections to one host never
+    evict those to another. Size the pools to at least the number of
+    threads sharing the session, otherwise connections beyond the size are
+    discarded after use rather than kept open for reuse.
+
+    :param session: the session to configure
+    :type session: :class:`requests.Session`
+    :param urls: URL prefixes to mount the pools on
+    :param pool_maxsize: connections kept open per host, or a mapping of URL
+                         prefix to size for per-host limits
+    :type pool_maxsize: int or dict
+    :param bool pool_block: whether to wait for a free connection rather than
+                            opening one beyond the size of the pool
+    :param bool keepalive: whether to enable TCP keep-alive probes
+    :param list socket_options: ``(level, option, value)`` tuples to set on
+                                each new connection (overrides
+                                ``keepalive``)
+    :return: the session
+    :rtype: :class:`requests.Session`
+    """
+    if socket_options is None and keepalive:
+        socket_options = keepalive_options()
+    for url in urls:
+        if isinstance(pool_maxsize, dict):
+            maxsize = pool_maxsize.get(url, 10)
+        else:
+            maxsize = pool_maxsize
+        adapter = PoolAdapter(
+            socket_options=socket_options,
+            pool_connections=1,
+            pool_maxsize=maxsize,
+            pool_block=pool_block,
+        )
+        session.mount(url, adapter)
+    return session
+
+
+def _mount_given_pools(session, urls=POOLED_URLS, **options):
+    # leave the default adapters unless a pooling option is given
+    options = {
+        name: value for name, value in options.items() if value is not None
+    }
+    if options:
+        mount_pools(session, urls, **options)
+
+
+class SingleFlight:
+    """Coalesce identical requests that are in flight at the same time.
+
+    The first caller for a key makes the request while any others that
+    arrive before it completes wait and share its result, or its error.
+    This works for threads with :meth:`do` and for asyncio tasks with
+    :meth:`ado`.
+
+    .. note::
+
+        Shared results are the same object for every caller. Treat them as
+        read-only.
+    """
+
+    def __init__(self):
+        self.shared = 0
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Call ``func``, unless a call for the same key is in flight.
+
+        :param key: identifies the call
+        :param func: function that makes the call
+        :return: the result of the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def ado(self, key, func):
+        """Await ``func()``, unless a call for the same key is in flight.
+
+        :param key: identifies the call
+        :param func: coroutine function that makes the call
+        :return: the result of the call
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Resume:
+    """Resume a stream of games after its connection drops.
+
+    The last fully parsed game is tracked so that, when reconnecting, the
+    request can pick up where it left off. Games are exported in order of
+    creation, so the timestamp of the last game becomes the new ``until``
+    (newest first) or ``since`` (oldest first) parameter. Games sharing that
+    timestamp are remembered by ID so none are returned twice.
+
+    Endpoints without timestamp parameters can instead be resumed by
+    skipping the games already returned, by passing ``param=None``.
+
+    A ``max`` parameter is lowered by the number of games already returned,
+    so that no more than ``max`` games are returned in all.
+
+    :param str param: parameter to adjust on reconnect: ``'until'``,
+                      ``'since'``, or ``None`` to skip returned games
+    :param int retries: maximum number of consecutive reconnections
+    :param float backoff: seconds before the first reconnection, doubled
+                          after each failed attempt
+    """
+
+    def __init__(self, param='until', retries=5, backoff=1):
+        if param not in ('until', 'since', None):
+            raise ValueError(f'cannot resume using {param!r}')
+        self.param = param
+        self.retries = retries
+        self.backoff = backoff
+        self.start()
+
+    def start(self):
+        """Forget any progress, ready for a new stream."""
+        self.count = 0
+        self.skip = 0
+        self.timestamp = None
+        self.precision = 0
+        self.seen = set()
+        self.limit = None
+
+    def track(self, record):
+        """Track a parsed record.
+
+        :param record: a game, as a JSON object, compact record, PGN text or
+                       :class:`~berserk.pgn.PgnGame`
+        :return: ``True`` if the record is new, ``False`` if it was already
+                 returned before the stream was resumed
+        :rtype: bool
+        """
+        if self.param is None:
+            if self.skip:
+                self.skip -= 1
+                return False
+            self.count += 1
+            return True
+
+        timestamp, precision, game_id = self.marker(record)
+        if timestamp != self.timestamp:
+            self.timestamp = timestamp
+            self.precision = precision
+            self.seen = set()
+        elif game_id in self.seen:
+            return False
+        self.seen.add(game_id)
+        self.count += 1
+        return True
+
+    def params(self, params):
+        """Return the parameters to use when reconnecting.
+
+        :param dict params: the parameters of the interrupted request
+        :return: adjusted parameters
+        :rtype: dict
+        """
+        params = dict(params or {})
+        if self.param is None:
+            self.skip = self.count
+        elif self.timestamp is not None:
+            if self.param == 'until':
+                params['until'] = self.timestamp + self.precision
+            else:
+                params['since'] = self.timestamp
+            if params.get('max') is not None:
+                # the games sharing the timestamp are sent again
+                if self.limit is None:
+                    self.limit = params['max']
+                params['max'] = self.limit - self.count + len(self.seen)
+        return params
+
+    @staticmethod
+    def marker(record):
+        """Return the creation time and ID of a game.
+
+        PGN only records the time to the second, so the precision of the
+        timestamp is returned as well.
+
+        :param record: a game, as a JSON object, compact record, PGN text or
+                       :class:`~berserk.pgn.PgnGame`
+        :return: timestamp in milliseconds, its precision in milliseconds,
+                 and the game ID
+        :rtype: tuple
+        """
+        if isinstance(record, (dict, records.Record)):
+            return record['createdAt'], 0, record['id']
+
+        if isinstance(record, pgn.PgnGame):
+            tags, game_id = record.tags, record.game_id
+        else:
+            tags, game_id = utils.pgn_tags(record), utils.pgn_game_id(record)
+        created_at = datetime.strptime(
+            f'{tags["UTCDate"]} {tags["UTCTime"]}', '%Y.%m.%d %H:%M:%S'
+        )
+        created_at = created_at.replace(tzinfo=timezone.utc)
+        return int(created_at.timestamp()) * 1000, 999, game_id
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations rather than blocking.
+
+    Each reservation takes one token. When the bucket is empty the
+    reservation is still granted, but only after the returned delay.
+
+    :param float rate: tokens added per second
+    :param int capacity: maximum number of tokens held (the burst size)
+    :param func clock: monotonic clock returning seconds
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated_at = clock()
+
+    def reserve(self, now=None):
+        """Take a token.
+
+        :param float now: current time according to :attr:`clock`
+        :return: seconds to wait before using the token
+        :rtype: float
+        """
+        now = self.clock() if now is None else now
+        elapsed = max(0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        return max(0, -self.tokens / self.rate)
+
+
+class RateLimiter:
+    """Schedule requests to stay within the rate limits of the API.
+
+    Requests are sorted into endpoint classes by :meth:`classify` and each
+    class draws from its own :class:`TokenBucket`. After a rate limited (429)
+    response, every request waits out a global back-off, since Lichess asks
+    clients to pause for a full minute before resuming.
+
+    A single instance is meant to be shared by every client making requests
+    with the same credentials, which :class:`~berserk.clients.Client` does for
+    its sub-clients.
+
+    :param dict buckets: ``(rate, capacity)`` pairs by endpoint class; these
+                         are merged over :attr:`DEFAULT_BUCKETS`
+    :param float backoff: seconds to pause after a 429 response
+    :param int retries: times to retry a rate limited request after the
+                        back-off
+    :param func clock: monotonic clock returning seconds
+    """
+
+    #: default ``(rate, capacity)`` for each endpoint class
+    DEFAULT_BUCKETS = {
+        'default': (4, 8),
+        'export': (0.5, 2),
+        'move': (20, 20),
+        'explorer': (2, 4),
+    }
+
+    #: patterns matched against the URL path to classify an endpoint
+    ENDPOINT_CLASSES = [
+        ('move', re.compile(r'^/api/(board|bot)/game/')),
+        ('export', re.compile(r'^/(api/games/user|games/export)/')),
+        ('export', re.compile(r'^/game/export/')),
+        ('export', re.compile(r'^/api/tournament/[^/]+/games')),
+        ('export', re.compile(r'^/study/')),
+    ]
+
+    #: hosts that are rate limited as a separate class
+    HOST_CLASSES = {
+        'explorer.lichess.ovh': 'explorer',
+    }
+
+    def __init__(
+        self, buckets=None, backoff=60, retries=1, clock=time.monotonic
+    ):
+        buckets = {**self.DEFAULT_BUCKETS, **(buckets or {})}
+        self.buckets = {
+            name: TokenBucket(rate, capacity, clock=clock)
+            for name, (rate, capacity) in buckets.items()
+        }
+        self.backoff = backoff
+        self.retries = retries
+        self.clock = clock
+        self.resume_at = 0
+        self._lock = threading.Lock()
+
+    def classify(self, url):
+        """Return the endpoint class of a URL.
+
+        :param str url: the full URL of a request
+        :return: name of the endpoint class
+        :rtype: str
+        """
+        parts = urllib.parse.urlsplit(url)
+        if parts.hostname in self.HOST_CLASSES:
+            return self.HOST_CLASSES[parts.hostname]
+        for name, pattern in self.ENDPOINT_CLASSES:
+            if pattern.match(parts.path):
+                return name
+        return 'default'
+
+    def reserve(self, url):
+        """Reserve a request to the given URL.
+
+        :param str url: the full URL of the request
+        :return: seconds to wait before making the request
+        :rtype: float
+        """
+        name = self.classify(url)
+        bucket = self.buckets.get(name, self.buckets['default'])
+        with self._lock:
+            now = self.clock()
+            delay = bucket.reserve(now)
+            return max(delay, self.resume_at - now)
+
+    def back_off(self):
+        """Pause all requests after a rate limited response."""
+        with self._lock:
+            self.resume_at = max(self.resume_at, self.clock() + self.backoff)
@@ -1,10 +1,25 @@
 # -*- coding: utf-8 -*-
 import collections
+import re
 from datetime import (
     datetime,
+    timedelta,
     timezone,
 )
 
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+_UTC = timezone.utc
+_EPOCH = datetime(1970, 1, 1, tzinfo=_UTC)
+_fromtimestamp = datetime.fromtimestamp
+
+#: Milliseconds since the epoch below which dividing by 1000 and rounding to
+#: the microsecond is exact, as floats are then precise to 2**-20 seconds
+_EXACT_MILLIS = 2 ** 33 * 1000
+
 
 def to_millis(dt):
     """Return the milliseconds between the given datetime and the epoch.
@@ -35,7 +50,15 @@ def datetime_from_millis(millis):
     :return: timezone aware datetime
     :rtype: :class:`datetime`
     """
-    return datetime_from_seconds(millis / 1000)
+    # adding a timedelta is exact for any value, but twice as slow
+    if -_EXACT_MILLIS < millis < _EXACT_MILLIS:
+        return _fromtimestamp(millis / 1000, _UTC)
+    return _EPOCH + timedelta(milliseconds=millis)
+
+
+_ISO_TIME = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)\.(\d{1,6})Z\Z'
+)
 
 
 def datetime_from_str(dt_str):
@@ -46,9 +69,104 @@ def datetime_from_str(dt_str):
 
     :return: timezone aware datetime
     :rtype: :class:`datetime`
+    :raises ValueError: if the string does not match the format
+    """
+    match = _ISO_TIME.match(dt_str)
+    if match is None:
+        raise ValueError(f'time data {dt_str!r} does not match the format')
+    year, month, day, hour, minute, second, fraction = match.groups()
+    return datetime(
+        int(year),
+        int(month),
+        int(day),
+        int(hour),
+        int(minute),
+        int(second),
+        int(fraction.ljust(6, '0')),
+        _UTC,
+    )
+
+
+def datetime64_from_millis(values):
+    """Convert milliseconds since the epoch to a NumPy array of times.
+
+    This converts a whole column of timestamps at once, which is much faster
+    than converting them one by one with :func:`datetime_from_millis`. The
+    times are in UTC and have no timezone, as NumPy times never do. Install
+    the ``arrays`` extra to use this function.
+
+    :param values: milliseconds since the epoch, ``None`` when missing
+    :type values: iterable of int
+    :return: times, ``NaT`` where missing
+    :rtype: :class:`numpy.ndarray` of ``datetime64[ms]``
+    """
+    _require_numpy()
+    if isinstance(values, np.ndarray):
+        return values.astype('datetime64[ms]')
+    missing = np.iinfo(np.int64).min  # the value of NaT
+    values = [missing if value is None else value for value in values]
+    return np.array(values, dtype=np.int64).view('datetime64[ms]')
+
+
+def datetime64_from_str(values):
+    """Convert times in strings to a NumPy array of times.
+
+    This is the batch form of :func:`datetime_from_str`. Install the
+    ``arrays`` extra to use this function.
+
+    :param values: times formatted as ``%Y-%m-%dT%H:%M:%S.%fZ``, ``None``
+                   when missing
+    :type values: iterable of str
+    :return: times in UTC, ``NaT`` where missing
+    :rtype: :class:`numpy.ndarray` of ``datetime64[ms]``
+    :raises ValueError: if a string does not match the format
     """
-    dt = datetime.strptime(dt_str, '%Y-%m-%dT%H:%M:%S.%fZ')
-    return dt.replace(tzinfo=timezone.utc)
+    _require_numpy()
+    times = []
+    for value in values:
+        if value is None:
+            times.append('NaT')
+        elif _ISO_TIME.match(value):
+            times.append(value[:-1])  # NumPy warns about time zones
+        else:
+            raise ValueError(f'time data {value!r} does not match the format')
+    return np.array(times, dtype='datetime64[ms]')
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('NumPy is required: install the arrays extra')
+
+
+#: Batch forms of conversions, applied to whole columns of values at once
+#: by :meth:`berserk.models.Model.convert_columns`
+BATCH_CONVERSIONS = {
+    datetime_from_millis: datetime64_from_millis,
+    datetime_from_str: datetime64_from_str,
+}
+
+
+_PGN_TAG = re.compile(r'^\[(\w+) "(.*)"\]$', re.MULTILINE)
+
+
+def pgn_tags(pgn):
+    """Return the tag pairs of a PGN game.
+
+    :param str pgn: PGN text of a single game
+    :return: tag values by name
+    :rtype: dict
+    """
+    return dict(_PGN_TAG.findall(pgn))
+
+
+def pgn_game_id(pgn):
+    """Return the Lichess game ID from the ``Site`` tag of a PGN game.
+
+    :param str pgn: PGN text of a single game
+    :return: game ID
+    :rtype: str
+    """
+    return pgn_tags(pgn)['Site'].rstrip('/').rsplit('/', 1)[-1]
 
 
 _RatingHistoryEntry = collections.namedtuple('Entry', 'year month day rating')
@@ -61,10 +179,8 @@ def rating_history(data):
 def inner(func, *keys):
     def convert(data):
         for k in keys:
-            try:
+            if k in data:  # normal for keys to not be present sometimes
                 data[k] = func(data[k])
-            except KeyError:
-                pass  # normal for keys to not be present sometimes
         return data
 
     return convert
@@ -72,10 +188,7 @@ def inner(func, *keys):
 
 def listing(func):
     def convert(items):
-        result = []
-        for item in items:
-            result.append(func(item))
-        return result
+        return [func(item) for item in items]
 
     return convert
 
@@ -84,6 +197,30 @@ def noop(arg):
     return arg
 
 
+def request_key(method, url, params=None, fmt=None):
+    """Return a key that identifies a request.
+
+    Parameters are normalized so their order and any ``None`` values do not
+    matter.
+
+    :param str method: HTTP verb
+    :param str url: full URL of the request
+    :param dict params: query parameters
+    :param fmt: format handler of the request
+    :return: request key
+    :rtype: tuple
+    """
+    params = tuple(
+        sorted(
+            (str(k), str(v))
+            for k, v in (params or {}).items()
+            if v is not None
+        )
+    )
+    mime_type = getattr(fmt, 'mime_type', None)
+    return method.upper(), url, params, mime_type
+
+
 def build_adapter(mapper, sep='.'):
     """Build a data adapter.
 
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from berserk import exceptions
+from berserk import formats
+from berserk import metrics
+from berserk import session
+
+httpx = pytest.importorskip('httpx')
+aio = pytest.importorskip('berserk.aio')
+
+
+def run(awaitable):
+    async def wait():
+        return await awaitable
+
+    return asyncio.run(wait())
+
+
+def make_session(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def collect(aiterator):
+    return [item async for item in aiterator]
+
+
+def test_request():
+    def handler(request):
+        assert request.url == 'http://foo.com/path?x=1'
+        assert request.headers['Accept'] == 'application/json'
+        return httpx.Response(200, json={'ok': True})
+
+    requestor = aio.AsyncRequestor(
+        make_session(handler), 'http://foo.com/', formats.JSON
+    )
+    result = requestor.get('path', params={'x': 1, 'y': None})
+    assert run(result) == {'ok': True}
+
+
+def test_request_item_access():
+    def handler(request):
+        assert request.content == b'a,b'
+        return httpx.Response(200, json={'ok': True})
+
+    requestor = aio.AsyncRequestor(
+        make_session(handler), 'http://foo.com/', formats.JSON
+    )
+    assert run(requestor.post('path', data='a,b')['ok']) is True
+
+
+def test_bad_request():
+    def handler(request):
+        return httpx.Response(400, json={'error': 'nope'})
+
+    requestor = aio.AsyncRequestor(
+        make_session(handler), 'http://foo.com/', formats.JSON
+    )
+    with pytest.raises(exceptions.ResponseError) as info:
+        run(requestor.get('path'))
+    assert info.value.status_code == 400
+    assert info.value.reason == 'Bad Request'
+
+
+def test_stream():
+    def handler(request):
+        return httpx.Response(200, content=b'{"x": 5}\n\n{"y": 3}\n')
+
+    requestor = aio.AsyncRequestor(
+        make_session(handler), 'http://foo.com/', formats.JSON
+    )
+    stream = requestor.get('path', fmt=formats.NDJSON, stream=True)
+    assert run(collect(stream)) == [{'x': 5}, {'y': 3}]
+
+
+def test_stream_pgn():
+    def handler(request):
+        return httpx.Response(200, content=b'one\ntwo\n\n\nthree')
+
+    requestor = aio.AsyncRequestor(
+        make_session(handler), 'http://foo.com/', formats.JSON
+    )
+    stream = requestor.get(
+        'path', fmt=formats.PGN, stream=True, converter=int
+    )
+    assert run(collect(stream)) == ['one\ntwo', 'three']
+
+
+def test_client_generator_override():
+    def handler(request):
+        assert request.url.path == '/games/export/_ids'
+        return httpx.Response(200, content=b'{"id": "a"}\n{"id": "b"}\n')
+
+    client = aio.AsyncClient(make_session(handler))
+    stream = client.games.export_multi('a', 'b')
+    assert run(collect(stream)) == [{'id': 'a'}, {'id': 'b'}]
+
+
+def test_client_copies_raw_export(tmp_path):
+    body = b'{"id": "a"}\n{"id": "b"}\n'
+
+    def handler(request):
+        return httpx.Response(200, content=body)
+
+    client = aio.AsyncClient(make_session(handler))
+    path = tmp_path / 'games.ndjson'
+    progress = run(client.games.export_multi('a', 'b', to=path, count=True))
+
+    assert progress == formats.Progress(len(body), 2)
+    assert path.read_bytes() == body
+
+
+def test_token_session():
+    session = aio.AsyncTokenSession('foo')
+    assert session.token == 'foo'
+    assert session.headers['Authorization'] == 'Bearer foo'
+
+
+def test_rate_limited_request_is_retried():
+    responses = [httpx.Response(429), httpx.Response(200, json={'ok': True})]
+
+    def handler(request):
+        return responses.pop(0)
+
+    limiter = session.RateLimiter(backoff=0)
+    requestor = aio.AsyncRequestor(
+        make_session(handler),
+        'http://foo.com/',
+        formats.JSON,
+        rate_limiter=limiter,
+    )
+    assert run(requestor.get('path')) == {'ok': True}
+    assert not responses
+
+
+class Interrupted(httpx.AsyncByteStream):
+    def __init__(self, content):
+        self.content = content
+
+    async def __aiter__(self):
+        yield self.content
+        raise httpx.ReadError('connection dropped')
+
+
+def test_resumable_stream():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(
+                200, stream=Interrupted(b'{"id": "a", "createdAt": 2}\n')
+            )
+        return httpx.Response(
+            200,
+            content=b'{"id": "a", "createdAt": 2}\n'
+            b'{"id": "b", "createdAt": 1}\n',
+        )
+
+    requestor = aio.AsyncRequestor(
+        make_session(handler), 'http://foo.com/', formats.NDJSON
+    )
+    resume = session.Resume('until', backoff=0)
+    stream = requestor.get('path', stream=True, resume=resume)
+
+    assert [g['id'] for g in run(collect(stream))] == ['a', 'b']
+    assert requests[1].url.params['until'] == '2'
+
+
+def test_hooks():
+    events = []
+
+    class Hooks(metrics.Hooks):
+        def after_request(self, event):
+            events.append(event)
+
+    def handler(request):
+        return httpx.Response(200, content=b'{"x": 5}\n{"y": 3}\n')
+
+    requestor = aio.AsyncRequestor(
+        make_session(handler), 'http://foo.com/', formats.JSON, hooks=Hooks()
+    )
+    run(requestor.get('api/tv/feed', fmt=formats.NDJSON))
+    run(collect(requestor.get('api/tv/feed', fmt=formats.NDJSON, stream=True)))
+
+    assert [(e.endpoint, e.status, e.records) for e in events] == [
+        ('api/tv/feed', 200, 0),
+        ('api/tv/feed', 200, 2),
+    ]
+    assert [e.bytes_read for e in events] == [18, 18]
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from berserk import pgn
+
+np = pytest.importorskip('numpy')
+arrays = pytest.importorskip('berserk.arrays')
+
+PGN = '''[Event "Rated Blitz game"]
+[Site "https://lichess.org/q7ZvsdUF"]
+
+1. e4 { [%eval 0.2] [%clk 0:03:00] } 1... e5 { [%eval 0.25] \
+[%clk 0:02:59.5] } 2. Qh5 { [%eval #-3] [%clk 1:00:01] } 1-0'''
+
+JSON = {
+    'id': 'q7ZvsdUF',
+    'clocks': [18000, 17950, 360100],
+    'analysis': [{'eval': 20}, {'eval': 25, 'best': 'd2d4'}, {'mate': -3}],
+}
+
+
+def assert_expected(result):
+    np.testing.assert_array_equal(result.clocks, [180, 179.5, 3601])
+    np.testing.assert_array_equal(result.evals, [0.2, 0.25, np.nan])
+    np.testing.assert_array_equal(result.mates, [0, 0, -3])
+    assert result.mates.dtype == np.int32
+
+
+@pytest.mark.parametrize('game', [
+    PGN,
+    PGN.encode('utf-8'),
+    pgn.PgnGame(PGN.encode('utf-8')),
+    JSON,
+])
+def test_game_arrays(game):
+    result, = arrays.game_arrays([game])
+    assert_expected(result)
+
+
+def test_game_arrays_batches_mixed_games():
+    empty = {'id': 'x'}
+    results = arrays.game_arrays([PGN, empty, JSON, '1. e4 *'])
+    assert_expected(results[0])
+    assert_expected(results[2])
+    for result in (results[1], results[3]):
+        assert all(len(array) == 0 for array in result)
+
+
+def test_game_arrays_without_games():
+    assert arrays.game_arrays([]) == []
+
+
+def test_iter_game_arrays():
+    games = [PGN, JSON] * 3
+    pairs = list(arrays.iter_game_arrays(iter(games), batch_size=4))
+    assert [game for game, _ in pairs] == games
+    for _, result in pairs:
+        assert_expected(result)
+
+
+def test_game_arrays_keep_moves_without_annotations():
+    text = ('1. e4 { [%eval 0.2] [%clk 0:03:00] } 1... e5 '
+            '{ [%clk 0:02:59] } ( 1... c5 { [%eval 0.3] } ) '
+            '2. Nf3 { [%eval 0.1] } 1-0')
+    game = {'id': 'a', 'analysis': [{'eval': 20}, {}, {'eval': 10}]}
+
+    from_pgn, from_json = arrays.game_arrays([text, game])
+
+    np.testing.assert_array_equal(from_pgn.clocks, [180, 179, np.nan])
+    for result in (from_pgn, from_json):
+        np.testing.assert_array_equal(result.evals, [0.2, np.nan, 0.1])
+        np.testing.assert_array_equal(result.mates, [0, 0, 0])
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import datetime
+from unittest import mock
+
+import pytest
+
+from berserk import cache
+from berserk import clients
+from berserk import session
+
+
+@pytest.fixture
+def clock():
+    now = [0]
+    return mock.Mock(side_effect=lambda: now[0], now=now)
+
+
+def test_ttl():
+    c = cache.ResponseCache(ttls={'api/user/[^/]+': 60, 'masters': None})
+    assert c.ttl('https://lichess.org/api/user/foo') == 60
+    assert c.ttl('https://lichess.org/api/user/foo/activity') is None
+    assert c.ttl('https://explorer.lichess.ovh/masters') is None
+    assert c.ttl('https://lichess.org/api/puzzle/daily') == 3600
+    assert c.ttl('https://lichess.org/api/team/coders') == 3600
+    assert c.ttl('https://lichess.org/api/team/all') is None
+    assert c.ttl('https://lichess.org/api/team/search') is None
+
+
+def test_key_normalizes_params():
+    a = cache.ResponseCache.key('get', 'u', {'a': 1, 'b': None, 'c': 2})
+    b = cache.ResponseCache.key('GET', 'u', {'c': 2, 'a': 1})
+    assert a == b
+
+
+def test_expiry(clock):
+    c = cache.ResponseCache(clock=clock)
+    c.set('k', 'v', ttl=10)
+    assert c.get('k') == 'v'
+    clock.now[0] = 10
+    assert c.get('k') is None
+    assert c.stats() == {
+        'hits': 1,
+        'misses': 1,
+        'evictions': 0,
+        'entries': 0,
+        'size': 0,
+    }
+
+
+def test_lru_eviction(clock):
+    c = cache.ResponseCache(max_entries=2, clock=clock)
+    c.set('a', 1, ttl=10)
+    c.set('b', 2, ttl=10)
+    c.get('a')
+    c.set('c', 3, ttl=10)
+    assert c.get('b') is None
+    assert c.get('a') == 1
+    assert c.evictions == 1
+
+
+def test_size_eviction(clock):
+    c = cache.ResponseCache(max_bytes=10, clock=clock)
+    c.set('a', 1, ttl=10, size=6)
+    c.set('b', 2, ttl=10, size=6)
+    c.set('c', 3, ttl=10, size=11)
+    assert len(c) == 1
+    assert c.get('b') == 2
+    assert c.size == 6
+
+
+def test_requestor_uses_cache():
+    m_session = mock.Mock()
+    m_session.request.return_value.status_code = 200
+    m_session.request.return_value.content = b'{}'
+    m_fmt = mock.Mock()
+    requestor = session.Requestor(
+        m_session, 'http://foo.com/', m_fmt, cache=cache.ResponseCache()
+    )
+
+    first = requestor.get('api/user/foo', params={'x': 1})
+    second = requestor.get('api/user/foo', params={'x': 1})
+    requestor.get('api/user/foo/activity')
+    requestor.get('api/user/foo/activity')
+
+    assert first is second is m_fmt.handle.return_value
+    assert m_session.request.call_count == 3
+
+
+PGN_GAME = '\n'.join([
+    '[Event "Rated Blitz game"]',
+    '[Site "https://lichess.org/q7ZvsdUF"]',
+    '[Result "1-0"]',
+    '',
+    '1. e4 e5 1-0',
+])
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = cache.GameStore(str(tmp_path / 'games.db'))
+    yield store
+    store.close()
+
+
+def test_game_store(store):
+    variant = store.variant(False, {'moves': True, 'tags': None})
+    assert variant == 'json;moves=True'
+
+    assert store.put({'id': 'a', 'status': 'mate'}, variant)
+    assert not store.put({'id': 'b', 'status': 'started'}, variant)
+    assert store.put(PGN_GAME, 'pgn;')
+
+    assert store.get('a', variant) == {'id': 'a', 'status': 'mate'}
+    assert store.get('a', 'json;') is None
+    assert store.get_many(['a', 'b'], variant) == {
+        'a': {'id': 'a', 'status': 'mate'}
+    }
+    assert store.get('q7ZvsdUF', 'pgn;') == PGN_GAME
+    assert len(store) == 2
+
+
+def test_game_store_persists(tmp_path):
+    path = str(tmp_path / 'games.db')
+    store = cache.GameStore(path)
+    store.put({'id': 'a', 'status': 'draw'}, 'json;')
+    store.close()
+
+    store = cache.GameStore(path)
+    assert store.get('a', 'json;') == {'id': 'a', 'status': 'draw'}
+    store.close()
+
+
+def test_export_multi_only_requests_missing_games(store):
+    games = clients.Games(mock.Mock(), game_store=store)
+    games._r = mock.Mock()
+    games._r.post.return_value = [
+        {'id': 'c', 'status': 'mate', 'createdAt': 0},
+        {'id': 'a', 'status': 'mate', 'createdAt': 0},
+    ]
+    variant = store.variant(False, dict.fromkeys(
+        ['moves', 'tags', 'clocks', 'evals', 'opening']
+    ))
+    store.put({'id': 'b', 'status': 'resign', 'createdAt': 0}, variant)
+
+    result = list(games.export_multi('a', 'b', 'c'))
+
+    assert [g['id'] for g in result] == ['a', 'b', 'c']
+    assert all(isinstance(g['createdAt'], datetime.datetime) for g in result)
+    _, kwargs = games._r.post.call_args
+    assert kwargs['data'] == 'a,c'
+    assert len(store) == 3
+
+
+def test_export_multi_bypasses_store_without_tags(store):
+    games = clients.Games(mock.Mock(), game_store=store)
+    games._r = mock.Mock()
+    games._r.post.return_value = iter(['1. e4 e5 1-0', '1. d4 d5 0-1'])
+
+    result = list(games.export_multi('a', 'b', as_pgn=True, tags=False))
+
+    assert result == ['1. e4 e5 1-0', '1. d4 d5 0-1']
+    _, kwargs = games._r.post.call_args
+    assert kwargs['data'] == 'a,b'
+    assert len(store) == 0
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import datetime
+import io
+import json
+from unittest import mock
+
+import pytest
+import requests
+
+from berserk import session
+
+pa = pytest.importorskip('pyarrow')
+columnar = pytest.importorskip('berserk.columnar')
+
+GAMES = [
+    {
+        'id': f'game{i}',
+        'rated': True,
+        'createdAt': 1577934245000 + i,
+        'players': {
+            'white': {'user': {'name': 'Foo', 'id': 'foo'}, 'rating': 1500},
+            'black': {'aiLevel': 3},
+        },
+        'clocks': [18000, 17950],
+        'analysis': [{'eval': 20}, {'mate': -3}],
+        'unknown': 'ignored',
+    }
+    for i in range(7)
+]
+
+
+def make_response(records):
+    body = ''.join(json.dumps(record) + '\n\n' for record in records)
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body.encode('utf-8'))
+    return response
+
+
+def test_json_schema_reads_timestamps_as_integers():
+    schema = columnar.json_schema(columnar.GAME_SCHEMA)
+    assert schema.field('createdAt').type == pa.int64()
+    assert schema.field('players') == columnar.GAME_SCHEMA.field('players')
+
+
+def test_arrow_handler_streams_batches():
+    fmt = columnar.ArrowHandler(columnar.GAME_SCHEMA, batch_size=3)
+    fmt.chunk_size = 50
+
+    batches = list(fmt.handle(make_response(GAMES), is_stream=True))
+
+    assert [batch.num_rows for batch in batches] == [3, 3, 1]
+    assert all(batch.schema == columnar.GAME_SCHEMA for batch in batches)
+    first = batches[0].to_pylist()[0]
+    assert first['id'] == 'game0'
+    assert first['createdAt'] == datetime.datetime(
+        2020, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc
+    )
+    assert first['players']['white']['user']['name'] == 'Foo'
+    assert first['players']['black']['aiLevel'] == 3
+    assert first['analysis'][1]['mate'] == -3
+
+
+def test_arrow_handler_parse():
+    fmt = columnar.ArrowHandler(columnar.USER_SCHEMA)
+    users = [{'id': 'foo', 'perfs': {'blitz': {'rating': 1500}}}]
+    table = fmt.handle(make_response(users), is_stream=False)
+    assert table.column('perfs').to_pylist()[0]['blitz']['rating'] == 1500
+    assert fmt.handle(make_response([]), is_stream=False).num_rows == 0
+
+
+def test_requestor_writes_parquet(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    m_session = mock.Mock()
+    m_session.request.return_value = make_response(GAMES)
+    requestor = session.Requestor(m_session, 'https://lichess.org/', None)
+    fmt = columnar.ArrowHandler(columnar.GAME_SCHEMA, batch_size=2)
+
+    batches = requestor.get('api/games/user/foo', fmt=fmt, stream=True)
+    path = tmp_path / 'games.parquet'
+    rows = columnar.write_parquet(batches, path, columnar.GAME_SCHEMA)
+
+    assert rows == len(GAMES)
+    table = pq.read_table(path)
+    assert table.column('id').to_pylist() == [g['id'] for g in GAMES]
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import gzip
+import io
+from unittest import mock
+
+import pytest
+import requests
+
+from berserk import clients
+from berserk import compression
+from berserk import formats
+from berserk import metrics
+from berserk import session
+
+BODY = b''.join(b'{"id": "%d", "moves": "e4 e5 Nf3"}\n' % i for i in range(50))
+
+
+def compress(encoding, body):
+    if encoding == 'gzip':
+        return gzip.compress(body)
+    if encoding == 'br':
+        brotli = pytest.importorskip('brotli')
+        return brotli.compress(body)
+    zstandard = pytest.importorskip('zstandard')
+    return zstandard.ZstdCompressor().compress(body)
+
+
+def make_response(body, encoding=None):
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def test_accept_encoding():
+    assert compression.ACCEPT_ENCODING.startswith(next(iter(
+        compression.DECODERS
+    )))
+    assert 'gzip' in compression.ACCEPT_ENCODING
+
+
+def test_decode_identity():
+    response = make_response(BODY)
+    assert compression.decode(response) is response
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'br', 'zstd'])
+def test_decode(encoding):
+    wire = compress(encoding, BODY)
+    response = compression.decode(make_response(wire, encoding.upper()))
+
+    lines = list(response.iter_lines(chunk_size=16))
+
+    assert lines == BODY.splitlines()
+    assert response.wire_bytes == len(wire)
+    assert response.decoded_bytes == len(BODY)
+    assert compression.wire_size(response) == len(wire)
+
+
+def test_decode_gzip_members():
+    wire = gzip.compress(BODY[:100]) + gzip.compress(BODY[100:])
+    response = compression.decode(make_response(wire, 'gzip'))
+    assert b''.join(response.iter_content(chunk_size=64)) == BODY
+
+
+def test_decode_corrupt():
+    response = compression.decode(make_response(b'not gzip', 'gzip'))
+    with pytest.raises(requests.exceptions.ContentDecodingError):
+        list(response.iter_content(chunk_size=64))
+
+
+def test_requestor_negotiates_and_counts_streams():
+    events = []
+    hooks = mock.Mock(spec=metrics.Hooks, after_request=events.append)
+    wire = gzip.compress(BODY)
+    m_session = mock.Mock()
+    m_session.request.return_value = make_response(wire, 'gzip')
+    requestor = session.Requestor(
+        m_session, 'https://lichess.org/', formats.NDJSON, hooks=hooks
+    )
+
+    games = list(
+        requestor.get('api/games/user/foo', stream=True, compress=True)
+    )
+
+    assert len(games) == 50
+    _, kwargs = m_session.request.call_args
+    assert kwargs['headers']['Accept-Encoding'] == compression.ACCEPT_ENCODING
+    event, = events
+    assert event.bytes_read == len(BODY)
+    assert event.wire_bytes == len(wire)
+
+
+def test_live_streams_keep_default_encoding():
+    m_session = mock.Mock()
+    m_session.request.side_effect = [make_response(BODY), make_response(BODY)]
+    client = clients.Client(m_session)
+
+    list(client.bots.stream_incoming_events())
+    _, kwargs = m_session.request.call_args
+    assert 'Accept-Encoding' not in kwargs['headers']
+
+    list(client.games.export_by_player('foo'))
+    _, kwargs = m_session.request.call_args
+    assert kwargs['headers']['Accept-Encoding'] == compression.ACCEPT_ENCODING
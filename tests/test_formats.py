@@ -1,7 +1,42 @@
 # -*- coding: utf-8 -*-
+import datetime
+import io
+import json
+import multiprocessing
+import operator
+import threading
+import time
 from unittest import mock
 
+import ndjson
+import pytest
+
 from berserk import formats as fmts
+from berserk import models
+from berserk import records as recs
+
+# JSON documents like the ones sent by the API, plus some edge cases
+DOCUMENTS = [
+    b'{"id": "q7ZvsdUF", "rated": true, "variant": "standard",'
+    b' "createdAt": 1525789431889, "status": "resign",'
+    b' "players": {"white": {"user": {"name": "Lance5500", "title": "LM"},'
+    b' "rating": 2389, "ratingDiff": 4}, "black": {"aiLevel": 8}},'
+    b' "moves": "d4 d5 c4 c6", "clock": {"initial": 300, "increment": 3},'
+    b' "analysis": [{"eval": 18}, {"eval": -25, "best": "e2e4",'
+    b' "judgment": {"name": "Inaccuracy"}}], "tournament": null}',
+    b'{"ok": true}',
+    b'[]',
+    b'{}',
+    b'[1, -1, 0, 1.5, -0.25, 1e10, 2.5E-3, 9223372036854775807,'
+    b' -9223372036854775808, 18446744073709551615]',
+    b'[true, false, null, "", "a\\"b", "tab\\tnew\\nline\\\\"]',
+    b'{"unicode": "\\u00e9\\u4e2d\\ud83d\\ude00",'
+    b' "raw": "\xc3\xa9\xe4\xb8\xad"}',
+    b'{"nested": {"a": [[[{"b": [null]}]]]}, "dup": 1, "dup": 2}',
+    b'  {"padded": 1}  ',
+    b'"just a string"',
+    b'3.141592653589793',
+]
 
 
 def test_base_headers():
@@ -32,21 +67,64 @@ def test_base_handle_stream():
 def test_json_handler_parse():
     fmt = fmts.JsonHandler('foo')
     m_response = mock.Mock()
+    m_response.content = b'"bar"'
+
+    result = fmt.parse(m_response)
+    assert result == 'bar'
+
+
+def test_json_handler_parse_custom_decoder():
+    decoder = type('Decoder', (json.JSONDecoder,), {})
+    fmt = fmts.JsonHandler('foo', decoder=decoder)
+    m_response = mock.Mock()
     m_response.json.return_value = 'bar'
 
     result = fmt.parse(m_response)
     assert result == 'bar'
+    m_response.json.assert_called_once_with(cls=decoder)
+
+
+def test_json_handler_unknown_backend():
+    with pytest.raises(ValueError):
+        fmts.JsonHandler('foo', backend='nope')
+
+
+def test_set_json_backend():
+    try:
+        fmts.set_json_backend('json')
+        assert fmts.NDJSON.backend == 'json'
+    finally:
+        fmts.set_json_backend()
+    assert fmts.NDJSON.backend == next(iter(fmts.JSON_BACKENDS))
 
 
 def test_json_handler_parse_stream():
     fmt = fmts.JsonHandler('foo')
     m_response = mock.Mock()
-    m_response.iter_lines.return_value = [b'{"x": 5}', b'', b'{"y": 3}']
+    m_response.iter_content.return_value = [b'{"x": 5}\n', b'\n{"y": 3}']
 
     result = fmt.parse_stream(m_response)
     assert list(result) == [{'x': 5}, {'y': 3}]
 
 
+@pytest.mark.parametrize('make', [
+    lambda size: fmts.JsonHandler('foo', chunk_size=size),
+    lambda size: fmts.JsonHandler(
+        'foo', decoder=ndjson.Decoder, chunk_size=size
+    ).project(['id']).interning(),
+    lambda size: fmts.PgnHandler(chunk_size=size),
+    lambda size: fmts.PgnGameHandler(chunk_size=size),
+])
+def test_handler_chunk_size(make):
+    fmt = make(1024)
+    m_response = mock.Mock()
+    m_response.iter_content.return_value = []
+
+    assert fmt.chunk_size == 1024
+    assert list(fmt.parse_stream(m_response)) == []
+    m_response.iter_content.assert_called_once_with(chunk_size=1024)
+
+
 def test_pgn_handler_parse():
     fmt = fmts.PgnHandler()
     m_response = mock.Mock()
@@ -59,7 +137,369 @@ def test_pgn_handler_parse():
 def test_pgn_handler_parse_stream():
     fmt = fmts.PgnHandler()
     m_response = mock.Mock()
-    m_response.iter_lines.return_value = [b'one', b'two', b'', b'', b'three']
+    m_response.iter_content.return_value = [b'one\ntw', b'o\n\n\nthree']
 
     result = fmt.parse_stream(m_response)
     assert list(result) == ['one\ntwo', 'three']
+
+
+def assert_identical(a, b):
+    # equality alone would treat 1 == 1.0 == True
+    assert type(a) is type(b)
+    assert a == b
+    if isinstance(a, dict):
+        assert list(a) == list(b)
+        for key in a:
+            assert_identical(a[key], b[key])
+    elif isinstance(a, list):
+        for x, y in zip(a, b):
+            assert_identical(x, y)
+
+
+@pytest.fixture(params=list(fmts.JSON_BACKENDS))
+def backend(request):
+    return request.param
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_json_backend_parity(backend, document):
+    loads = fmts.JSON_BACKENDS[backend]
+    assert_identical(loads(document), json.loads(document))
+
+
+@pytest.mark.parametrize('document', [b'', b'{', b'{"a": }', b'[1,]', b'x'])
+def test_json_backend_parity_errors(backend, document):
+    loads = fmts.JSON_BACKENDS[backend]
+    with pytest.raises(ValueError):
+        json.loads(document)
+    with pytest.raises(ValueError):
+        loads(document)
+
+
+def test_ndjson_backend_parity(backend):
+    lines = [d.strip() for d in DOCUMENTS]
+    body = b'\n'.join(lines) + b'\n'
+    expected = ndjson.loads(body.decode('utf-8'))
+    fmt = fmts.JsonHandler('foo', decoder=ndjson.Decoder, backend=backend)
+    m_response = mock.Mock(content=body)
+    m_response.iter_content.return_value = [body[:100], body[100:]]
+
+    assert_identical(fmt.parse(m_response), expected)
+    assert_identical(list(fmt.parse_stream(m_response)), expected)
+
+
+@pytest.mark.parametrize('skipping', [True, False])
+def test_ndjson_projection(backend, skipping):
+    fields = ('id', 'players', 'for', 'missing')
+    if skipping:
+        project = fmts.json_projection(backend, fields)
+    else:
+        with mock.patch.object(fmts, 'msgspec', None):
+            project = fmts.json_projection.__wrapped__(backend, fields)
+    document = DOCUMENTS[0].replace(b'"rated"', b'"for"')
+    expected = json.loads(document)
+
+    assert_identical(project(document), {
+        'id': expected['id'],
+        'players': expected['players'],
+        'for': True,
+    })
+    assert project(b'{}') == {}
+    with pytest.raises(ValueError):
+        project(b'{"id": ')
+
+
+def test_json_handler_project(backend):
+    fmt = fmts.JsonHandler('foo', decoder=ndjson.Decoder, backend=backend)
+    projected = fmt.project(['id', 'x'])
+    m_response = mock.Mock(content=b'{"id": 1, "y": [2]}\n{"x": {}}\n')
+    m_response.iter_content.return_value = [m_response.content]
+
+    assert projected.backend == backend
+    assert projected.fields == ('id', 'x')
+    assert fmt.fields is None
+    assert projected.parse(m_response) == [{'id': 1}, {'x': {}}]
+    assert list(projected.parse_stream(m_response)) == [{'id': 1}, {'x': {}}]
+    with pytest.raises(ValueError):
+        fmts.JSON.project(['id'])
+
+
+def test_interner():
+    interner = fmts.Interner(max_size=3)
+    games = [
+        json.loads(DOCUMENTS[0]),
+        json.loads(DOCUMENTS[0]),
+        {'players': 'x', 'opening': {'eco': 5}, 'variant': None},
+    ]
+    for game in games:
+        assert interner(game) is game
+
+    assert games[0] == games[1]
+    assert games[0]['variant'] is games[1]['variant']
+    assert games[0]['status'] is games[1]['status']
+    white = [g['players']['white']['user']['name'] for g in games[:2]]
+    assert white[0] is white[1]
+    assert len(interner.table) == 3
+    assert games[0]['moves'] is not games[1]['moves']
+    assert games[2] == {'players': 'x', 'opening': {'eco': 5}, 'variant': None}
+    assert interner([1]) == [1]
+
+
+def test_json_handler_interning(backend):
+    fmt = fmts.JsonHandler('foo', decoder=ndjson.Decoder, backend=backend)
+    interner = fmts.Interner([('a',), ('b', 'c')])
+    interning = fmt.project(['a', 'b']).interning(interner)
+    body = b'{"a": "xyz", "b": {"c": "uvw"}, "d": 1}\n' * 2
+    m_response = mock.Mock(content=body)
+    m_response.iter_content.return_value = [body]
+
+    first, second = interning.parse_stream(m_response)
+    assert first == {'a': 'xyz', 'b': {'c': 'uvw'}}
+    assert first['a'] is second['a'] and first['b']['c'] is second['b']['c']
+    assert interning.fields == ('a', 'b')
+    assert interning.interner is interner
+    assert fmt.interner is None
+    assert fmt.interning().interner is not None
+    with pytest.raises(ValueError):
+        fmts.JSON.interning()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 5, 64])
+def test_line_splitter(chunk_size):
+    body = b'one\r\ntwo\n\nthree and more\nlast'
+    chunks = [
+        body[i:i + chunk_size] for i in range(0, len(body), chunk_size)
+    ]
+    splitter = fmts.LineSplitter()
+    lines = []
+    for chunk in chunks:
+        lines.extend(splitter.feed(chunk))
+    lines.extend(splitter.close())
+    assert lines == [b'one', b'two', b'', b'three and more', b'last']
+
+
+def test_iter_lines_uses_chunk_size():
+    fmt = fmts.JsonHandler('foo')
+    fmt.chunk_size = 123
+    m_response = mock.Mock()
+    m_response.iter_content.return_value = [b'{"x": 5}\n']
+
+    assert list(fmt.parse_stream(m_response)) == [{'x': 5}]
+    m_response.iter_content.assert_called_once_with(chunk_size=123)
+
+
+def test_text_handler_parse_stream():
+    m_response = mock.Mock()
+    m_response.iter_content.return_value = [b'a\nb', b'c\n']
+
+    assert list(fmts.TEXT.parse_stream(m_response)) == [b'a', b'bc']
+
+
+PGN_GAMES = [
+    '[Event "Rated Blitz game"]\n[Site "https://lichess.org/a"]\n\n'
+    '1. e4 e5 2. Nf3 { [%clk 0:03:00] } Nc6 1-0',
+    '[Event "Study: Chapter 1"]\n[Annotator "ü"]\n\n1. d4 *',
+    '[Event "Casual game"]\n\n1. c4 0-1',
+]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 1000])
+@pytest.mark.parametrize('separator', ['\n\n\n', '\n\n', '\r\n\r\n\r\n'])
+def test_pgn_splitter(chunk_size, separator):
+    games = [g.replace('\n', '\r\n') if '\r' in separator else g
+             for g in PGN_GAMES]
+    body = ('\n' + separator.join(games) + separator).encode('utf-8')
+    splitter = fmts.PgnSplitter(fmts.decode_pgn)
+    result = []
+    for i in range(0, len(body), chunk_size):
+        result.extend(splitter.feed(body[i:i + chunk_size]))
+    result.extend(splitter.close())
+    assert result == PGN_GAMES
+
+
+def test_pgn_splitter_without_decoding():
+    body = '\n\n\n'.join(PGN_GAMES).encode('utf-8')
+    splitter = fmts.PgnSplitter()
+    games = splitter.feed(body) + splitter.close()
+    assert all(isinstance(game, memoryview) for game in games)
+    assert [fmts.decode_pgn(game) for game in games] == PGN_GAMES
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 1000])
+@pytest.mark.parametrize('fmt,expected', [
+    (fmts.NDJSON, 3),
+    (fmts.PGN, len(PGN_GAMES)),
+])
+def test_raw_writer_counts_records(chunk_size, fmt, expected):
+    if fmt is fmts.PGN:
+        body = '\n\n\n'.join(PGN_GAMES).encode('utf-8')
+    else:
+        # keep-alives are blank lines, which are not records
+        body = b'\n{"id": "a"}\n\n\n{"id": "b"}\n{"id": "c"}\n\n'
+    file = io.BytesIO()
+    reports = []
+    writer = fmts.RawHandler(
+        fmt, file, progress=reports.append, count=True
+    ).stream_parser()
+
+    for i in range(0, len(body), chunk_size):
+        writer.feed(body[i:i + chunk_size])
+
+    assert writer.close() == [fmts.Progress(len(body), expected)]
+    assert file.getvalue() == body
+    assert len(reports) == -(-len(body) // chunk_size)
+
+
+@pytest.mark.parametrize('body,expected', [
+    (b'{"id": "a"}\n{"id": "b"}', 2),
+    (b'{"id": "a"}\n\n', 1),
+    (b'', 0),
+])
+def test_raw_writer_counts_last_line(body, expected):
+    writer = fmts.RawHandler(
+        fmts.NDJSON, io.BytesIO(), count=True
+    ).stream_parser()
+    for i in range(0, len(body), 5):
+        writer.feed(body[i:i + 5])
+    assert writer.close() == [fmts.Progress(len(body), expected)]
+
+
+def test_raw_handler_stream():
+    file = io.BytesIO()
+    fmt = fmts.RawHandler(fmts.PGN, file)
+    m_response = mock.Mock()
+    m_response.iter_content.return_value = [b'[Event "a"]\n', b'\n1. e4 *']
+
+    progress = list(fmt.handle(m_response, is_stream=True))
+
+    assert fmt.headers == fmts.PGN.headers
+    assert progress[-1] == fmts.Progress(20, None)
+    assert file.getvalue() == b'[Event "a"]\n\n1. e4 *'
+    m_response.iter_content.assert_called_once_with(
+        chunk_size=fmts.RAW_CHUNK_SIZE
+    )
+
+
+def test_open_output(tmp_path):
+    file = io.BytesIO()
+    with fmts.open_output(file) as output:
+        assert output is file
+    assert not file.closed
+
+    with fmts.open_output(tmp_path / 'out') as output:
+        output.write(b'x')
+    assert output.closed
+    assert (tmp_path / 'out').read_bytes() == b'x'
+
+
+def test_prefetch():
+    chunks = [b'{"x": 1}\n{"x"', b': 2}\n', b'', b'{"x": 3}']
+    records = fmts.prefetch(chunks, fmts.NDJSON.stream_parser(), depth=1)
+    assert list(records) == [{'x': 1}, {'x': 2}, {'x': 3}]
+
+
+def test_prefetch_raises_reader_errors():
+    def chunks():
+        yield b'{"x": 1}\n'
+        raise ValueError('connection dropped')
+
+    records = fmts.prefetch(chunks(), fmts.NDJSON.stream_parser(), depth=1)
+    assert next(records) == {'x': 1}
+    with pytest.raises(ValueError):
+        next(records)
+
+
+def test_prefetch_applies_backpressure_and_closes():
+    read = []
+    close = mock.Mock()
+
+    def chunks():
+        for i in range(100):
+            read.append(i)
+            yield b'{"x": %d}\n' % i
+
+    records = fmts.prefetch(
+        chunks(), fmts.NDJSON.stream_parser(), depth=2, close=close
+    )
+    assert next(records) == {'x': 0}
+    while len(read) < 4:
+        time.sleep(0.001)
+    time.sleep(0.05)
+    assert len(read) <= 5  # one consumed, two queued, one waiting
+
+    records.close()
+
+    assert close.call_count == 1
+    assert not any(
+        thread.name == 'berserk-prefetch' and thread.is_alive()
+        for thread in threading.enumerate()
+    )
+
+
+def test_parallel_decoder_keeps_order():
+    lines = [b'{"id": "%d", "createdAt": 0}' % i for i in range(50)]
+    body = b'\n'.join(lines) + b'\n\n'
+    chunks = [body[i:i + 100] for i in range(0, len(body), 100)]
+
+    with fmts.ParallelDecoder(workers=2, batch_size=7, threshold=10) as pool:
+        records = list(pool.decode(fmts.NDJSON, chunks, models.Game.convert))
+        assert pool._pool is not None
+
+    assert [r['id'] for r in records] == [str(i) for i in range(50)]
+    assert all(isinstance(r['createdAt'], datetime.datetime) for r in records)
+    assert pool._pool is None
+
+
+@pytest.mark.parametrize('switch,kind', [
+    (models.set_compact, recs.Game),
+    (models.set_lazy, models.LazyRecord),
+])
+def test_parallel_decoder_keeps_record_mode(switch, kind):
+    body = b''.join(b'{"id": "%d", "createdAt": 0}\n' % i for i in range(20))
+    try:
+        switch(models=[models.Game])
+        converter = models.Game.convert
+    finally:
+        switch(False)
+
+    with fmts.ParallelDecoder(
+        workers=2,
+        batch_size=3,
+        threshold=5,
+        mp_context=multiprocessing.get_context('spawn'),
+    ) as pool:
+        records = list(pool.decode(fmts.NDJSON, [body], converter))
+
+    assert len(records) == 20
+    assert isinstance(records[0], kind)
+    assert all(type(record) is type(records[0]) for record in records)
+    assert all(record['createdAt'].year == 1970 for record in records)
+
+
+def test_parallel_decoder_transform():
+    body = b''.join(b'{"id": "%d"}\n' % i for i in range(20))
+    pool = fmts.ParallelDecoder(
+        workers=2,
+        batch_size=3,
+        threshold=5,
+        transform=operator.itemgetter('id'),
+    )
+    try:
+        records = list(pool.decode(fmts.NDJSON, [body]))
+    finally:
+        pool.close()
+    assert records == [str(i) for i in range(20)]
+
+
+def test_parallel_decoder_projection():
+    body = b''.join(b'{"id": "%d", "moves": "e4"}\n' % i for i in range(20))
+    with fmts.ParallelDecoder(workers=2, batch_size=3, threshold=5) as pool:
+        records = list(pool.decode(fmts.NDJSON.project(['id']), [body]))
+    assert records == [{'id': str(i)} for i in range(20)]
+
+
+def test_parallel_decoder_short_streams_stay_in_process():
+    pool = fmts.ParallelDecoder(workers=2, threshold=10)
+    records = list(pool.decode(fmts.NDJSON, [b'{"x": 1}\n', b'{"x": 2}']))
+    assert records == [{'x': 1}, {'x': 2}]
+    assert pool._pool is None
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import datetime
+import io
+from unittest import mock
+
+import pytest
+import requests
+
+from berserk import exceptions
+from berserk import formats
+from berserk import metrics
+from berserk import session
+
+
+class Recorder(metrics.Hooks):
+    def __init__(self):
+        self.calls = []
+
+    def before_request(self, event):
+        self.calls.append(('before', event.endpoint))
+
+    def on_record(self, event, record):
+        self.calls.append(('record', record))
+
+    def after_request(self, event):
+        self.calls.append(('after', event.status))
+        self.event = event
+
+
+def make_response(status, body):
+    response = requests.Response()
+    response.status_code = status
+    response.raw = io.BytesIO(body)
+    response.elapsed = datetime.timedelta(seconds=0.25)
+    return response
+
+
+def make_requestor(hooks, status=200, body=b''):
+    m_session = mock.Mock()
+    m_session.request.return_value = make_response(status, body)
+    return session.Requestor(
+        m_session, 'https://lichess.org/', formats.JSON, hooks=hooks
+    )
+
+
+@pytest.mark.parametrize('url,template', [
+    ('https://lichess.org/api/user/foo', 'api/user/{username}'),
+    ('https://lichess.org/api/user/foo/activity',
+     'api/user/{username}/activity'),
+    ('https://lichess.org/api/user/puzzle-activity',
+     'api/user/puzzle-activity'),
+    ('https://lichess.org/api/team/all?page=2', 'api/team/all'),
+    ('https://lichess.org/study/abc.pgn', 'study/{study_id}.pgn'),
+    ('https://explorer.lichess.ovh/masters', 'masters'),
+    ('https://lichess.org/api/unknown/x', 'api/unknown/x'),
+])
+def test_endpoint(url, template):
+    assert metrics.endpoint(url) == template
+
+
+def test_hooks_fire_for_request():
+    hooks = Recorder()
+    requestor = make_requestor(hooks, body=b'{"id": "foo"}')
+
+    assert requestor.get('api/user/foo') == {'id': 'foo'}
+
+    assert hooks.calls == [
+        ('before', 'api/user/{username}'),
+        ('after', 200),
+    ]
+    event = hooks.event
+    assert event.ttfb == 0.25
+    assert event.bytes_read == 13
+    assert event.records == 0
+    assert event.latency >= event.parse_time >= 0
+    assert event.error is None
+
+
+def test_hooks_fire_for_stream():
+    hooks = Recorder()
+    requestor = make_requestor(hooks, body=b'{"a": 1}\n{"a": 2}\n')
+
+    stream = requestor.get('api/tv/feed', stream=True, fmt=formats.NDJSON)
+    assert hooks.calls == [('before', 'api/tv/feed')]
+    assert list(stream) == [{'a': 1}, {'a': 2}]
+
+    assert hooks.calls[1:] == [
+        ('record', {'a': 1}),
+        ('record', {'a': 2}),
+        ('after', 200),
+    ]
+    assert hooks.event.records == 2
+    assert hooks.event.bytes_read == 18
+    assert hooks.event.is_stream
+
+
+def test_hooks_fire_once_for_abandoned_stream():
+    hooks = Recorder()
+    requestor = make_requestor(hooks, body=b'{"a": 1}\n{"a": 2}\n')
+
+    stream = requestor.get('api/tv/feed', stream=True, fmt=formats.NDJSON)
+    next(stream)
+    stream.close()
+
+    assert [c for c in hooks.calls if c[0] == 'after'] == [('after', 200)]
+    assert hooks.event.records == 1
+
+
+def test_hooks_fire_for_error():
+    hooks = Recorder()
+    requestor = make_requestor(hooks, status=404, body=b'{}')
+
+    with pytest.raises(exceptions.ResponseError):
+        requestor.get('api/user/foo')
+
+    assert hooks.calls[-1] == ('after', 404)
+    assert isinstance(hooks.event.error, exceptions.ResponseError)
+
+
+def test_collector_prometheus():
+    collector = metrics.MetricsCollector(buckets=[0.1, 1])
+    for latency in (0.05, 0.5, 5):
+        event = metrics.RequestEvent('GET', 'https://lichess.org/api/user/a')
+        event.status = 200
+        event.latency = latency
+        event.bytes_read = 10
+        collector.after_request(event)
+
+    text = collector.to_prometheus()
+
+    assert (
+        'berserk_requests_total{endpoint="api/user/{username}",status="200"} 3'
+    ) in text
+    lines = [
+        'berserk_request_duration_seconds_bucket'
+        '{endpoint="api/user/{username}",le="0.1"} 1',
+        'berserk_request_duration_seconds_bucket'
+        '{endpoint="api/user/{username}",le="1"} 2',
+        'berserk_request_duration_seconds_bucket'
+        '{endpoint="api/user/{username}",le="+Inf"} 3',
+        'berserk_request_duration_seconds_sum'
+        '{endpoint="api/user/{username}"} 5.55',
+        'berserk_request_duration_seconds_count'
+        '{endpoint="api/user/{username}"} 3',
+        'berserk_bytes_total{endpoint="api/user/{username}"} 30',
+    ]
+    for line in lines:
+        assert line in text
+    assert 'time_to_first_byte_seconds_count' not in text
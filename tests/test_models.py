@@ -1,4 +1,9 @@
 # -*- coding: utf-8 -*-
+import pickle
+from unittest import mock
+
+import pytest
+
 from berserk import models
 
 
@@ -9,3 +14,102 @@ def test_conversion():
     original = {'foo': '5', 'bar': 3, 'baz': '4'}
     modified = {'foo': 5, 'bar': 3, 'baz': '4'}
     assert Example.convert(original) == modified
+
+
+def test_conversion_plan_follows_class_changes():
+    class Example(models.Model):
+        foo = int
+
+    Example.bar = str
+    assert Example.convert({'foo': '5', 'bar': 3}) == {'foo': 5, 'bar': '3'}
+    del Example.foo
+    assert Example.convert([{'foo': '5'}]) == [{'foo': '5'}]
+
+
+def test_nested_conversions():
+    data = {'interval': {'start': 0}, 'points': [[2020, 0, 1, 1500]]}
+    assert models.Activity.convert(data)['interval']['start'].year == 1970
+    entry = models.RatingHistory.convert(data)['points'][0]
+    assert (entry.year, entry.rating) == (2020, 1500)
+
+
+def test_lazy_record_converts_on_access():
+    func = mock.Mock(side_effect=int)
+
+    class Record(models.LazyRecord):
+        _functions = {'foo': func}
+
+    record = Record({'foo': '5', 'bar': '3'})
+    assert dict.__getitem__(record, 'foo') == '5'
+    assert record['foo'] == 5
+    assert record.get('foo') == 5
+    assert record.get('baz', 1) == 1
+    assert func.call_count == 1
+    assert isinstance(record, dict)
+
+
+def test_lazy_record_views():
+    record = models.Game._record({'createdAt': 0, 'id': 'a'})
+    assert dict(record)['createdAt'].year == 1970
+
+    record = models.Game._record({'createdAt': 0, 'id': 'a'})
+    assert pickle.loads(pickle.dumps(record)) == record
+    assert record == models.Game.convert({'createdAt': 0, 'id': 'a'})
+
+    record = models.Game._record({'createdAt': 0, 'lastMoveAt': 0})
+    record['createdAt'] = 'now'
+    record.update(lastMoveAt='later')
+    assert list(record.values()) == ['now', 'later']
+
+    record = models.Game._record({'id': 'a', 'createdAt': 0})
+    key, value = record.popitem()
+    assert key == 'createdAt' and value.year == 1970
+    assert record.popitem() == ('id', 'a')
+    with pytest.raises(KeyError):
+        record.popitem()
+
+    record = models.Game._record({'createdAt': 0})
+    copied = record.copy()
+    assert copied.pop('createdAt') == record.pop('createdAt', None)
+    assert copied == record == {}
+
+
+def test_set_lazy():
+    data = {'createdAt': 0, 'id': 'a'}
+    try:
+        models.set_lazy(models=[models.Game])
+        game = models.Game.convert(dict(data))
+        assert isinstance(game, models.LazyRecord)
+        user = models.User.convert(dict(data))
+        assert not isinstance(user, models.LazyRecord)
+        assert game['createdAt'].year == 1970
+    finally:
+        models.set_lazy(False)
+    assert models.Game.convert(dict(data))['createdAt'].year == 1970
+    assert type(models.Game.convert(dict(data))) is dict
+
+
+def test_convert_lazy():
+    games = models.Game.convert_lazy([{'lastMoveAt': 0}])
+    assert games[0]['lastMoveAt'].year == 1970
+
+
+def test_convert_columns():
+    np = pytest.importorskip('numpy')
+    data = [{'id': 'a', 'createdAt': 0}, {'id': 'b', 'lastMoveAt': 1000}]
+
+    games, columns = models.Game.convert_columns(iter(data))
+
+    assert games == data
+    assert list(columns) == ['createdAt', 'lastMoveAt']
+    assert columns['createdAt'][0] == np.datetime64(0, 'ms')
+    assert np.isnat(columns['createdAt'][1])
+    assert columns['lastMoveAt'][1] == np.datetime64(1, 's')
+
+
+def test_convert_columns_converts_other_fields():
+    pytest.importorskip('numpy')
+    activity = {'interval': {'start': 0}}
+    records, columns = models.Activity.convert_columns([activity])
+    assert columns == {}
+    assert records[0]['interval']['start'].year == 1970
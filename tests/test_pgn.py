@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import io
+
+import pytest
+import requests
+
+from berserk import formats
+from berserk import pgn
+from berserk import session
+
+GAME = '''[Event "Rated Blitz game"]
+[Site "https://lichess.org/q7ZvsdUF"]
+[White "Alice"]
+[Black "Bob"]
+[WhiteElo "2100"]
+[ECO "C50"]
+[UTCDate "2020.01.02"]
+[UTCTime "03:04:05"]
+
+1. e4 { [%eval 0.2] [%clk 0:03:00] } 1... e5 { [%clk 0:02:59.5] } \
+2. Nf3?! { Dubious. [%eval #-3] } (2. Nc3 Nf6) 2... Nc6 $1 1-0'''
+
+
+def test_tags_are_parsed_eagerly():
+    game = pgn.PgnGame(GAME.encode('utf-8'))
+    assert game._parsed is None
+    assert game['WhiteElo'] == '2100'
+    assert game.get('ECO') == 'C50'
+    assert game.get('Opening') is None
+    assert game.game_id == 'q7ZvsdUF'
+    assert repr(game) == '<PgnGame Alice vs Bob>'
+    assert str(game) == GAME
+    assert game._parsed is None
+
+
+def test_movetext_is_parsed_on_access():
+    game = pgn.PgnGame(memoryview(GAME.encode('utf-8')))
+    assert game.moves == ['e4', 'e5', 'Nf3', 'Nc6']
+    assert game.comments == [None, None, 'Dubious.', None]
+    assert game.clocks == [180, 179.5, None, None]
+    assert game.evals == [0.2, None, None, None]
+    assert game.mates == [None, None, -3, None]
+
+
+def test_game_without_tags():
+    game = pgn.PgnGame(b'1. d4 d5 *')
+    assert game.tags == {}
+    assert game.moves == ['d4', 'd5']
+
+
+@pytest.mark.parametrize('value,expected', [
+    ('0:03:00', 180),
+    ('1:00:01.5', 3601.5),
+])
+def test_parse_clock(value, expected):
+    assert pgn.parse_clock(value) == expected
+
+
+@pytest.mark.parametrize('value,expected', [
+    ('0.31', (0.31, None)),
+    ('-1.5,20', (-1.5, None)),
+    ('#4', (None, 4)),
+])
+def test_parse_eval(value, expected):
+    assert pgn.parse_eval(value) == expected
+
+
+def test_pgn_games_handler():
+    body = '\n\n\n'.join([GAME, GAME.replace('Alice', 'Carol')]) + '\n\n\n'
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body.encode('utf-8'))
+
+    games = list(formats.PGN_GAMES.handle(response, is_stream=True))
+
+    assert [game['White'] for game in games] == ['Alice', 'Carol']
+    assert all(isinstance(game, pgn.PgnGame) for game in games)
+
+
+def test_resume_marker():
+    game = pgn.PgnGame(GAME.encode('utf-8'))
+    assert session.Resume.marker(game) == session.Resume.marker(GAME)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import pytest
+
+from berserk import models
+from berserk import records
+from berserk import session
+
+
+def test_record_fields():
+    game = records.Game.from_dict({'id': 'a', 'rated': True, 'foo': 1})
+
+    assert game.id == 'a'
+    assert game['rated'] is True
+    assert game.winner is None
+    assert game.get('winner', 'draw') == 'draw'
+    assert game['foo'] == 1
+    assert game.extra == {'foo': 1}
+    assert 'id' in game and 'winner' not in game
+    with pytest.raises(KeyError):
+        game['winner']
+    with pytest.raises(AttributeError):
+        game.foo
+    with pytest.raises(AttributeError):
+        game.bar = 2
+
+
+def test_record_to_dict():
+    data = {'id': 'a', 'tournament': None, 'foo': [1]}
+    game = records.Game(**data)
+
+    assert game.to_dict() == data
+    assert game == records.Game.from_dict(data)
+    assert game != records.User.from_dict(data)
+    assert pickle.loads(pickle.dumps(game)) == game
+    assert repr(game) == f'Game({data!r})'
+
+
+def test_record_is_smaller_than_dict():
+    data = dict.fromkeys(records.Game._fields)
+    game = records.Game.from_dict(data)
+    assert not hasattr(game, '__dict__')
+    assert game.__sizeof__() < data.__sizeof__() / 2
+
+
+def test_set_compact():
+    try:
+        models.set_compact(models=[models.Game])
+        game = models.Game.convert({'id': 'a', 'createdAt': 0})
+        assert isinstance(game, records.Game)
+        assert game.createdAt.year == 1970
+        assert session.Resume.marker(game)[2] == 'a'
+        assert isinstance(models.User.convert({'id': 'a'}), dict)
+    finally:
+        models.set_compact(False)
+    assert isinstance(models.Game.convert({'id': 'a'}), dict)
+    with pytest.raises(ValueError):
+        models.set_compact(models=[models.Activity])
+
+
+def test_convert_compact():
+    activity = models.PuzzleActivity.convert_compact([{'date': 0, 'x': 1}])
+    assert activity[0].date.year == 1970
+    assert activity[0].extra == {'x': 1}
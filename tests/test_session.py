@@ -1,8 +1,20 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import io
+import operator
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest import mock
 
 import pytest
+import requests
 
+from berserk import clients
+from berserk import exceptions
+from berserk import formats as fmts
+from berserk import models
 from berserk import session
 from berserk import utils
 
@@ -40,3 +52,482 @@ def test_token_session():
     token_session = session.TokenSession('foo')
     assert token_session.token == 'foo'
     assert token_session.headers == {'Authorization': 'Bearer foo'}
+
+
+def test_rate_limited_request_is_retried_after_back_off():
+    m_session = mock.Mock()
+    limited = mock.Mock(status_code=429)
+    m_session.request.side_effect = [limited, mock.Mock(status_code=200)]
+    m_limiter = mock.Mock(retries=1)
+    m_limiter.reserve.return_value = 0
+    requestor = session.Requestor(
+        m_session, 'http://foo.com/', mock.Mock(), rate_limiter=m_limiter
+    )
+
+    requestor.request('bar', 'path')
+
+    assert m_session.request.call_count == 2
+    assert m_limiter.back_off.call_count == 1
+    assert limited.close.call_count == 1
+
+
+def test_rate_limited_request_without_limiter():
+    m_session = mock.Mock()
+    m_session.request.return_value.status_code = 429
+    m_session.request.return_value.ok = False
+    requestor = session.Requestor(m_session, 'http://foo.com/', mock.Mock())
+
+    with pytest.raises(Exception):
+        requestor.request('bar', 'path')
+    assert m_session.request.call_count == 1
+
+
+def test_token_bucket():
+    bucket = session.TokenBucket(rate=2, capacity=2, clock=lambda: 0)
+    assert bucket.reserve(0) == 0
+    assert bucket.reserve(0) == 0
+    assert bucket.reserve(0) == 0.5
+    assert bucket.reserve(0) == 1
+    assert bucket.reserve(10) == 0
+
+
+def test_rate_limiter_classify():
+    limiter = session.RateLimiter()
+    assert limiter.classify('https://lichess.org/api/account') == 'default'
+    assert limiter.classify('https://lichess.org/api/games/user/x') == 'export'
+    assert limiter.classify('https://lichess.org/api/bot/game/x/move/e2e4') \
+        == 'move'
+    assert limiter.classify('https://explorer.lichess.ovh/masters') \
+        == 'explorer'
+
+
+def test_rate_limiter_back_off():
+    now = [100]
+    limiter = session.RateLimiter(backoff=60, clock=lambda: now[0])
+    assert limiter.reserve('https://lichess.org/api/account') == 0
+    limiter.back_off()
+    assert limiter.reserve('https://lichess.org/api/account') == 60
+    now[0] = 130
+    assert limiter.reserve('https://lichess.org/api/account') == 30
+
+
+def interrupted(*lines):
+    def iter_content(chunk_size):
+        for line in lines:
+            yield line + b'\n'
+        raise requests.ConnectionError('connection dropped')
+
+    return mock.Mock(status_code=200, iter_content=iter_content)
+
+
+def test_resumable_stream():
+    m_session = mock.Mock()
+    m_session.request.side_effect = [
+        interrupted(
+            b'{"id": "a", "createdAt": 3}', b'{"id": "b", "createdAt": 2}'
+        ),
+        mock.Mock(
+            status_code=200,
+            iter_content=mock.Mock(
+                return_value=[
+                    b'{"id": "c", "createdAt": 2}\n'
+                    b'{"id": "b", "createdAt": 2}',
+                    b'\n{"id": "d", "createdAt": 1}\n',
+                ]
+            ),
+        ),
+    ]
+    requestor = session.Requestor(m_session, 'http://foo.com/', fmts.NDJSON)
+    resume = session.Resume('until', backoff=0)
+
+    result = requestor.get(
+        'path', params={'max': 10}, stream=True, resume=resume
+    )
+
+    assert [g['id'] for g in result] == ['a', 'b', 'c', 'd']
+    _, kwargs = m_session.request.call_args
+    assert kwargs['params'] == {'max': 9, 'until': 2}
+
+
+def test_resumable_stream_transformed_in_pool():
+    lines = [b'{"id": "%d", "createdAt": %d}' % (i, 20 - i) for i in range(8)]
+    m_session = mock.Mock()
+    m_session.request.side_effect = [
+        interrupted(*lines[:5]),
+        mock.Mock(
+            status_code=200,
+            iter_content=mock.Mock(return_value=[b'\n'.join(lines)]),
+        ),
+    ]
+    pool = fmts.ParallelDecoder(
+        workers=1,
+        batch_size=2,
+        threshold=1,
+        transform=operator.itemgetter('createdAt'),
+    )
+    requestor = session.Requestor(
+        m_session, 'http://foo.com/', fmts.NDJSON, parallel=pool
+    )
+    resume = session.Resume('until', backoff=0)
+
+    with pool:
+        result = list(requestor.get(
+            'path', stream=True, resume=resume, parallel=True,
+            converter=models.Game.convert,
+        ))
+
+    # tracked by ID and time, then converted, before the transform
+    assert result == [
+        utils.datetime_from_millis(20 - i) for i in range(8)
+    ]
+    assert m_session.request.call_count == 2
+
+
+def test_resume_lowers_max():
+    resume = session.Resume('until')
+    for game_id, created_at in [('a', 5), ('b', 4), ('c', 4)]:
+        resume.track({'id': game_id, 'createdAt': created_at})
+    params = resume.params({'max': 100, 'until': 10})
+    # b and c are sent again, and skipped
+    assert params == {'max': 99, 'until': 4}
+
+    resume.track({'id': 'd', 'createdAt': 3})
+    assert resume.params(params) == {'max': 97, 'until': 3}
+    assert resume.params({}) == {'until': 3}
+
+
+def test_export_copies_raw_stream():
+    body = b'[Event "a"]\n\n1. e4 *\n\n\n[Event "b"]\n\n1. d4 *\n\n\n'
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    m_session = mock.Mock()
+    m_session.request.return_value = response
+    games = clients.Games(m_session)
+    file = io.BytesIO()
+    reports = []
+
+    progress = games.export_by_player(
+        'foo', as_pgn=True, to=file, progress=reports.append, count=True
+    )
+
+    assert progress == fmts.Progress(len(body), 2)
+    assert reports == [progress]
+    assert file.getvalue() == body
+    _, kwargs = m_session.request.call_args
+    assert kwargs['headers']['Accept'] == fmts.PGN.mime_type
+
+
+def test_export_projects_fields():
+    m_session = mock.Mock()
+    m_session.request.return_value = mock.Mock(
+        status_code=200,
+        iter_content=mock.Mock(return_value=[
+            b'{"id": "a", "createdAt": 3, "moves": "e4", "winner": "white"}\n'
+        ]),
+    )
+    games = clients.Games(m_session)
+
+    result = games.export_by_player('foo', fields=['winner'])
+    assert [dict(g) for g in result] == [{'winner': 'white'}]
+
+    result = games.export_by_player('foo', fields=['winner'], resume=True)
+    assert [g['id'] for g in result] == ['a']
+    assert games.export_by_player('foo', fields=['id'], as_pgn=True)
+
+
+def test_export_interns_strings():
+    m_session = mock.Mock()
+    m_session.request.return_value = mock.Mock(
+        status_code=200,
+        iter_content=mock.Mock(return_value=[
+            b'{"id": "a", "createdAt": 3, "status": "mate"}\n'
+            b'{"id": "b", "createdAt": 2, "status": "mate"}\n'
+        ]),
+    )
+    tournaments = clients.Tournaments(m_session)
+    interner = fmts.Interner()
+
+    first, second = tournaments.export_games('foo', intern=interner)
+    assert first['status'] is second['status']
+    assert interner.table == {'mate': 'mate'}
+
+
+def test_prefetched_stream():
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(b'{"id": "a"}\n{"id": "b"}\n')
+    m_session = mock.Mock()
+    m_session.request.return_value = response
+    requestor = session.Requestor(
+        m_session, 'http://foo.com/', fmts.NDJSON, prefetch=4
+    )
+
+    result = requestor.get('path', stream=True, converter=lambda g: g['id'])
+
+    assert list(result) == ['a', 'b']
+
+
+def test_prefetched_stream_closes():
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(b'{"id": "a"}\n' * 1000)
+    response.close = mock.Mock()
+    m_session = mock.Mock()
+    m_session.request.return_value = response
+    requestor = session.Requestor(
+        m_session, 'http://foo.com/', fmts.NDJSON, prefetch=1
+    )
+
+    result = requestor.get('path', stream=True, converter=lambda g: g['id'])
+    assert next(result) == 'a'
+    result.close()
+
+    assert response.close.call_count == 1
+    assert not any(
+        thread.name == 'berserk-prefetch' and thread.is_alive()
+        for thread in threading.enumerate()
+    )
+
+
+def test_parallel_stream():
+    m_session = mock.Mock()
+    m_parallel = mock.Mock()
+    m_parallel.decode.return_value = [1, 2]
+    requestor = session.Requestor(
+        m_session, 'http://foo.com/', fmts.NDJSON, parallel=m_parallel
+    )
+
+    result = requestor.get('path', stream=True, converter=int, parallel=True)
+    assert list(result) == [1, 2]
+    m_session.request.return_value = mock.Mock(
+        status_code=200, iter_content=mock.Mock(return_value=[b'{}\n'])
+    )
+    assert list(requestor.get('path', stream=True)) == [{}]
+    pgn = requestor.get('path', fmt=fmts.PGN, stream=True, parallel=True)
+    assert pgn is not None
+    assert m_parallel.decode.call_count == 1
+    fmt, _, converter = m_parallel.decode.call_args[0]
+    assert fmt is fmts.NDJSON
+    assert converter is int
+
+
+def test_resumable_stream_gives_up():
+    m_session = mock.Mock()
+    m_session.request.side_effect = lambda *a, **kw: interrupted()
+    requestor = session.Requestor(m_session, 'http://foo.com/', fmts.NDJSON)
+    resume = session.Resume('until', retries=2, backoff=0)
+
+    with pytest.raises(exceptions.ApiError):
+        list(requestor.get('path', stream=True, resume=resume))
+    assert m_session.request.call_count == 3
+
+
+def test_resume_by_skipping():
+    resume = session.Resume(None)
+    assert [resume.track(r) for r in 'ab'] == [True, True]
+    assert resume.params({'x': 1}) == {'x': 1}
+    assert [resume.track(r) for r in 'abc'] == [False, False, True]
+
+
+def test_resume_pgn_marker():
+    pgn = '\n'.join([
+        '[Event "Rated Blitz game"]',
+        '[Site "https://lichess.org/q7ZvsdUF"]',
+        '[UTCDate "2020.01.02"]',
+        '[UTCTime "03:04:05"]',
+        '',
+        '1. e4 e5 *',
+    ])
+    assert session.Resume.marker(pgn) == (1577934245000, 999, 'q7ZvsdUF')
+
+
+def test_token_session_pools():
+    token_session = session.TokenSession('foo', pool_maxsize=32)
+    for url in session.POOLED_URLS:
+        adapter = token_session.get_adapter(url)
+        assert isinstance(adapter, session.PoolAdapter)
+        assert adapter._pool_maxsize == 32
+
+
+@pytest.mark.parametrize('make', [
+    lambda **kwargs: session.TokenSession('foo', **kwargs),
+    lambda **kwargs: session.TokenPool(['foo'], **kwargs),
+    lambda **kwargs: clients.Client(**kwargs)._r.session,
+])
+def test_pools_mounted_for_any_option(make):
+    pooled = make(keepalive=True)
+    adapter = pooled.get_adapter('https://lichess.org/api')
+    assert isinstance(adapter, session.PoolAdapter)
+    assert adapter._pool_maxsize == 10
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in (
+        adapter.socket_options
+    )
+    assert make(pool_block=True).get_adapter(
+        'https://explorer.lichess.ovh/'
+    )._pool_block is True
+    plain = make().get_adapter('https://lichess.org/api')
+    assert not isinstance(plain, session.PoolAdapter)
+
+
+def test_mount_pools_per_host():
+    s = requests.Session()
+    sizes = {'https://lichess.org/': 20, 'https://explorer.lichess.ovh/': 4}
+    session.mount_pools(s, pool_maxsize=sizes, keepalive=True)
+
+    adapter = s.get_adapter('https://explorer.lichess.ovh/masters')
+    assert adapter._pool_maxsize == 4
+    assert adapter.poolmanager.connection_pool_kw['maxsize'] == 4
+    options = adapter.poolmanager.connection_pool_kw['socket_options']
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in options
+    assert s.get_adapter('https://lichess.org/api')._pool_maxsize == 20
+
+
+def test_single_flight_shares_concurrent_calls():
+    flight = session.SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'id': 'foo'}
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flight.do, 'key', slow)
+        started.wait(5)
+        followers = [pool.submit(flight.do, 'key', slow) for _ in range(3)]
+        while flight.shared < 3:
+            time.sleep(0.001)
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert flight.do('key', lambda: 'again') == 'again'
+
+
+def test_single_flight_shares_errors():
+    flight = session.SingleFlight()
+
+    def fail():
+        raise ValueError('nope')
+
+    with pytest.raises(ValueError):
+        flight.do('key', fail)
+    assert flight.do('key', lambda: 'ok') == 'ok'
+
+
+def test_single_flight_async():
+    flight = session.SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'result'
+
+    async def main():
+        return await asyncio.gather(*[flight.ado('k', fetch) for _ in 'abc'])
+
+    assert asyncio.run(main()) == ['result'] * 3
+    assert len(calls) == 1
+
+
+def test_requestor_coalesces_gets():
+    m_session = mock.Mock()
+    m_session.request.return_value.status_code = 200
+    m_flight = mock.Mock()
+    requestor = session.Requestor(
+        m_session, 'http://foo.com/', mock.Mock(), single_flight=m_flight
+    )
+
+    result = requestor.get('path', params={'b': 2, 'a': 1})
+    requestor.post('path')
+
+    assert result == m_flight.do.return_value
+    assert m_flight.do.call_count == 1
+    key, _ = m_flight.do.call_args[0]
+    assert key[:3] == ('GET', 'http://foo.com/path', (('a', '1'), ('b', '2')))
+
+
+def make_pool(tokens, statuses=None, **kwargs):
+    pool = session.TokenPool(tokens, clock=lambda: 0, **kwargs)
+    statuses = iter(statuses or [])
+    sent = []
+
+    def send(request, **kw):
+        sent.append(request.headers['Authorization'].split()[-1])
+        response = requests.Response()
+        response.status_code = next(statuses, 200)
+        response.raw = io.BytesIO(b'')
+        return response
+
+    pool.send = send
+    return pool, sent
+
+
+def test_token_pool_round_robin():
+    pool, sent = make_pool(['a', 'b', 'c'])
+    for _ in range(4):
+        pool.get('https://lichess.org/api/account')
+    assert sent == ['a', 'b', 'c', 'a']
+
+
+def test_token_pool_retries_rate_limited_with_other_token():
+    pool, sent = make_pool(['a', 'b'], statuses=[429, 200])
+    response = pool.get('https://lichess.org/api/account')
+    assert response.status_code == 200
+    assert sent == ['a', 'b']
+    assert pool.limiters['a'].resume_at == 60
+    assert pool.limiters['b'].resume_at == 0
+
+
+def test_token_pool_least_limited():
+    pool, sent = make_pool(['a', 'b'], strategy='least_limited')
+    pool.limited_at['a'] = -10
+    pool.limited_at['b'] = -5
+    pool.get('https://lichess.org/api/account')
+    pool.get('https://lichess.org/api/account')
+    assert sent == ['a', 'a']
+
+
+def test_token_pool_pins_games():
+    pool, sent = make_pool(['a', 'b', 'c'])
+    url = 'https://lichess.org/api/board/game/{}/move/e2e4'
+    with pool.using('b'):
+        pool.get('https://lichess.org/api/stream/event')
+        pool.get('https://lichess.org/api/board/game/g1/resign')
+    pool.pin('g2', 'c')
+    pool.post(url.format('g1'))
+    pool.get('https://lichess.org/api/bot/game/stream/g2')
+    pool.post(url.format('g2'))
+    assert sent == ['b', 'b', 'b', 'c', 'c']
+    assert pool.pins == {'g1': 'b', 'g2': 'c'}
+
+
+def test_token_pool_rejects_unpinned_games():
+    pool, sent = make_pool(['a', 'b'])
+    with pytest.raises(ValueError, match='g1'):
+        pool.post('https://lichess.org/api/bot/game/g1/move/e2e4')
+    assert sent == [] and pool.pins == {}
+
+    single, sent = make_pool(['a'])
+    single.post('https://lichess.org/api/bot/game/g1/move/e2e4')
+    assert sent == ['a'] and single.pins == {'g1': 'a'}
+
+
+def test_token_pool_does_not_reroute_pinned_requests():
+    pool, sent = make_pool(['a', 'b'], statuses=[429])
+    pool.pin('g1', 'a')
+    response = pool.post('https://lichess.org/api/bot/game/g1/move/e2e4')
+    assert response.status_code == 429
+    assert sent == ['a']
+
+
+def test_token_pool_rejects_unknown_token():
+    pool, _ = make_pool(['a'])
+    with pytest.raises(ValueError):
+        pool.pin('g1', 'b')
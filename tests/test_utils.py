@@ -38,6 +38,58 @@ def test_datetime_from_str(time_case):
     assert utils.datetime_from_str(time_case.text) == time_case.dt
 
 
+@pytest.mark.parametrize('millis', [
+    0, -1, 1, 1525789431889, 8589934591999, 8589952269036, -8589952269036,
+])
+def test_datetime_from_millis_is_exact(millis):
+    expected = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+    expected += datetime.timedelta(milliseconds=millis)
+    assert utils.datetime_from_millis(millis) == expected
+
+
+@pytest.mark.parametrize('text', [
+    '2017-12-28T23:52:30.5Z',
+    '2017-12-28T23:52:30.123Z',
+    '2017-12-28T23:52:30.123456Z',
+])
+def test_datetime_from_str_fractions(text):
+    expected = datetime.datetime.strptime(text, TIME_FMT)
+    expected = expected.replace(tzinfo=datetime.timezone.utc)
+    assert utils.datetime_from_str(text) == expected
+
+
+@pytest.mark.parametrize('text', [
+    '2017-12-28T23:52:30Z',
+    '2017-12-28T23:52:30.123',
+    '2017-12-28 23:52:30.123Z',
+    '2017-12-28T23:52:30.1234567Z',
+    '2017-13-28T23:52:30.123Z',
+])
+def test_datetime_from_str_rejects(text):
+    with pytest.raises(ValueError):
+        utils.datetime_from_str(text)
+
+
+def test_datetime64_from_millis():
+    np = pytest.importorskip('numpy')
+    times = utils.datetime64_from_millis([1525789431889, None, 0])
+    assert times.dtype == np.dtype('datetime64[ms]')
+    assert str(times[0]) == '2018-05-08T14:23:51.889'
+    assert np.isnat(times[1])
+    assert times[2] == np.datetime64(0, 'ms')
+    array = np.array([1525789431889])
+    assert (utils.datetime64_from_millis(array) == times[:1]).all()
+
+
+def test_datetime64_from_str():
+    np = pytest.importorskip('numpy')
+    times = utils.datetime64_from_str(['2018-05-08T14:23:51.889Z', None])
+    assert str(times[0]) == '2018-05-08T14:23:51.889'
+    assert np.isnat(times[1])
+    with pytest.raises(ValueError):
+        utils.datetime64_from_str(['2018-05-08'])
+
+
 def test_inner():
     convert = utils.inner(lambda v: 2 * v, 'x', 'y')
     result = convert({'x': 42})